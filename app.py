@@ -1,38 +1,248 @@
-import pandas as pd
-from utils import *
+import logging
+import os
+import time
+from utils import (
+    FIGURAS, FIGURAS_GRAFOS, CacheInformes, clave_cache, html_grafo, metricas_a_csv
+)
+from utils.excel import crear_zip, listar_hojas
+from utils.trabajos import (
+    CANCELADO, TERMINADO, TIMEOUT_TRABAJO, ColaTrabajos, trabajo_hoja, trabajo_informe, trabajo_sociograma
+)
 
 import streamlit as st
+import streamlit.components.v1 as components
 
 st.set_page_config(page_title="sociogramIA", page_icon="📊", layout="centered")
 
+# Alto en píxeles de la vista interactiva de los grafos
+ALTO_GRAFO = 640
+
+# Segundos entre consultas del estado de un trabajo
+INTERVALO_CONSULTA = 0.5
+
+# Las mediciones de cada etapa se emiten como líneas JSON en el log
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+
+@st.cache_resource
+def obtener_cache():
+    # Una única caché por proceso, compartida entre sesiones y reejecuciones
+    return CacheInformes(directorio=os.environ.get("SOCIOGRAMA_CACHE_DIR"))
+
+
+@st.cache_resource
+def obtener_cola():
+    # Un único pool de procesos para todas las sesiones: con muchas subidas a la vez los
+    # trabajos esperan en la cola en lugar de competir por la CPU en el hilo de la interfaz
+    return ColaTrabajos(
+        procesos=int(os.environ.get("SOCIOGRAMA_TRABAJADORES", 0)) or None,
+        timeout=float(os.environ.get("SOCIOGRAMA_TIMEOUT", TIMEOUT_TRABAJO))
+    )
+
+
+def esperar_trabajo(cola, id_trabajo, texto, al_recibir=None):
+    # Consulta el estado del trabajo hasta que termina, sin bloquear a las demás sesiones:
+    # el cálculo se hace en los procesos de la cola. Los resultados parciales que van
+    # llegando se pasan a 'al_recibir'
+    aviso_estado = st.empty()
+    recibidos = 0
+    while True:
+        trabajo = cola.estado(id_trabajo)
+        if trabajo is not None and al_recibir is not None:
+            parciales = trabajo.parciales
+            for parcial in parciales[recibidos:]:
+                al_recibir(parcial)
+            recibidos = len(parciales)
+        if trabajo is None or trabajo.terminado:
+            aviso_estado.empty()
+            return trabajo
+        posicion = cola.posicion(id_trabajo)
+        if posicion is not None:
+            aviso_estado.info(f"⏳ {texto}: en cola ({posicion} trabajos por delante)")
+        else:
+            aviso_estado.info(f"⚙️ {texto}: {trabajo.duracion:.0f} s")
+        time.sleep(INTERVALO_CONSULTA)
+
+
+def error_trabajo(trabajo):
+    # Primera línea del error (sin la traza) o el motivo de la cancelación
+    if trabajo is None:
+        return "El trabajo ya no está disponible"
+    if trabajo.estado == CANCELADO:
+        return "Trabajo cancelado"
+    return (trabajo.error or trabajo.estado).splitlines()[0]
+
+
+def mostrar_figura(huecos, interactivo, nombre, png):
+    if png is not None and not (interactivo and nombre in FIGURAS_GRAFOS):
+        huecos[nombre].image(png)
+
+
+def mostrar_figuras(resultado, interactivo, huecos):
+    # Cada figura en su hueco (en el orden del informe), aunque ya se mostrara al llegar
+    for nombre in FIGURAS:
+        mostrar_figura(huecos, interactivo, nombre, resultado.figuras.get(nombre))
+    if interactivo:
+        with huecos['interactivo']:
+            components.html(html_grafo(resultado.grafos, ALTO_GRAFO), height=ALTO_GRAFO + 60)
+
+
 st.title("📊 sociogramIA")
 st.write("Generador automático de sociogramas a partir de matrices")
 
 uploaded_file = st.file_uploader(
-    "📂 Arrastra o sube el archivo .csv (.xlsx estará disponible próximamente)",
-    type=["csv"]
+    "📂 Arrastra o sube el archivo .csv, o un .xlsx con una clase por hoja",
+    type=["csv", "xlsx"]
+)
+
+archivo_atributos = st.file_uploader(
+    "🏷️ (Opcional) Atributos de los alumnos: .csv o .xlsx con una fila por alumno (Alumno, Genero, Grupo...)",
+    type=["csv", "xlsx"]
 )
 
 if not uploaded_file:
     print('Por favor, sube un archivo válido para continuar.')
-else:
-    with st.spinner("✍️ Generando el sociograma..."):
+elif uploaded_file.name.lower().endswith('.xlsx'):
+    # Libro con una matriz por hoja: un trabajo por clase, todos los informes en un ZIP
+    cache = obtener_cache()
+    datos = uploaded_file.getvalue()
+    datos_atributos = archivo_atributos.getvalue() if archivo_atributos else b''
+    nombre_atributos = archivo_atributos.name if archivo_atributos else None
+    clave = clave_cache(datos, atributos=clave_cache(datos_atributos), formato='xlsx')
+    entrada = cache.obtener(clave)
 
-        df = pd.read_csv(uploaded_file, index_col=0)
+    if entrada is None:
+        cola = obtener_cola()
+        hojas = listar_hojas(datos)
+        ids = {hoja: cola.enviar(trabajo_hoja, datos, hoja, datos_atributos, nombre_atributos,
+                                 clave=f'{clave}-{hoja}')
+               for hoja in hojas}
+        boton_cancelar = st.empty()
+        if boton_cancelar.button("✖️ Cancelar"):
+            for id_trabajo in ids.values():
+                cola.cancelar(id_trabajo)
+            st.warning("Generación cancelada.")
+            st.stop()
 
-        st.write("Primero, generamos los gráficos...")
-        generar_graficos(df)
+        progreso = st.progress(0.0, text=f"0/{len(hojas)} hojas")
+        trabajos = {}
+        while len(trabajos) < len(ids):
+            for hoja, id_trabajo in ids.items():
+                trabajo = cola.estado(id_trabajo)
+                if hoja not in trabajos and (trabajo is None or trabajo.terminado):
+                    trabajos[hoja] = trabajo
+                    progreso.progress(len(trabajos) / len(ids), text=f"{len(trabajos)}/{len(ids)} hojas: {hoja}")
+            time.sleep(INTERVALO_CONSULTA)
 
-        st.write("\n Generados todos los gráficos.")
+        boton_cancelar.empty()
 
-        st.write("Ahora, generamos el informe...")
-        informe = generar_informe()
+        informes, errores = [], []
+        for hoja in hojas:
+            trabajo = trabajos[hoja]
+            if trabajo is None or trabajo.estado != TERMINADO:
+                errores.append((hoja, error_trabajo(trabajo)))
+            elif trabajo.resultado['error'] is not None:
+                errores.append((hoja, trabajo.resultado['error']))
+            else:
+                informes.append((hoja, trabajo.resultado['informe']))
 
-        st.success("✅ Sociograma generado con éxito!")
+        entrada = {'zip': crear_zip(informes), 'clases': [hoja for hoja, _ in informes], 'errores': errores}
+        cache.guardar(clave, entrada)
 
+    for hoja, error in entrada['errores']:
+        st.error(f"❌ {hoja}: {error}")
+    if entrada['clases']:
+        st.success(f"✅ {len(entrada['clases'])} informes generados: {', '.join(entrada['clases'])}")
+        nombre_zip = os.path.splitext(uploaded_file.name)[0]
         st.download_button(
+            label = "🗂️ Descargar informes (ZIP)",
+            data = entrada['zip'],
+            file_name = f"Informes_{nombre_zip}.zip",
+            mime = "application/zip"
+        )
+else:
+    # En la vista interactiva los grafos se dibujan en el navegador; los PNG solo se
+    # generan en el servidor cuando se pide el PDF
+    interactivo = st.toggle("🖱️ Grafos interactivos (los PNG se dibujan solo al pedir el PDF)", value=True)
+
+    # La descarga aparece arriba en cuanto el PDF está montado, sobre las figuras
+    aviso = st.empty()
+    descarga = st.empty()
+
+    # Mostramos cada figura en cuanto llega del trabajador, en el orden del informe
+    huecos = {nombre: st.empty() for nombre in FIGURAS + ('interactivo',)}
+
+    cache = obtener_cache()
+    datos = uploaded_file.getvalue()
+    datos_atributos = archivo_atributos.getvalue() if archivo_atributos else b''
+    clave = clave_cache(datos, atributos=clave_cache(datos_atributos))
+    entrada = cache.obtener(clave)
+
+    if entrada is None:
+        # El cálculo va a la cola de trabajos; si otra sesión ya ha pedido la misma matriz
+        # se comparte su trabajo. Si el profesor ha corregido unas celdas de la última
+        # matriz, solo se recalcula lo afectado
+        cola = obtener_cola()
+        id_trabajo = cola.enviar(
+            trabajo_sociograma, datos, datos_atributos, archivo_atributos.name if archivo_atributos else None,
+            anterior=st.session_state.get('resultado_anterior'), renderizar_grafos=not interactivo,
+            informe=not interactivo, clave=f'{clave}-{interactivo}'
+        )
+        boton_cancelar = st.empty()
+        if boton_cancelar.button("✖️ Cancelar"):
+            cola.cancelar(id_trabajo)
+            st.warning("Generación cancelada.")
+            st.stop()
+
+        trabajo = esperar_trabajo(cola, id_trabajo, "Generando el sociograma",
+                                  al_recibir=lambda parcial: mostrar_figura(huecos, interactivo, *parcial))
+        boton_cancelar.empty()
+        if trabajo is None or trabajo.estado != TERMINADO:
+            st.error(f"❌ {error_trabajo(trabajo)}")
+            st.stop()
+        entrada = trabajo.resultado
+        cache.guardar(clave, entrada)
+        recuperado = False
+    else:
+        recuperado = True
+
+    # El PDF (y con él los PNG de los grafos) solo se genera cuando se pide o cuando se
+    # quieren ver los grafos como imágenes
+    if entrada['informe'] is None and (not interactivo or descarga.button("📄 Preparar informe PDF")):
+        cola = obtener_cola()
+        trabajo = esperar_trabajo(cola, cola.enviar(trabajo_informe, entrada['resultado'], clave=f'{clave}-pdf'),
+                                  "Generando el informe")
+        if trabajo is None or trabajo.estado != TERMINADO:
+            st.error(f"❌ {error_trabajo(trabajo)}")
+            st.stop()
+        entrada = trabajo.resultado
+        cache.guardar(clave, entrada)
+
+    resultado, informe = entrada['resultado'], entrada['informe']
+    mostrar_figuras(resultado, interactivo, huecos)
+    st.session_state['resultado_anterior'] = resultado
+
+    aviso.success("✅ Sociograma generado con éxito!")
+
+    if informe is not None:
+        descarga.download_button(
             label = "📄 Descargar informe PDF",
             data = informe,
             file_name = "Informe_Sociograma.pdf",
             mime = "application/pdf"
-        )
\ No newline at end of file
+        )
+
+    if resultado.metricas is not None:
+        with st.expander("📋 Índices sociométricos por alumno"):
+            st.dataframe(resultado.metricas)
+            st.download_button(
+                label = "⬇️ Descargar métricas CSV",
+                data = metricas_a_csv(resultado.metricas),
+                file_name = "Metricas_Sociograma.csv",
+                mime = "text/csv"
+            )
+
+    with st.expander("⏱️ Tiempos por etapa"):
+        if recuperado:
+            st.caption("Resultado recuperado de la caché: tiempos de la ejecución original.")
+        st.dataframe(resultado.medicion.tabla())
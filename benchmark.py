@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+# Banco de pruebas con matrices sintéticas. Mide cada etapa por separado (tiempo
+# de reloj, tiempo de CPU del hilo y memoria del proceso) y emite una línea JSON por etapa:
+#   python benchmark.py --tamanos 20 100 500 --densidad 0.2 -o resultados.jsonl
+#   python benchmark.py --bloques --tamanos 1500 5000 --densidad 0.003  (centro entero)
+
+# Presupuesto de tiempo para 'import utils' en un proceso limpio (segundos)
+PRESUPUESTO_IMPORTACION = 1.0
+
+CODIGOS_POSITIVOS = np.array(['1', '2', '3'], dtype=object)
+CODIGOS_NEGATIVOS = np.array(['-1', '-2', '-3'], dtype=object)
+CODIGOS_MIXTOS = np.array(['2!', '-1!!', '1!', '!!', '-1!', '1!!', '-2!'], dtype=object)
+
+
+def generar_matriz_sintetica(n, densidad=0.2, fraccion_negativa=0.25, fraccion_mixta=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    nombres = [f'Alumno {i:04d}' for i in range(n)]
+
+    # Cada celda fuera de la diagonal es un voto con probabilidad 'densidad'
+    votos = rng.random((n, n)) < densidad
+    np.fill_diagonal(votos, False)
+
+    tipo = rng.random((n, n))
+    codigos = np.where(
+        tipo < fraccion_mixta,
+        rng.choice(CODIGOS_MIXTOS, (n, n)),
+        np.where(tipo < fraccion_mixta + fraccion_negativa,
+                 rng.choice(CODIGOS_NEGATIVOS, (n, n)),
+                 rng.choice(CODIGOS_POSITIVOS, (n, n)))
+    )
+    codigos = np.where(votos, codigos, '')
+
+    return pd.DataFrame(codigos, index=nombres, columns=nombres)
+
+
+def medir_importacion():
+    # Medimos en un proceso nuevo para no contar módulos ya cargados
+    codigo = 'import time; t = time.perf_counter(); import utils; print(time.perf_counter() - t)'
+    salida = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    tiempo = float(salida.stdout.strip().splitlines()[-1])
+    return {'etapa': 'importacion', 'tiempo_s': tiempo, 'presupuesto_s': PRESUPUESTO_IMPORTACION,
+            'supera_presupuesto': tiempo > PRESUPUESTO_IMPORTACION}
+
+
+def ejecutar(n, densidad, fraccion_negativa, fraccion_mixta, seed=0, figuras=True, informe=True):
+    from utils import ResultadoGraficos, FIGURAS, Medicion, parsear_matriz, generar_informe, calcular_metricas
+    from utils.utils import ordenar_matriz, calcular_aceptacion, tareas_figuras
+    from utils.grafos import GrafosSociograma, construir_grafos, calcular_layout, comunidades_afinidad, _layouts
+
+    df = generar_matriz_sintetica(n, densidad, fraccion_negativa, fraccion_mixta, seed)
+    medicion = Medicion(log=False)
+
+    matriz = medicion.medir('parseo', parsear_matriz, df)
+    nombres, df_orden, df_numerico = medicion.medir('ordenacion', ordenar_matriz, matriz)
+    df_aceptacion = medicion.medir('aceptacion', calcular_aceptacion, df_numerico)
+    medicion.medir('metricas', calcular_metricas, df_numerico.drop(columns='sumatorio').to_numpy(), nombres)
+
+    valores = df_numerico.drop(columns='sumatorio').to_numpy()
+    G, G_pos, G_neg = medicion.medir('grafos', construir_grafos, nombres, valores)
+
+    _layouts.clear()
+    pos = medicion.medir('layout', calcular_layout, G_pos)
+    componentes = medicion.medir('comunidades', comunidades_afinidad, nombres, valores)
+
+    if figuras:
+        pngs = {}
+        grafos = GrafosSociograma(G, G_pos, G_neg, pos, componentes)
+        tareas = tareas_figuras(df_orden, df_numerico, df_aceptacion, grafos)
+        for nombre, (funcion, args) in tareas.items():
+            pngs[nombre] = medicion.medir(f'figura_{nombre}', funcion, *args)
+
+        if informe:
+            resultado = ResultadoGraficos({nombre: pngs[nombre] for nombre in FIGURAS}, matriz, df_aceptacion,
+                                          grafos=grafos)
+            pdf = generar_informe(resultado, medicion=medicion)
+            medicion.etapas[-1]['tamano_pdf_kb'] = len(pdf) / 1024
+
+    medidas = medicion.etapas
+    for m in medidas:
+        m.update({'n': n, 'densidad': densidad, 'fraccion_negativa': fraccion_negativa,
+                  'fraccion_mixta': fraccion_mixta, 'aristas': G.number_of_edges()})
+    return medidas
+
+
+def ejecutar_bloques(n, densidad, fraccion_negativa, fraccion_mixta, seed=0, informe=True):
+    # Proceso completo de una matriz grande, como en la aplicación y el lote: lectura del
+    # CSV por bloques, métricas, grafos, layout, figuras e informe. El total se compara con
+    # el tiempo máximo de un trabajo de la aplicación
+    import tempfile
+    import time
+    from utils import Medicion, generar_informe
+    from utils.utils import generar_graficos_bloques
+    from utils.bloques import leer_csv_bloques
+    from utils.grafos import _layouts
+    from utils.trabajos import TIMEOUT_TRABAJO
+
+    medicion = Medicion(log=False)
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'matriz.csv')
+        generar_matriz_sintetica(n, densidad, fraccion_negativa, fraccion_mixta, seed).to_csv(ruta)
+        _layouts.clear()
+
+        inicio = time.perf_counter()
+        matriz = medicion.medir('lectura_bloques', leer_csv_bloques, ruta)
+        resultado = generar_graficos_bloques(matriz, procesos=1, medicion=medicion)
+        if informe:
+            pdf = generar_informe(resultado, medicion=medicion)
+            medicion.etapas[-1]['tamano_pdf_kb'] = len(pdf) / 1024
+        total = time.perf_counter() - inicio
+
+    medidas = medicion.etapas + [{'etapa': 'total', 'tiempo_s': total, 'timeout_s': TIMEOUT_TRABAJO,
+                                  'supera_timeout': total > TIMEOUT_TRABAJO}]
+    for m in medidas:
+        m.update({'n': n, 'densidad': densidad, 'fraccion_negativa': fraccion_negativa,
+                  'fraccion_mixta': fraccion_mixta, 'aristas': len(matriz.pesos), 'bloques': True})
+    return medidas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mide cada etapa del sociograma con matrices sintéticas.')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[20, 50, 100, 200], help='Número de alumnos')
+    parser.add_argument('--densidad', type=float, default=0.2, help='Fracción de celdas con voto')
+    parser.add_argument('--negativos', type=float, default=0.25, help='Fracción de votos negativos')
+    parser.add_argument('--mixtos', type=float, default=0.1, help='Fracción de votos mixtos ("!")')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sin-figuras', action='store_true', help='Omite el renderizado de figuras y el PDF')
+    parser.add_argument('--sin-informe', action='store_true', help='Omite el montaje del PDF')
+    parser.add_argument('--bloques', action='store_true',
+                        help='Proceso completo con lectura por bloques (matrices de un centro entero)')
+    parser.add_argument('-o', '--salida', default=None, help='Fichero JSON Lines (por defecto, salida estándar)')
+    args = parser.parse_args(argv)
+
+    salida = open(args.salida, 'w', encoding='utf-8') if args.salida else sys.stdout
+
+    def escribir(medidas):
+        for m in medidas:
+            salida.write(json.dumps(m, ensure_ascii=False) + '\n')
+        salida.flush()
+
+    try:
+        importacion = medir_importacion()
+        escribir([importacion])
+        for n in args.tamanos:
+            if args.bloques:
+                escribir(ejecutar_bloques(n, args.densidad, args.negativos, args.mixtos, args.seed,
+                                          informe=not args.sin_informe))
+            else:
+                escribir(ejecutar(n, args.densidad, args.negativos, args.mixtos, args.seed,
+                                  figuras=not args.sin_figuras, informe=not args.sin_informe))
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+
+    return 1 if importacion['supera_presupuesto'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,264 @@
+import argparse
+import glob
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from utils import (
+    METODOS_COMUNIDADES, Medicion, generar_graficos, generar_graficos_bloques, generar_informe,
+    generar_informe_consolidado, leer_atributos, metricas_a_csv
+)
+from utils.excel import leer_hoja, listar_hojas, nombre_fichero
+from utils.binario import EXTENSION, cargar_matriz, leer_binario, leer_metadatos
+from utils.bloques import UMBRAL_BLOQUES, MatrizBloques, leer_csv_bloques, usar_bloques
+from utils.plantilla import DPI_INFORME
+
+
+# Generación de informes por lotes, sin interfaz web:
+#   python lote.py matrices/ -o informes/
+#   python lote.py "matrices/*.csv" -o informes/ --procesos 8
+#   python lote.py curso.xlsx -o informes/          (una clase por hoja)
+#   python lote.py matrices/ --binarios cache/      (guarda las matrices parseadas en .sgm)
+#   python lote.py matrices/ --dpi 120 --calidad 85  (PDF más ligeros para enviar por correo)
+#   python lote.py centro.csv --bloques --memmap tmp/  (matrices de miles de alumnos, por bloques)
+# Los atributos de cada clase (género...) se leen de <clase>_atributos.csv si existe,
+# o de un fichero común a todas las clases con --atributos
+
+SUFIJO_ATRIBUTOS = '_atributos'
+
+
+def buscar_matrices(entradas):
+    rutas = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            rutas.extend(glob.glob(os.path.join(entrada, '*.csv')))
+            rutas.extend(glob.glob(os.path.join(entrada, '*.xlsx')))
+            rutas.extend(glob.glob(os.path.join(entrada, '*' + EXTENSION)))
+        else:
+            rutas.extend(glob.glob(entrada))
+    rutas = [r for r in rutas if not os.path.splitext(r)[0].endswith(SUFIJO_ATRIBUTOS)]
+    rutas = sorted(set(rutas))
+
+    # Un .sgm generado a partir de uno de los CSV de la entrada (a su lado o en la caché de
+    # --binarios) es la misma clase: se procesa solo el CSV
+    csv = {os.path.splitext(r)[0] for r in rutas if r.lower().endswith('.csv')}
+    origenes_csv = {os.path.basename(r) for r in rutas if r.lower().endswith('.csv')}
+    return [r for r in rutas if not (r.endswith(EXTENSION) and _de_csv(r, csv, origenes_csv))]
+
+
+def _de_csv(ruta, csv, origenes_csv):
+    if os.path.splitext(ruta)[0] in csv:
+        return True
+    try:
+        return leer_metadatos(ruta).get('origen') in origenes_csv
+    except (OSError, ValueError):
+        return False
+
+
+def expandir_hojas(rutas):
+    # Cada hoja de un libro Excel es una tarea; los CSV son una tarea sin hoja
+    tareas = []
+    for ruta in rutas:
+        if ruta.lower().endswith('.xlsx'):
+            tareas.extend((ruta, hoja) for hoja in listar_hojas(ruta))
+        else:
+            tareas.append((ruta, None))
+    return tareas
+
+
+def nombre_clase(ruta, hoja=None):
+    clase = os.path.splitext(os.path.basename(ruta))[0]
+    return f'{clase}_{nombre_fichero(hoja)}' if hoja is not None else clase
+
+
+def nombres_clases(tareas):
+    # Nombre de cada tarea para sus ficheros de salida y el informe consolidado. Si dos
+    # entradas dan el mismo nombre (3A.csv y 3A.xlsx, o ficheros homónimos en directorios
+    # distintos) se numeran a partir de la segunda, en el orden de las tareas
+    nombres, usados = [], set()
+    for ruta, hoja in tareas:
+        base = clase = nombre_clase(ruta, hoja)
+        k = 2
+        while clase in usados:
+            clase, k = f'{base}_{k}', k + 1
+        usados.add(clase)
+        nombres.append(clase)
+    return nombres
+
+
+def buscar_atributos(ruta, comunes=None):
+    propia = f'{os.path.splitext(ruta)[0]}{SUFIJO_ATRIBUTOS}.csv'
+    if os.path.exists(propia):
+        return propia
+    return comunes
+
+
+def procesar_clase(ruta, directorio_salida, comunidades='louvain', atributos=None, hoja=None, binarios=None,
+                   dpi=DPI_INFORME, calidad=None, consolidado=False, bloques=None, memmap=None, clase=None):
+    clase = clase or nombre_clase(ruta, hoja)
+    medicion = Medicion(log=False)
+    inicio = time.perf_counter()
+    atributos_binario = None
+
+    # Los libros Excel se abren en modo de solo lectura y solo se lee la hoja de la tarea
+    if hoja is not None:
+        with medicion.etapa('lectura_xlsx', hoja=hoja):
+            df = leer_hoja(ruta, hoja)
+        if df is None or df.empty:
+            raise ValueError(f'La hoja {hoja!r} está vacía')
+    elif ruta.endswith(EXTENSION):
+        # Matriz ya parseada: se proyecta en memoria sin leer ni mapear códigos
+        with medicion.etapa('lectura_binaria'):
+            df, atributos_binario, _ = leer_binario(ruta)
+    elif bloques or (bloques is None and usar_bloques(ruta)):
+        # Matriz muy grande: se lee por bloques de filas sin cargar la matriz de textos
+        with medicion.etapa('lectura_bloques'):
+            df = leer_csv_bloques(ruta, directorio=memmap)
+    elif binarios:
+        # El CSV se parsea una vez y las siguientes ejecuciones leen su .sgm
+        with medicion.etapa('lectura_binaria'):
+            df, atributos_binario, _ = cargar_matriz(ruta, binarios)
+    else:
+        with medicion.etapa('lectura_csv'):
+            df = pd.read_csv(ruta, index_col=0, dtype=str)
+    with medicion.etapa('atributos'):
+        ruta_atributos = buscar_atributos(ruta, atributos)
+        tabla_atributos = leer_atributos(ruta_atributos) if ruta_atributos else atributos_binario
+
+    # Un proceso por clase: las figuras se renderizan dentro del mismo proceso
+    if isinstance(df, MatrizBloques):
+        resultado = generar_graficos_bloques(df, procesos=1, medicion=medicion, comunidades=comunidades,
+                                             atributos=tabla_atributos)
+    else:
+        resultado = generar_graficos(df, procesos=1, medicion=medicion, comunidades=comunidades,
+                                     atributos=tabla_atributos)
+
+    # Con informe consolidado no se monta un PDF por clase: el resultado vuelve al proceso
+    # principal, que escribe un único PDF con todas las clases
+    salida = None
+    if not consolidado:
+        informe = generar_informe(resultado, clase=hoja or clase, dpi=dpi, calidad=calidad)
+        salida = os.path.join(directorio_salida, f'Informe_{clase}.pdf')
+        with open(salida, 'wb') as f:
+            f.write(informe)
+
+    salida_metricas = os.path.join(directorio_salida, f'Metricas_{clase}.csv')
+    with open(salida_metricas, 'wb') as f:
+        f.write(metricas_a_csv(resultado.metricas))
+
+    res = {
+        'clase': clase,
+        'entrada': ruta,
+        'hoja': hoja,
+        'salida': salida,
+        'metricas': salida_metricas,
+        'alumnos': resultado.matriz.n,
+        'tiempo_s': time.perf_counter() - inicio,
+        'etapas': medicion.etapas
+    }
+    if consolidado:
+        res['resultado'] = resultado
+    return res
+
+
+def _procesar_clase_seguro(ruta, hoja, directorio_salida, comunidades, atributos, binarios, dpi, calidad,
+                           consolidado=False, bloques=None, memmap=None, clase=None):
+    try:
+        return procesar_clase(ruta, directorio_salida, comunidades, atributos, hoja, binarios, dpi, calidad,
+                              consolidado, bloques, memmap, clase)
+    except Exception as e:
+        return {'entrada': ruta, 'hoja': hoja, 'error': f'{type(e).__name__}: {e}', 'traza': traceback.format_exc()}
+
+
+def procesar_lote(rutas, directorio_salida, procesos=None, comunidades='louvain', atributos=None, binarios=None,
+                  dpi=DPI_INFORME, calidad=None, consolidado=None, bloques=None, memmap=None):
+    os.makedirs(directorio_salida, exist_ok=True)
+    inicio = time.perf_counter()
+    correctos, fallos, resultados = [], [], {}
+    tareas = expandir_hojas(rutas)
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [pool.submit(_procesar_clase_seguro, ruta, hoja, directorio_salida, comunidades, atributos,
+                               binarios, dpi, calidad, consolidado is not None, bloques, memmap, clase)
+                   for (ruta, hoja), clase in zip(tareas, nombres_clases(tareas))]
+        for futuro in as_completed(futuros):
+            res = futuro.result()
+            if 'error' in res:
+                fallos.append(res)
+                print(f"❌ {res['entrada']}{' [' + res['hoja'] + ']' if res['hoja'] else ''}: {res['error']}")
+            else:
+                resultados[res['clase']] = res.pop('resultado', None)
+                correctos.append(res)
+                print(f"✅ {res['salida'] or res['clase']} ({res['tiempo_s']:.1f} s)")
+
+    correctos = sorted(correctos, key=lambda r: (r['entrada'], r['hoja'] or ''))
+    if consolidado is not None and correctos:
+        # Las clases en el mismo orden que el resumen
+        with open(consolidado, 'wb') as f:
+            f.write(generar_informe_consolidado([(r['clase'], resultados[r['clase']]) for r in correctos],
+                                                dpi=dpi, calidad=calidad))
+        print(f"✅ {consolidado}")
+
+    return {
+        'total': len(tareas),
+        'correctos': correctos,
+        'consolidado': consolidado if consolidado is not None and correctos else None,
+        'fallos': sorted(fallos, key=lambda r: (r['entrada'], r['hoja'] or '')),
+        'tiempo_total': time.perf_counter() - inicio
+    }
+
+
+def calidad_jpeg(texto):
+    # Calidad JPEG admitida por Pillow (por encima de 95 los ficheros crecen sin ganar nada)
+    calidad = int(texto)
+    if not 1 <= calidad <= 95:
+        raise argparse.ArgumentTypeError(f'la calidad debe estar entre 1 y 95 (no {calidad})')
+    return calidad
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Genera un informe PDF por cada matriz de sociograma.')
+    parser.add_argument('entradas', nargs='+', help='Directorios o patrones glob con las matrices .csv/.sgm o libros .xlsx')
+    parser.add_argument('-o', '--salida', default='informes', help='Directorio donde se guardan los PDF')
+    parser.add_argument('--procesos', type=int, default=None, help='Número de procesos (por defecto, uno por núcleo)')
+    parser.add_argument('--comunidades', choices=list(METODOS_COMUNIDADES), default='louvain',
+                        help='Método de detección de grupos de afinidad')
+    parser.add_argument('--atributos', default=None,
+                        help='Fichero .csv/.xlsx con los atributos de los alumnos de todas las clases')
+    parser.add_argument('--binarios', default=None,
+                        help='Directorio donde guardar y reutilizar las matrices CSV ya parseadas (.sgm)')
+    parser.add_argument('--dpi', type=int, default=DPI_INFORME,
+                        help='Resolución de las figuras en el PDF, según su tamaño impreso (0 = PNG original)')
+    parser.add_argument('--calidad', type=calidad_jpeg, default=None,
+                        help='Incrusta las figuras en JPEG con esta calidad (1-95) en lugar de PNG')
+    parser.add_argument('--consolidado', default=None,
+                        help='Genera un único PDF con todas las clases en esta ruta, en lugar de un PDF por clase')
+    parser.add_argument('--bloques', action='store_const', const=True, default=None,
+                        help='Lee los CSV por bloques de filas, sin cargar la matriz de textos (automático '
+                             f'a partir de {UMBRAL_BLOQUES} alumnos)')
+    parser.add_argument('--memmap', default=None,
+                        help='Con lectura por bloques, directorio donde proyectar la matriz de códigos (np.memmap)')
+    parser.add_argument('--resumen', default=None, help='Ruta del resumen JSON (por defecto, <salida>/resumen.json)')
+    args = parser.parse_args(argv)
+
+    rutas = buscar_matrices(args.entradas)
+    if not rutas:
+        parser.error('No se ha encontrado ninguna matriz .csv ni libro .xlsx')
+
+    resumen = procesar_lote(rutas, args.salida, args.procesos, args.comunidades, args.atributos,
+                            args.binarios, args.dpi or None, args.calidad, args.consolidado, args.bloques,
+                            args.memmap)
+
+    ruta_resumen = args.resumen or os.path.join(args.salida, 'resumen.json')
+    with open(ruta_resumen, 'w', encoding='utf-8') as f:
+        json.dump(resumen, f, ensure_ascii=False, indent=2)
+
+    print(f"{len(resumen['correctos'])}/{resumen['total']} informes generados en {resumen['tiempo_total']:.1f} s. Resumen: {ruta_resumen}")
+    return 1 if resumen['fallos'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
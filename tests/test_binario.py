@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.atributos import separar_atributos
+from utils.binario import (
+    EXTENSION, binario_a_bytes, binario_a_csv, cargar_matriz, csv_a_binario, leer_binario, leer_metadatos
+)
+from utils.matriz import parsear_matriz
+
+
+def matriz_prueba(n=15, seed=0):
+    rng = np.random.default_rng(seed)
+    nombres = [f'Alumno {i:02d}' for i in range(n)]
+    codigos = rng.choice(np.array(['', '', '1', '2', '3', '-1', '-2', '1!', '!!'], dtype=object), (n, n))
+    np.fill_diagonal(codigos, '')
+    codigos[0, 1] = 'x'   # desconocido: se guarda y se repone celda a celda
+    df = pd.DataFrame(codigos, index=nombres, columns=nombres)
+    df['Género'] = rng.choice(['M', 'F'], n)
+    return df
+
+
+def assert_misma_matriz(a, b):
+    assert a.nombres == b.nombres
+    assert np.array_equal(a.valores, b.valores)
+    assert np.array_equal(a.textos(), b.textos())
+    assert np.array_equal(a.codigos, b.codigos)
+    assert a.desconocidos == b.desconocidos
+
+
+def test_ida_y_vuelta_en_memoria():
+    df, atributos = separar_atributos(matriz_prueba())
+    matriz = parsear_matriz(df)
+    leida, atributos_leidos, metadatos = leer_binario(binario_a_bytes(matriz, atributos, {'clase': '3A'}))
+    assert_misma_matriz(leida, matriz)
+    assert atributos_leidos == atributos
+    assert metadatos == {'clase': '3A'}
+
+
+def test_ida_y_vuelta_por_csv(tmp_path):
+    ruta_csv = tmp_path / '3A.csv'
+    matriz_prueba().to_csv(ruta_csv)
+    ruta_binaria = csv_a_binario(str(ruta_csv))
+    assert ruta_binaria == str(tmp_path / f'3A{EXTENSION}')
+    assert leer_metadatos(ruta_binaria) == {'origen': '3A.csv'}
+
+    # El CSV reconstruido vuelve a dar la misma matriz y los mismos atributos
+    reconstruido = binario_a_csv(ruta_binaria, str(tmp_path / 'copia.csv'))
+    original = separar_atributos(pd.read_csv(ruta_csv, index_col=0, dtype=str))
+    copia = separar_atributos(pd.read_csv(reconstruido, index_col=0, dtype=str))
+    assert_misma_matriz(parsear_matriz(copia[0]), parsear_matriz(original[0]))
+    assert copia[1] == original[1]
+
+
+def test_cargar_matriz_reutiliza_el_binario(tmp_path):
+    ruta_csv = tmp_path / '3A.csv'
+    matriz_prueba().to_csv(ruta_csv)
+    cache = tmp_path / 'cache'
+    primera, _, _ = cargar_matriz(str(ruta_csv), str(cache))
+    ruta_binaria = cache / f'3A{EXTENSION}'
+    assert ruta_binaria.exists()
+
+    # Mientras el binario sea más reciente que el CSV no se vuelve a escribir
+    momento = ruta_binaria.stat().st_mtime
+    assert_misma_matriz(cargar_matriz(str(ruta_csv), str(cache))[0], primera)
+    assert ruta_binaria.stat().st_mtime == momento
+
+    # Si el CSV cambia, se vuelve a parsear
+    matriz_prueba(seed=1).to_csv(ruta_csv)
+    os.utime(ruta_csv, (momento + 10, momento + 10))
+    nueva, _, _ = cargar_matriz(str(ruta_csv), str(cache))
+    assert not np.array_equal(nueva.valores, primera.valores)
+
+
+def test_fichero_no_binario():
+    with pytest.raises(ValueError):
+        leer_binario(b'Alumno,Ana\nAna,\n' + b'\0' * 64)
+
+
+def test_categorias_proyectadas_sin_textos(tmp_path):
+    df, atributos = separar_atributos(matriz_prueba())
+    matriz = parsear_matriz(df)
+    ruta = tmp_path / f'3A{EXTENSION}'
+    ruta.write_bytes(binario_a_bytes(matriz, atributos))
+    leida, _, _ = leer_binario(str(ruta))
+
+    # Sin matriz de textos: las categorías se leen del fichero proyectado
+    assert leida.anotaciones is None
+    assert isinstance(leida.codigos, np.memmap)
+
+    # Los textos de un bloque, con el desconocido ('x' en Alumno 00 / Alumno 01) repuesto
+    filas, columnas = np.array([0, 2]), np.array([1, 3, 4])
+    assert np.array_equal(leida.textos(filas, columnas), matriz.anotaciones[np.ix_(filas, columnas)])
+    assert leida.textos(filas, columnas)[0, 0] == 'x'
+
+
+def test_cambios_respecto_a_un_binario():
+    from utils.matriz import comparar_matrices
+
+    df, _ = separar_atributos(matriz_prueba())
+    leida, _, _ = leer_binario(binario_a_bytes(parsear_matriz(df)))
+    assert comparar_matrices(leida, parsear_matriz(df)).vacio
+
+    df.iloc[2, 3], df.iloc[0, 1] = '!!' if df.iloc[2, 3] != '!!' else '1!', 'y'
+    cambios = comparar_matrices(leida, parsear_matriz(df))
+    assert sorted(zip(cambios.filas, cambios.columnas)) == [(0, 1), (2, 3)]
@@ -0,0 +1,97 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.atributos import separar_atributos
+from utils.bloques import heatmap_reducido, leer_csv_bloques
+from utils.matriz import parsear_matriz
+from utils.metricas import calcular_metricas, metricas_aristas
+
+CODIGOS_PRUEBA = ['', '', '', '1', '2', '3', '-1', '-2', '-3', '1!', '!!', '-1!']
+
+
+def csv_sintetico(n=23, seed=0, desconocido=True):
+    # Matriz con columnas en otro orden que las filas, espacios alrededor de algunos
+    # códigos, un código desconocido y una columna de atributos
+    rng = np.random.default_rng(seed)
+    nombres = [f'Alumno {i:02d}' for i in range(n)]
+    codigos = rng.choice(np.array(CODIGOS_PRUEBA, dtype=object), (n, n))
+    np.fill_diagonal(codigos, '')
+    codigos[1, 2] = ' 2 '
+    if desconocido:
+        codigos[3, 4] = 'x'
+    df = pd.DataFrame(codigos, index=nombres, columns=nombres)
+    df = df[list(reversed(nombres))]
+    df['Género'] = rng.choice(['M', 'F'], n)
+    return df.to_csv().encode()
+
+
+def lectura_completa(datos):
+    df = pd.read_csv(io.BytesIO(datos), index_col=0, dtype=str)
+    df, atributos = separar_atributos(df)
+    return parsear_matriz(df), atributos
+
+
+@pytest.mark.parametrize('filas_bloque', [1, 4, None])
+def test_bloques_igual_que_lectura_completa(filas_bloque):
+    datos = csv_sintetico()
+    completa, atributos = lectura_completa(datos)
+    bloques = leer_csv_bloques(datos, filas_bloque=filas_bloque)
+
+    assert bloques.nombres == completa.nombres
+    assert np.array_equal(bloques.codigos, completa.codigos)
+    assert np.allclose(bloques.sumatorio(), completa.sumatorio())
+    assert sorted(bloques.desconocidos) == sorted(completa.desconocidos)
+    assert bloques.atributos == atributos
+
+    # Aristas votante -> votado con su puntuación
+    votados, votantes = np.nonzero(completa.valores)
+    esperadas = set(zip(votantes, votados, completa.valores[votados, votantes]))
+    assert set(zip(bloques.origen, bloques.destino, bloques.pesos)) == esperadas
+    assert np.array_equal(bloques.valores_dispersos().toarray(), completa.valores)
+
+
+def test_bloques_en_memmap(tmp_path):
+    datos = csv_sintetico(desconocido=False)
+    completa, _ = lectura_completa(datos)
+    bloques = leer_csv_bloques(datos, filas_bloque=5, directorio=tmp_path)
+    assert isinstance(bloques.codigos, np.memmap)
+    assert np.array_equal(bloques.codigos, completa.codigos)
+
+
+def test_bloques_desde_ruta(tmp_path):
+    ruta = tmp_path / 'matriz.csv'
+    ruta.write_bytes(csv_sintetico())
+    assert np.array_equal(leer_csv_bloques(str(ruta), filas_bloque=3).codigos, lectura_completa(ruta.read_bytes())[0].codigos)
+
+
+def test_metricas_aristas_igual_que_matriz():
+    datos = csv_sintetico(desconocido=False)
+    completa, _ = lectura_completa(datos)
+    bloques = leer_csv_bloques(datos, filas_bloque=4)
+    esperadas = calcular_metricas(completa.valores, completa.nombres)
+    pd.testing.assert_frame_equal(
+        metricas_aristas(bloques.origen, bloques.destino, bloques.pesos, bloques.nombres), esperadas,
+        check_dtype=False
+    )
+
+
+def test_heatmap_reducido():
+    datos = csv_sintetico(desconocido=False)
+    completa, _ = lectura_completa(datos)
+    bloques = leer_csv_bloques(datos)
+    orden = np.argsort(-bloques.sumatorio(), kind='stable')
+
+    # Sin reducción es la matriz ordenada; reducida, la media de cada bloque de alumnos
+    assert np.allclose(heatmap_reducido(bloques, orden), completa.valores[np.ix_(orden, orden)])
+    reducida = heatmap_reducido(bloques, orden, lado_maximo=5)
+    assert reducida.shape == (5, 5)
+    assert np.isclose(reducida.mean(), completa.valores.mean(), atol=0.05)
+
+
+def test_alumnos_distintos_en_filas_y_columnas():
+    df = pd.DataFrame([['', '1'], ['2', '']], index=['Ana', 'Luis'], columns=['Ana', 'Pedro'])
+    with pytest.raises(ValueError):
+        leer_csv_bloques(df.to_csv().encode())
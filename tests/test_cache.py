@@ -0,0 +1,49 @@
+import os
+import threading
+
+from utils.cache import CacheInformes, clave_cache
+
+
+def test_clave_por_contenido_y_opciones():
+    assert clave_cache(b'a', agrupar=False) == clave_cache(b'a', agrupar=False)
+    assert clave_cache(b'a', agrupar=False) != clave_cache(b'a', agrupar=True)
+    assert clave_cache(b'a') != clave_cache(b'b')
+
+
+def test_memoria_y_disco(tmp_path):
+    CacheInformes(directorio=str(tmp_path)).guardar('k', {'figuras': [1, 2]})
+    # Otra instancia (otro proceso) la lee del disco
+    assert CacheInformes(directorio=str(tmp_path)).obtener('k') == {'figuras': [1, 2]}
+    assert CacheInformes().obtener('k') is None
+
+
+def test_expulsion_lru_en_memoria():
+    cache = CacheInformes(max_bytes_memoria=300)
+    cache.guardar('a', b'x' * 100)
+    cache.guardar('b', b'x' * 100)
+    cache.obtener('a')
+    cache.guardar('c', b'x' * 100)
+    assert cache.obtener('a') is not None
+    assert cache.obtener('b') is None
+
+
+def test_misma_clave_desde_varios_hilos(tmp_path):
+    # Sesiones que comparten un trabajo deduplicado guardan la misma clave a la vez
+    cache = CacheInformes(directorio=str(tmp_path))
+    errores = []
+
+    def guardar(i):
+        try:
+            for _ in range(20):
+                cache.guardar('k', b'x' * 100_000 + bytes([i]))
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=guardar, args=(i,)) for i in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert errores == []
+    assert os.listdir(tmp_path) == ['k.pkl']
+    assert CacheInformes(directorio=str(tmp_path)).obtener('k')[:100_000] == b'x' * 100_000
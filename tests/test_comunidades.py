@@ -0,0 +1,59 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from utils.comunidades import METODOS_COMUNIDADES, comunidades_louvain
+
+
+def matriz_grupos(tamanos, p_dentro=0.6, p_fuera=0.03, seed=0):
+    # Votos positivos con grupos plantados (fila = votado, columna = votante)
+    rng = np.random.default_rng(seed)
+    grupo = np.repeat(np.arange(len(tamanos)), tamanos)
+    mismo = grupo[:, None] == grupo[None, :]
+    votos = rng.random(mismo.shape) < np.where(mismo, p_dentro, p_fuera)
+    np.fill_diagonal(votos, False)
+    return np.where(votos, rng.choice([1.0, 2.0, 3.0], mismo.shape), 0.0).astype(np.float32), grupo
+
+
+def modularidad_nx(valores, etiquetas):
+    # Modularidad del grafo no dirigido de afinidad, la misma que optimiza Louvain
+    simetrica = np.maximum(valores, 0) + np.maximum(valores, 0).T
+    G = nx.from_numpy_array(simetrica)
+    grupos = [set(np.flatnonzero(etiquetas == e)) for e in np.unique(etiquetas)]
+    return nx.community.modularity(G, grupos), G
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_louvain_calidad_como_networkx(seed):
+    valores, _ = matriz_grupos([12, 10, 8, 15, 5], seed=seed)
+    propia, G = modularidad_nx(valores, comunidades_louvain(valores, seed=seed))
+    referencia = nx.community.modularity(G, nx.community.louvain_communities(G, seed=seed))
+    assert propia >= referencia - 0.01
+
+
+def test_louvain_recupera_grupos_plantados():
+    valores, grupo = matriz_grupos([10, 10, 10], p_dentro=0.8, p_fuera=0.0)
+    etiquetas = comunidades_louvain(valores)
+    # Mismo reparto salvo la numeración
+    assert len(set(zip(etiquetas, grupo))) == 3
+
+
+def test_louvain_admite_matriz_dispersa():
+    from scipy.sparse import csr_matrix
+
+    valores, _ = matriz_grupos([8, 8, 8])
+    assert np.array_equal(comunidades_louvain(valores), comunidades_louvain(csr_matrix(valores)))
+
+
+@pytest.mark.parametrize('metodo', list(METODOS_COMUNIDADES))
+@pytest.mark.parametrize('n', [0, 1])
+def test_matrices_minimas(metodo, n):
+    etiquetas = METODOS_COMUNIDADES[metodo](np.zeros((n, n), dtype=np.float32))
+    assert len(etiquetas) == n
+
+
+@pytest.mark.parametrize('metodo', list(METODOS_COMUNIDADES))
+def test_grupos_de_mayor_a_menor(metodo):
+    valores, _ = matriz_grupos([5, 15, 10], p_dentro=0.8, p_fuera=0.0)
+    tamanos = np.bincount(METODOS_COMUNIDADES[metodo](valores))
+    assert list(tamanos) == sorted(tamanos, reverse=True)
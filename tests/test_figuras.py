@@ -0,0 +1,45 @@
+import threading
+
+from utils.figuras import _obtener_pool, renderizar_figuras
+
+
+def test_un_pool_por_tamano():
+    assert _obtener_pool(2) is _obtener_pool(2)
+    assert _obtener_pool(2) is not _obtener_pool(3)
+
+
+def test_llamadas_simultaneas_con_distinto_tamano():
+    # Una sesión con otro número de procesos no cierra el pool que usa la otra
+    tareas = {f'f{i}': (abs, (-i,)) for i in range(6)}
+    resultados, errores = {}, []
+
+    def renderizar(procesos):
+        try:
+            for _ in range(3):
+                resultados[procesos] = renderizar_figuras(tareas, procesos=procesos)
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=renderizar, args=(p,)) for p in (2, 3)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert errores == []
+    assert resultados[2] == resultados[3] == {f'f{i}': i for i in range(6)}
+
+
+def test_aristas_sin_un_parche_por_arista():
+    import networkx as nx
+    from utils.figuras import _nueva_figura, dibujar_aristas
+
+    G = nx.gnp_random_graph(40, 0.2, seed=0, directed=True)
+    nx.set_edge_attributes(G, 2.0, 'weight')
+    pos = nx.circular_layout(G)
+    fig, ax = _nueva_figura((4, 4))
+    dibujar_aristas(G, pos, 'green', ax)
+    fig.canvas.draw()
+
+    # Todas las aristas (con sus flechas) en un solo artista, sin FancyArrowPatch
+    assert len(ax.patches) == 0
+    assert len(ax.artists) == 1
@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+PESADOS = ('matplotlib', 'networkx', 'scipy', 'seaborn', 'reportlab')
+
+
+def test_importar_utils_no_carga_dependencias_pesadas():
+    # En un proceso nuevo, para no contar módulos ya cargados por otras pruebas
+    codigo = ('import sys, utils; '
+              f'print(",".join(m for m in {PESADOS!r} if m in sys.modules))')
+    salida = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert salida.stdout.strip() == ''
@@ -0,0 +1,32 @@
+import threading
+import time
+
+from utils.instrumentacion import Medicion
+
+
+def ocupar_cpu(segundos):
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        pass
+
+
+def test_cpu_de_cada_hilo():
+    # Una etapa que espera no cuenta la CPU que gasta otra etapa en otro hilo
+    medicion = Medicion(log=False)
+    hilo = threading.Thread(target=medicion.medir, args=('calculo', ocupar_cpu, 0.3))
+    with medicion.etapa('espera'):
+        hilo.start()
+        hilo.join()
+    etapas = {e['etapa']: e for e in medicion.etapas}
+    assert etapas['espera']['tiempo_s'] >= 0.3
+    assert etapas['espera']['cpu_hilo_s'] < 0.1
+    assert etapas['calculo']['cpu_hilo_s'] > 0.1
+
+
+def test_tabla_sin_pico_del_proceso():
+    medicion = Medicion(log=False)
+    with medicion.etapa('lectura', filas=10):
+        pass
+    assert medicion.etapas[0]['pico_rss_proceso_mb'] > 0
+    tabla = medicion.tabla()
+    assert list(tabla.columns) == ['etapa', 'tiempo_s', 'cpu_hilo_s', 'rss_mb', 'filas']
@@ -0,0 +1,12 @@
+import pytest
+
+from lote import main
+
+
+@pytest.mark.parametrize('calidad', ['0', '96', '-5', 'alta'])
+def test_calidad_fuera_de_rango(calidad, tmp_path, capsys):
+    # Se rechaza al leer los argumentos, antes de buscar ni procesar ninguna matriz
+    with pytest.raises(SystemExit) as salida:
+        main([str(tmp_path), '--calidad', calidad])
+    assert salida.value.code == 2
+    assert '--calidad' in capsys.readouterr().err
@@ -0,0 +1,61 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.matriz import CODIGOS, DESCONOCIDO, MAPA_VALORES, comparar_matrices, parsear_matriz
+
+
+def matriz(filas, nombres=('Ana', 'Bea', 'Carlos')):
+    return pd.DataFrame(filas, index=list(nombres), columns=list(nombres))
+
+
+def test_todos_los_codigos():
+    # Cada código en una celda fuera de la diagonal de una matriz de dos alumnos
+    for codigo, valor in MAPA_VALORES.items():
+        m = parsear_matriz(matriz([['', codigo], ['', '']], ('Ana', 'Bea')))
+        assert m.valores[0, 1] == np.float32(valor)
+        assert CODIGOS[m.codigos[0, 1]] == codigo
+        assert m.desconocidos == []
+
+
+def test_espacios_y_columnas_numericas():
+    # Solo "3" y vacíos: pandas lee la columna como números
+    df = pd.DataFrame({'Ana': [np.nan, 3, np.nan], 'Bea': [' 2 ', '', '-1'], 'Carlos': ['1!', '', '']},
+                      index=['Ana', 'Bea', 'Carlos'])
+    m = parsear_matriz(df)
+    assert m.valores.tolist() == [[0, 2, 0.5], [3, 0, 0], [0, -1, 0]]
+    assert m.anotaciones[1, 0] == '3'
+
+
+def test_columnas_en_otro_orden():
+    df = matriz([['', '1', '2'], ['3', '', ''], ['-1', '', '']])
+    m = parsear_matriz(df[['Carlos', 'Ana', 'Bea']])
+    assert np.array_equal(m.valores, parsear_matriz(df).valores)
+
+
+def test_codigos_desconocidos_con_su_celda():
+    df = matriz([['', 'x', '2'], ['3', '', '4'], ['', '', '']])
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        m = parsear_matriz(df)
+    # (votado, votante, código), en el orden de las filas
+    assert m.desconocidos == [('Ana', 'Bea', 'x'), ('Bea', 'Carlos', '4')]
+    assert m.codigos[0, 1] == DESCONOCIDO and m.codigos[1, 2] == DESCONOCIDO
+    assert m.valores[0, 1] == 0 and m.valores[1, 2] == 0
+    assert m.valores[0, 2] == 2
+
+
+def test_alumnos_distintos():
+    df = pd.DataFrame([['', '1'], ['2', '']], index=['Ana', 'Bea'], columns=['Ana', 'Pedro'])
+    with pytest.raises(ValueError):
+        parsear_matriz(df)
+
+
+def test_cambios_solo_de_anotacion():
+    anterior = parsear_matriz(matriz([['', '1!', ''], ['2', '', ''], ['', '', '']]))
+    nueva = parsear_matriz(matriz([['', '!!', ''], ['2', '', ''], ['', '', '']]))
+    cambios = comparar_matrices(anterior, nueva)
+    assert not cambios.vacio
+    assert not cambios.valores and not cambios.sumatorio
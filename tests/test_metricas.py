@@ -0,0 +1,83 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from utils.metricas import ESTATUS, calcular_metricas, clasificar_estatus, metricas_a_csv, resumen_metricas
+
+NOMBRES = ['Ana', 'Bea', 'Carlos', 'Dani', 'Eva']
+
+# (votante, votado, puntuación)
+VOTOS = [
+    ('Ana', 'Bea', 1), ('Bea', 'Ana', 2),        # elección recíproca Ana-Bea
+    ('Ana', 'Carlos', 1), ('Carlos', 'Ana', 1),  # elección recíproca Ana-Carlos
+    ('Dani', 'Ana', 1), ('Eva', 'Ana', 3),
+    ('Bea', 'Eva', -1), ('Eva', 'Bea', -1),      # rechazo mutuo Bea-Eva
+    ('Carlos', 'Eva', -2), ('Dani', 'Eva', -1), ('Ana', 'Eva', -1),
+]
+
+
+def matriz_votos():
+    # Fila = votado, columna = votante
+    posicion = {alumno: i for i, alumno in enumerate(NOMBRES)}
+    valores = np.zeros((len(NOMBRES), len(NOMBRES)), dtype=np.float32)
+    for votante, votado, puntuacion in VOTOS:
+        valores[posicion[votado], posicion[votante]] = puntuacion
+    return valores
+
+
+def test_recuentos_por_alumno():
+    df = calcular_metricas(matriz_votos(), NOMBRES)
+    esperado = pd.DataFrame({
+        'Elecciones recibidas': [4, 1, 1, 0, 0],
+        'Rechazos recibidos': [0, 1, 0, 0, 4],
+        'Elecciones emitidas': [2, 1, 1, 1, 1],
+        'Rechazos emitidos': [1, 1, 1, 1, 1],
+        'Elecciones recíprocas': [2, 1, 1, 0, 0],
+        'Rechazos mutuos': [0, 1, 0, 0, 1],
+    }, index=pd.Index(NOMBRES, name='Alumno'))
+    pd.testing.assert_frame_equal(df[esperado.columns], esperado, check_dtype=False)
+    assert df.loc['Ana', 'Popularidad'] == 1.0
+    assert df.loc['Eva', 'Rechazo'] == 1.0
+    assert df.loc['Ana', 'Expansividad'] == 0.5
+
+
+def test_diagonal_no_cuenta():
+    valores = matriz_votos()
+    np.fill_diagonal(valores, 3)
+    pd.testing.assert_frame_equal(calcular_metricas(valores, NOMBRES), calcular_metricas(matriz_votos(), NOMBRES))
+
+
+def test_clasificacion_estatus():
+    positivas = np.array([9, 0, 0, 6, 3, 3, 3, 3, 3, 3])
+    negativas = np.array([0, 9, 0, 6, 3, 3, 3, 3, 3, 3])
+    estatus, _, _ = clasificar_estatus(positivas, negativas)
+    assert list(estatus[:5]) == ['Popular', 'Rechazado', 'Ignorado', 'Controvertido', 'Medio']
+
+
+def test_ignorado_requiere_pocos_rechazos():
+    # Sin elecciones pero con más rechazos que la media: no es un alumno ignorado
+    positivas = np.array([0, 0, 1, 3, 3, 1, 5, 4])
+    negativas = np.array([3, 5, 4, 0, 0, 5, 2, 0])
+    estatus, _, impacto = clasificar_estatus(positivas, negativas)
+    assert impacto[0] < -1
+    assert estatus[0] != 'Ignorado'
+
+
+def test_resumen():
+    resumen = resumen_metricas(calcular_metricas(matriz_votos(), NOMBRES))
+    assert resumen['alumnos'] == 5
+    assert resumen['pares_reciprocos'] == 2
+    assert resumen['rechazos_mutuos'] == 1
+    assert resumen['cohesion'] == 0.2
+    assert set(resumen['estatus']) == set(ESTATUS)
+    assert sum(resumen['estatus'].values()) == 5
+
+
+def test_csv_para_excel():
+    df = calcular_metricas(matriz_votos(), NOMBRES)
+    datos = metricas_a_csv(df)
+    assert datos.startswith(b'\xef\xbb\xbf')
+    leido = pd.read_csv(io.BytesIO(datos), sep=';', decimal=',', index_col=0, encoding='utf-8-sig')
+    assert list(leido.columns) == list(df.columns)
+    assert leido.loc['Ana', 'Expansividad'] == 0.5
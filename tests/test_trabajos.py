@@ -0,0 +1,59 @@
+import math
+import time
+
+import pytest
+
+from utils.trabajos import CADUCADO, CANCELADO, ERROR, TERMINADO, ColaTrabajos
+
+# Los trabajadores se arrancan con 'spawn': las funciones de los trabajos tienen que
+# poder importarse desde otro proceso, así que se usan funciones de la biblioteca estándar
+
+
+@pytest.fixture
+def cola():
+    with ColaTrabajos(procesos=1, timeout=60) as cola:
+        yield cola
+
+
+def test_resultado(cola):
+    trabajo = cola.resultado(cola.enviar(math.factorial, 10), espera=60)
+    assert trabajo.estado == TERMINADO
+    assert trabajo.resultado == 3628800
+
+
+def test_error(cola):
+    trabajo = cola.resultado(cola.enviar(math.factorial, -1), espera=60)
+    assert trabajo.estado == ERROR
+    assert 'ValueError' in trabajo.error
+
+
+def test_misma_clave_comparte_trabajo(cola):
+    primero = cola.enviar(time.sleep, 0.5, clave='3A')
+    assert cola.enviar(time.sleep, 0.5, clave='3A') == primero
+    assert cola.enviar(time.sleep, 0.5, clave='3B') != primero
+
+    # Terminado el trabajo, la misma clave vuelve a calcularse
+    assert cola.resultado(primero, espera=60).estado == TERMINADO
+    assert cola.enviar(time.sleep, 0.5, clave='3A') != primero
+
+
+def test_caduca_y_sustituye_al_trabajador(cola):
+    lento = cola.enviar(time.sleep, 30, timeout=1)
+    siguiente = cola.enviar(math.factorial, 5)
+    inicio = time.time()
+    trabajo = cola.resultado(lento, espera=30)
+    assert trabajo.estado == CADUCADO
+    assert time.time() - inicio < 20
+
+    # El trabajador nuevo atiende el resto de la cola
+    trabajo = cola.resultado(siguiente, espera=60)
+    assert trabajo.estado == TERMINADO
+    assert trabajo.resultado == 120
+
+
+def test_cancelar_pendiente(cola):
+    en_curso = cola.enviar(time.sleep, 1)
+    pendiente = cola.enviar(math.factorial, 5)
+    assert cola.cancelar(pendiente)
+    assert cola.resultado(pendiente, espera=1).estado == CANCELADO
+    assert cola.resultado(en_curso, espera=60).estado == TERMINADO
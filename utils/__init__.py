@@ -1 +1,31 @@
-from utils.utils import *
\ No newline at end of file
+# API pública del paquete. Las dependencias pesadas (matplotlib, seaborn, networkx,
+# scipy y reportlab) se importan dentro de cada etapa, no al importar el paquete
+from utils.utils import (
+    FIGURAS, FIGURAS_GRAFOS, ResultadoGraficos, generar_graficos, generar_graficos_progresivo, generar_graficos_bloques,
+    generar_informe, generar_informe_consolidado, completar_figuras
+)
+from utils.matriz import MatrizSociograma, parsear_matriz, validar_matriz
+from utils.binario import escribir_binario, leer_binario, csv_a_binario, binario_a_csv, cargar_matriz
+from utils.bloques import MatrizBloques, leer_csv_bloques
+from utils.atributos import AtributosAlumnos, leer_atributos, atributos_desde_tabla
+from utils.comunidades import METODOS_COMUNIDADES, detectar_comunidades
+from utils.metricas import calcular_metricas, metricas_aristas, resumen_metricas, metricas_a_csv
+from utils.longitudinal import SerieSociograma, EvolucionSociograma, alinear_matrices, analizar_evolucion
+from utils.interactivo import datos_grafo, html_grafo
+from utils.cache import CacheInformes, clave_cache
+from utils.trabajos import ColaTrabajos, Trabajo
+from utils.instrumentacion import Medicion
+
+__all__ = [
+    'FIGURAS', 'FIGURAS_GRAFOS', 'ResultadoGraficos', 'generar_graficos', 'generar_graficos_progresivo',
+    'generar_graficos_bloques', 'generar_informe', 'generar_informe_consolidado', 'completar_figuras',
+    'MatrizSociograma', 'parsear_matriz', 'validar_matriz',
+    'escribir_binario', 'leer_binario', 'csv_a_binario', 'binario_a_csv', 'cargar_matriz',
+    'MatrizBloques', 'leer_csv_bloques',
+    'AtributosAlumnos', 'leer_atributos', 'atributos_desde_tabla',
+    'METODOS_COMUNIDADES', 'detectar_comunidades',
+    'calcular_metricas', 'metricas_aristas', 'resumen_metricas', 'metricas_a_csv',
+    'SerieSociograma', 'EvolucionSociograma', 'alinear_matrices', 'analizar_evolucion',
+    'datos_grafo', 'html_grafo',
+    'CacheInformes', 'clave_cache', 'ColaTrabajos', 'Trabajo', 'Medicion',
+]
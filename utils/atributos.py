@@ -0,0 +1,124 @@
+import io
+import os
+import unicodedata
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+
+# Atributos de los alumnos (género, grupo o cualquier otra categoría). Se leen de un
+# fichero aparte (CSV o Excel con una fila por alumno) o de las columnas extra de la
+# propia matriz, y se guardan en una tabla indexada por alumno con columnas categóricas
+
+# Atributo que decide la forma y el color de los nodos, si está presente
+ATRIBUTO_ESTILO = 'genero'
+
+# Valor para los alumnos sin dato
+SIN_DATO = 'U'
+
+# Nombres aceptados para la columna de alumnos en el fichero de atributos
+COLUMNAS_ALUMNO = ('alumno', 'nombre', 'name', 'student')
+
+# Valores de género reconocidos (se comparan en minúsculas y sin tildes)
+VALORES_GENERO = {
+    'f': 'F', 'mujer': 'F', 'chica': 'F', 'nina': 'F', 'femenino': 'F', 'female': 'F', 'alumna': 'F',
+    'm': 'M', 'h': 'M', 'hombre': 'M', 'chico': 'M', 'nino': 'M', 'masculino': 'M', 'male': 'M',
+}
+
+
+def _normalizar_texto(texto):
+    texto = unicodedata.normalize('NFKD', str(texto).strip().lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+@dataclass
+class AtributosAlumnos:
+    tabla: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(index=pd.Index([], name='Alumno')))
+
+    @property
+    def columnas(self):
+        return list(self.tabla.columns)
+
+    def vacio(self):
+        return self.tabla.shape[1] == 0
+
+    def alinear(self, nombres):
+        # Una lista de valores por atributo, en el orden de 'nombres'; los alumnos que no
+        # aparecen en la tabla quedan sin dato
+        tabla = self.tabla.reindex(nombres)
+        return {columna: tabla[columna].astype(object).where(tabla[columna].notna(), SIN_DATO).tolist()
+                for columna in tabla.columns}
+
+    def atributo_estilo(self):
+        # Atributo que se usa para dar estilo a los nodos: el género si existe, si no el primero
+        if ATRIBUTO_ESTILO in self.tabla.columns:
+            return ATRIBUTO_ESTILO
+        return self.tabla.columns[0] if len(self.tabla.columns) else None
+
+    def __eq__(self, otro):
+        return isinstance(otro, AtributosAlumnos) and self.tabla.equals(otro.tabla)
+
+
+def _preparar_tabla(tabla):
+    tabla = tabla.copy()
+    tabla.index = tabla.index.astype(str).str.strip()
+    tabla.index.name = 'Alumno'
+    tabla = tabla[~tabla.index.duplicated(keep='first')]
+    tabla.columns = [_normalizar_texto(c) for c in tabla.columns]
+
+    for columna in tabla.columns:
+        valores = tabla[columna].astype('string').str.strip().replace('', pd.NA)
+        if columna == ATRIBUTO_ESTILO:
+            valores = valores.map(lambda v: VALORES_GENERO.get(_normalizar_texto(v), SIN_DATO), na_action='ignore')
+        tabla[columna] = valores.astype('category')
+    return tabla
+
+
+def atributos_desde_tabla(tabla):
+    # 'tabla' es un DataFrame con una fila por alumno, indexado por nombre o con una
+    # columna 'Alumno'/'Nombre'
+    columnas = {_normalizar_texto(c): c for c in tabla.columns}
+    for nombre in COLUMNAS_ALUMNO:
+        if nombre in columnas:
+            tabla = tabla.set_index(columnas[nombre])
+            break
+    return AtributosAlumnos(_preparar_tabla(tabla))
+
+
+def leer_atributos(origen, nombre=None):
+    # 'origen' es una ruta o los bytes del fichero; 'nombre' solo hace falta con bytes
+    # para saber si es un Excel
+    nombre = nombre or (origen if isinstance(origen, str) else '')
+    if isinstance(origen, bytes):
+        origen = io.BytesIO(origen)
+    if os.path.splitext(nombre)[1].lower() in ('.xlsx', '.xlsm'):
+        tabla = pd.read_excel(origen, dtype=str)
+    else:
+        tabla = pd.read_csv(origen, dtype=str, sep=None, engine='python')
+
+    # Sin columna de alumno reconocida, la primera columna es el nombre
+    if not any(_normalizar_texto(c) in COLUMNAS_ALUMNO for c in tabla.columns):
+        tabla = tabla.set_index(tabla.columns[0])
+    return atributos_desde_tabla(tabla)
+
+
+def separar_atributos(df):
+    # Las columnas de la matriz cuyo nombre no es un alumno (no aparece en las filas)
+    # son atributos: se separan de la matriz de votos
+    alumnos = set(df.index.astype(str).str.strip())
+    extra = [c for c in df.columns if str(c).strip() not in alumnos]
+    if not extra:
+        return df, AtributosAlumnos()
+    return df.drop(columns=extra), AtributosAlumnos(_preparar_tabla(df[extra]))
+
+
+def combinar_atributos(*atributos):
+    # Los primeros tienen prioridad: se completan con los siguientes alumno a alumno
+    tablas = [a.tabla for a in atributos if a is not None and not a.vacio()]
+    if not tablas:
+        return AtributosAlumnos()
+    tabla = tablas[0].astype(object)
+    for otra in tablas[1:]:
+        tabla = tabla.combine_first(otra.astype(object))
+    return AtributosAlumnos(tabla.astype('category'))
+
@@ -0,0 +1,172 @@
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .matriz import CODIGOS, DESCONOCIDO, MatrizSociograma, categorias_codigos, parsear_matriz
+from .atributos import AtributosAlumnos, separar_atributos, atributos_desde_tabla
+
+
+# Formato binario de una matriz ya parseada (.sgm), para no volver a leer y mapear el
+# CSV en cada ejecución. Un único fichero:
+#   - 8 bytes mágicos y la longitud de la cabecera (uint64, little endian)
+#   - cabecera JSON: nombres, tabla de códigos, códigos desconocidos, atributos,
+#     metadatos libres y la posición de cada array
+#   - arrays sin comprimir, alineados a 64 bytes: puntuaciones (float32, n x n) y
+#     categorías de los códigos (uint8, n x n)
+# Los arrays se proyectan en memoria (np.memmap) y se usan sin copiarlos
+
+MAGICO = b'SGRM\x00\x01\x00\x00'
+EXTENSION = '.sgm'
+ALINEACION = 64
+
+
+def _alinear(posicion):
+    return -(-posicion // ALINEACION) * ALINEACION
+
+
+def escribir_binario(matriz, destino, atributos=None, metadatos=None):
+    codigos = matriz.codigos if matriz.codigos is not None else parsear_matriz(
+        pd.DataFrame(matriz.anotaciones, index=matriz.nombres, columns=matriz.nombres)).codigos
+    arrays = {
+        'valores': np.ascontiguousarray(matriz.valores, dtype='<f4'),
+        'codigos': np.ascontiguousarray(codigos, dtype=np.uint8),
+    }
+    atributos = atributos.alinear(matriz.nombres) if atributos is not None and not atributos.vacio() else {}
+
+    # Calculamos las posiciones con una cabecera provisional y reservamos hueco de sobra
+    cabecera = {
+        'version': 1,
+        'n': matriz.n,
+        'nombres': list(matriz.nombres),
+        'codigos': list(CODIGOS),
+        'desconocidos': [list(d) for d in matriz.desconocidos],
+        'atributos': atributos,
+        'metadatos': metadatos or {},
+        'arrays': {},
+    }
+    texto = json.dumps(cabecera, ensure_ascii=False).encode('utf-8')
+    posicion = _alinear(len(MAGICO) + 8 + len(texto) + 256 * len(arrays))
+    for nombre, array in arrays.items():
+        cabecera['arrays'][nombre] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': posicion}
+        posicion = _alinear(posicion + array.nbytes)
+    texto = json.dumps(cabecera, ensure_ascii=False).encode('utf-8')
+
+    with open(destino, 'wb') if isinstance(destino, (str, os.PathLike)) else _no_cerrar(destino) as f:
+        f.write(MAGICO)
+        f.write(np.uint64(len(texto)).tobytes())
+        f.write(texto)
+        for nombre, array in arrays.items():
+            f.write(b'\0' * (cabecera['arrays'][nombre]['offset'] - f.tell()))
+            f.write(array.tobytes())
+
+
+class _no_cerrar:
+    # Permite usar un buffer ya abierto en el mismo 'with' que un fichero
+    def __init__(self, f):
+        self.f = f
+
+    def __enter__(self):
+        return self.f
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _leer_cabecera(datos):
+    if bytes(datos[:len(MAGICO)]) != MAGICO:
+        raise ValueError('El fichero no es una matriz de sociograma en formato binario')
+    longitud = int(np.frombuffer(datos[len(MAGICO):len(MAGICO) + 8], dtype='<u8')[0])
+    inicio = len(MAGICO) + 8
+    return json.loads(bytes(datos[inicio:inicio + longitud]).decode('utf-8'))
+
+
+def leer_binario(origen):
+    # 'origen' es una ruta (se proyecta en memoria, sin copias) o los bytes del fichero.
+    # Devuelve la matriz, los atributos y los metadatos
+    if isinstance(origen, (str, os.PathLike)):
+        datos = np.memmap(origen, dtype=np.uint8, mode='r')
+    else:
+        datos = np.frombuffer(origen, dtype=np.uint8)
+    cabecera = _leer_cabecera(datos)
+
+    arrays = {}
+    for nombre, info in cabecera['arrays'].items():
+        dtype = np.dtype(info['dtype'])
+        tamano = dtype.itemsize * int(np.prod(info['shape']))
+        arrays[nombre] = datos[info['offset']:info['offset'] + tamano].view(dtype).reshape(info['shape'])
+
+    # Solo se guardan las categorías (proyectadas, sin copia): los textos de los códigos se
+    # forman con MatrizSociograma.textos para las celdas que se anotan
+    nombres = cabecera['nombres']
+    codigos = arrays['codigos']
+    if list(cabecera['codigos']) != list(CODIGOS):
+        # Fichero escrito con otra tabla de códigos: sus categorías se traducen a la actual
+        indices = categorias_codigos(np.array(cabecera['codigos'], dtype=object))
+        traduccion = np.full(DESCONOCIDO + 1, DESCONOCIDO, dtype=np.uint8)
+        traduccion[:len(indices)] = np.where(indices < 0, DESCONOCIDO, indices)
+        codigos = traduccion[codigos]
+    desconocidos = [tuple(d) for d in cabecera['desconocidos']]
+    matriz = MatrizSociograma(nombres, arrays['valores'], None, desconocidos, codigos)
+    atributos = (atributos_desde_tabla(pd.DataFrame(cabecera['atributos'], index=nombres))
+                 if cabecera['atributos'] else AtributosAlumnos())
+    return matriz, atributos, cabecera['metadatos']
+
+
+def leer_metadatos(origen):
+    # Solo la cabecera: los metadatos sin proyectar los arrays
+    datos = np.memmap(origen, dtype=np.uint8, mode='r') if isinstance(origen, (str, os.PathLike)) \
+        else np.frombuffer(origen, dtype=np.uint8)
+    return _leer_cabecera(datos)['metadatos']
+
+
+def binario_a_bytes(matriz, atributos=None, metadatos=None):
+    buffer = io.BytesIO()
+    escribir_binario(matriz, buffer, atributos, metadatos)
+    return buffer.getvalue()
+
+
+####################################################################################################################
+#------------------------------------Conversión desde y hacia CSV--------------------------------------------------#
+####################################################################################################################
+
+def csv_a_binario(ruta_csv, ruta_binaria=None):
+    ruta_binaria = ruta_binaria or os.path.splitext(ruta_csv)[0] + EXTENSION
+    df = pd.read_csv(ruta_csv, index_col=0, dtype=str)
+    df, atributos = separar_atributos(df)
+    matriz = parsear_matriz(df)
+    escribir_binario(matriz, ruta_binaria, atributos, {'origen': os.path.basename(ruta_csv)})
+    return ruta_binaria
+
+
+def binario_a_dataframe(matriz, atributos=None):
+    # Misma disposición que Sociograma.csv: alumnos en filas y columnas, celdas vacías
+    # donde no hay voto y, al final, las columnas de atributos si las hay
+    df = pd.DataFrame(matriz.textos(), index=matriz.nombres, columns=matriz.nombres)
+    if atributos is not None and not atributos.vacio():
+        for columna, valores in atributos.alinear(matriz.nombres).items():
+            df[columna] = valores
+    return df
+
+
+def binario_a_csv(ruta_binaria, ruta_csv=None):
+    ruta_csv = ruta_csv or os.path.splitext(ruta_binaria)[0] + '.csv'
+    matriz, atributos, _ = leer_binario(ruta_binaria)
+    binario_a_dataframe(matriz, atributos).to_csv(ruta_csv)
+    return ruta_csv
+
+
+def cargar_matriz(ruta_csv, directorio=None):
+    # Lee la matriz de un CSV pasando por su versión binaria: si existe y es más reciente
+    # que el CSV se usa directamente; si no, se parsea el CSV y se guarda para la próxima vez
+    directorio = directorio or os.path.dirname(ruta_csv)
+    ruta_binaria = os.path.join(directorio, os.path.splitext(os.path.basename(ruta_csv))[0] + EXTENSION)
+    if not (os.path.exists(ruta_binaria) and os.path.getmtime(ruta_binaria) >= os.path.getmtime(ruta_csv)):
+        # Se escribe aparte y se renombra: otro proceso nunca ve un fichero a medias
+        os.makedirs(directorio, exist_ok=True)
+        temporal = f'{ruta_binaria}.{os.getpid()}.tmp'
+        csv_a_binario(ruta_csv, temporal)
+        os.replace(temporal, ruta_binaria)
+    return leer_binario(ruta_binaria)
@@ -0,0 +1,191 @@
+import io
+import os
+import tempfile
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .matriz import CODIGOS, DESCONOCIDO, VALORES, categorias_codigos
+from .atributos import AtributosAlumnos, _preparar_tabla
+
+
+# Lectura por bloques de matrices muy grandes (un centro entero, miles de alumnos). La
+# matriz de textos nunca se carga completa: el CSV se lee en bloques de filas, cada bloque
+# se convierte a categorías uint8 (índice en CODIGOS) y se descarta. Mientras se lee se
+# acumulan el sumatorio de cada alumno y la lista de aristas (votos distintos de 0), que
+# es lo que necesitan las métricas, los grafos y los grupos de afinidad. La matriz de
+# categorías (n x n bytes) puede ir a un np.memmap en disco
+
+# Celdas de texto por bloque: el número de filas se ajusta al ancho de la matriz
+CELDAS_BLOQUE = 1_000_000
+
+# A partir de este número de alumnos la aplicación y el lote leen siempre por bloques
+UMBRAL_BLOQUES = 1000
+
+# Lado máximo (en celdas) del heatmap de una matriz leída por bloques
+LADO_HEATMAP = 1200
+
+# Puntuación de cada categoría, con las que no corresponden a ningún código a 0
+VALORES_CATEGORIAS = np.zeros(DESCONOCIDO + 1, dtype=np.float32)
+VALORES_CATEGORIAS[:len(VALORES)] = VALORES
+
+
+@dataclass
+class MatrizBloques:
+    nombres: list               # alumnos en el orden de filas y columnas
+    codigos: np.ndarray         # categoría uint8 de cada celda (fila = votado, columna = votante)
+    sumatorio_filas: np.ndarray  # puntuación total recibida por cada alumno (float64)
+    origen: np.ndarray          # aristas en formato COO: índice del votante
+    destino: np.ndarray         # índice del votado
+    pesos: np.ndarray           # puntuación del voto (float32)
+    desconocidos: list = field(default_factory=list)  # (votado, votante, código)
+    atributos: AtributosAlumnos = None                # columnas extra de la matriz
+
+    @property
+    def n(self):
+        return len(self.nombres)
+
+    def sumatorio(self):
+        return self.sumatorio_filas
+
+    def valores_filas(self, filas):
+        # Puntuaciones float32 de un bloque de filas (un slice o un array de índices)
+        return VALORES_CATEGORIAS[self.codigos[filas]]
+
+    def valores_dispersos(self):
+        # Matriz de puntuaciones dispersa (fila = votado, columna = votante) para los
+        # grupos de afinidad
+        from scipy.sparse import csr_matrix
+
+        return csr_matrix((self.pesos, (self.destino, self.origen)), shape=(self.n, self.n))
+
+
+def _filas_bloque(columnas, filas_bloque):
+    return filas_bloque or max(1, CELDAS_BLOQUE // max(columnas, 1))
+
+
+def _reabrir(origen):
+    # Las rutas se vuelven a abrir en cada pasada; los buffers se rebobinan
+    if isinstance(origen, (str, os.PathLike)):
+        return origen
+    if isinstance(origen, (bytes, bytearray, memoryview)):
+        return io.BytesIO(origen)
+    origen.seek(0)
+    return origen
+
+
+def _categorias(textos):
+    # Categoría de cada texto. La mayoría de celdas son códigos exactos o vacías; solo
+    # las demás se limpian (espacios alrededor) antes de darlas por desconocidas
+    categorias = categorias_codigos(textos).astype(np.int16)
+    categorias[pd.isna(textos)] = CODIGOS.index('')
+    fallos = np.flatnonzero(categorias < 0)
+    limpios = pd.Series(textos[fallos], dtype=object).fillna('').astype(str).str.strip().to_numpy(dtype=object)
+    categorias[fallos] = categorias_codigos(limpios)
+    return categorias, fallos, limpios
+
+
+def usar_bloques(origen):
+    # Solo se lee la cabecera
+    return len(pd.read_csv(_reabrir(origen), index_col=0, nrows=0).columns) > UMBRAL_BLOQUES
+
+
+def leer_csv_bloques(origen, filas_bloque=None, directorio=None):
+    # 'origen' es una ruta, los bytes del CSV o un buffer. Con 'directorio' la matriz de
+    # categorías se guarda en un np.memmap dentro de él en lugar de en memoria
+    # Primera pasada: solo la columna de nombres, para conocer los alumnos y separar las
+    # columnas de atributos antes de leer ningún voto
+    nombres = [str(n).strip() for n in
+               pd.read_csv(_reabrir(origen), usecols=[0], dtype=str, keep_default_na=False).iloc[:, 0]]
+    columnas = [str(c).strip() for c in pd.read_csv(_reabrir(origen), index_col=0, nrows=0).columns]
+    n = len(nombres)
+
+    posicion = {alumno: i for i, alumno in enumerate(nombres)}
+    de_alumnos = [i for i, c in enumerate(columnas) if c in posicion]
+    extra = [i for i, c in enumerate(columnas) if c not in posicion]
+    if sorted(nombres) != sorted(columnas[i] for i in de_alumnos):
+        raise ValueError("Las filas y las columnas de la matriz no contienen los mismos alumnos")
+    # Cada columna de votos va a la posición de su alumno en el orden de las filas
+    destino_columnas = np.array([posicion[columnas[i]] for i in de_alumnos], dtype=np.intp)
+
+    if directorio is not None:
+        os.makedirs(directorio, exist_ok=True)
+        # Fichero anónimo: el sistema lo borra al liberar la matriz
+        codigos = np.memmap(tempfile.TemporaryFile(dir=directorio), dtype=np.uint8, mode='w+', shape=(n, n))
+    else:
+        codigos = np.empty((n, n), dtype=np.uint8)
+    sumatorio = np.zeros(n, dtype=np.float64)
+    origenes, destinos, pesos, desconocidos, tablas_extra = [], [], [], [], []
+
+    # Segunda pasada: bloques de filas, de texto a categorías
+    inicio = 0
+    # Como objetos (los textos tal cual del lector de CSV): ahorra convertir cada columna
+    lector = pd.read_csv(_reabrir(origen), index_col=0, dtype=object,
+                         chunksize=_filas_bloque(len(columnas), filas_bloque))
+    for bloque in lector:
+        fin = inicio + len(bloque)
+        if extra:
+            tablas_extra.append(bloque.iloc[:, extra])
+        textos = bloque.iloc[:, de_alumnos].to_numpy(dtype=object).ravel()
+        categorias, fallos, limpios = _categorias(textos)
+
+        # Los códigos desconocidos se registran con su celda y puntúan 0
+        for k in np.flatnonzero(categorias[fallos] < 0):
+            fila, columna = divmod(int(fallos[k]), len(de_alumnos))
+            desconocidos.append((nombres[inicio + fila], columnas[de_alumnos[columna]], limpios[k]))
+        categorias = np.where(categorias < 0, DESCONOCIDO, categorias).astype(np.uint8)
+        categorias = categorias.reshape(len(bloque), len(de_alumnos))
+
+        bloque_codigos = np.empty((len(bloque), n), dtype=np.uint8)
+        bloque_codigos[:, destino_columnas] = categorias
+        codigos[inicio:fin] = bloque_codigos
+
+        # Acumulados del bloque: sumatorio de cada fila y aristas (votante -> votado)
+        valores = VALORES_CATEGORIAS[bloque_codigos]
+        sumatorio[inicio:fin] = valores.sum(axis=1, dtype=np.float64)
+        votados, votantes = np.nonzero(valores)
+        origenes.append(votantes.astype(np.int32))
+        destinos.append((votados + inicio).astype(np.int32))
+        pesos.append(valores[votados, votantes])
+        inicio = fin
+
+    if inicio != n:
+        raise ValueError("El CSV ha cambiado entre las dos lecturas")
+    if isinstance(codigos, np.memmap):
+        codigos.flush()
+
+    atributos = AtributosAlumnos()
+    if extra:
+        tabla = pd.concat(tablas_extra)
+        tabla.index = nombres
+        tabla.columns = [columnas[i] for i in extra]
+        atributos = AtributosAlumnos(_preparar_tabla(tabla))
+
+    vacio = [np.empty(0, dtype=np.int32)]
+    return MatrizBloques(
+        nombres=nombres,
+        codigos=codigos,
+        sumatorio_filas=sumatorio,
+        origen=np.concatenate(origenes or vacio),
+        destino=np.concatenate(destinos or vacio),
+        pesos=np.concatenate(pesos or [np.empty(0, dtype=np.float32)]),
+        desconocidos=desconocidos,
+        atributos=atributos
+    )
+
+
+def heatmap_reducido(matriz, orden, lado_maximo=LADO_HEATMAP):
+    # Matriz de puntuaciones ordenada (filas y columnas según 'orden') y reducida a como
+    # mucho lado_maximo x lado_maximo celdas, con la media de cada bloque de alumnos.
+    # Se recorre por bloques de filas: nunca se forma la matriz n x n de puntuaciones
+    n = matriz.n
+    cortes = np.linspace(0, n, min(n, lado_maximo) + 1).astype(np.intp)
+    tamanos = np.diff(cortes)
+    columnas = np.repeat(np.arange(len(tamanos)), tamanos)
+
+    reducida = np.empty((len(tamanos), len(tamanos)), dtype=np.float32)
+    for k, (a, b) in enumerate(zip(cortes[:-1], cortes[1:])):
+        filas = matriz.valores_filas(np.sort(orden[a:b]))[:, orden].sum(axis=0, dtype=np.float64)
+        reducida[k] = np.bincount(columnas, weights=filas, minlength=len(tamanos)) / (tamanos * (b - a))
+    return reducida
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def clave_cache(datos, **opciones):
+    # Clave por contenido: hash de los bytes subidos más las opciones de renderizado
+    h = hashlib.sha256(datos)
+    h.update(repr(sorted(opciones.items())).encode())
+    return h.hexdigest()
+
+
+class CacheInformes:
+    # Caché en dos niveles: LRU en memoria limitada por bytes y, opcionalmente,
+    # un directorio en disco con su propio límite (se expulsan los más antiguos)
+
+    def __init__(self, max_bytes_memoria=256 * 2**20, directorio=None, max_bytes_disco=2 * 2**30):
+        self.max_bytes_memoria = max_bytes_memoria
+        self.directorio = directorio
+        self.max_bytes_disco = max_bytes_disco
+        self._memoria = OrderedDict()
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    def obtener(self, clave):
+        with self._lock:
+            datos = self._memoria.get(clave)
+            if datos is not None:
+                self._memoria.move_to_end(clave)
+
+        if datos is None:
+            datos = self._leer_disco(clave)
+            if datos is None:
+                return None
+            self._guardar_memoria(clave, datos)
+
+        return pickle.loads(datos)
+
+    def guardar(self, clave, valor):
+        datos = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        self._guardar_memoria(clave, datos)
+        self._escribir_disco(clave, datos)
+
+    def _guardar_memoria(self, clave, datos):
+        if len(datos) > self.max_bytes_memoria:
+            return
+        with self._lock:
+            anterior = self._memoria.pop(clave, None)
+            if anterior is not None:
+                self._bytes_memoria -= len(anterior)
+            self._memoria[clave] = datos
+            self._bytes_memoria += len(datos)
+            while self._bytes_memoria > self.max_bytes_memoria:
+                _, expulsado = self._memoria.popitem(last=False)
+                self._bytes_memoria -= len(expulsado)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f'{clave}.pkl')
+
+    def _leer_disco(self, clave):
+        if not self.directorio:
+            return None
+        try:
+            with open(self._ruta(clave), 'rb') as f:
+                datos = f.read()
+            # Marcamos el acceso para que la expulsión sea LRU también en disco
+            os.utime(self._ruta(clave))
+        except OSError:
+            return None
+        return datos
+
+    def _escribir_disco(self, clave, datos):
+        if not self.directorio:
+            return
+        # Un temporal propio por escritura: varias sesiones (hilos del mismo proceso) pueden
+        # guardar la misma clave a la vez; la última en renombrar gana
+        descriptor, temporal = tempfile.mkstemp(dir=self.directorio, prefix=f'{clave}.', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                f.write(datos)
+            os.replace(temporal, self._ruta(clave))
+        except BaseException:
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            raise
+        self._expulsar_disco()
+
+    def _expulsar_disco(self):
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith('.pkl'):
+                continue
+            try:
+                info = os.stat(os.path.join(self.directorio, nombre))
+            except OSError:
+                continue
+            entradas.append((info.st_mtime, info.st_size, nombre))
+
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, nombre in sorted(entradas):
+            if total <= self.max_bytes_disco:
+                break
+            try:
+                os.remove(os.path.join(self.directorio, nombre))
+            except OSError:
+                pass
+            total -= tamano
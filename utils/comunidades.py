@@ -0,0 +1,213 @@
+import numpy as np
+
+
+# Detección de grupos de afinidad sobre los votos positivos. Todos los métodos
+# reciben la matriz numérica (fila = votado, columna = votante), densa o dispersa, y
+# devuelven una etiqueta por alumno, con los grupos numerados de mayor a menor tamaño.
+# Trabajan sobre matrices dispersas de scipy, sin construir grafos de networkx:
+#   - 'louvain':   maximización de modularidad (Louvain) con movimientos en bloque
+#   - 'espectral': agrupamiento espectral, con el número de grupos según el salto de autovalores
+#   - 'fuertes':   componentes fuertemente conexas (comportamiento original)
+
+METODO_COMUNIDADES = 'louvain'
+
+MAX_ITERACIONES = 100         # iteraciones de movimientos por nivel de Louvain
+MAX_NIVELES = 10              # agregaciones de Louvain
+MAX_GRUPOS_ESPECTRAL = 20
+
+
+def _afinidad(valores):
+    # Grafo no dirigido de afinidad: peso de i a j más peso de j a i (solo votos > 0)
+    from scipy.sparse import csr_matrix, issparse
+
+    if issparse(valores):
+        positivos = csr_matrix(valores, dtype=np.float64).maximum(0)
+    else:
+        positivos = csr_matrix(np.maximum(np.asarray(valores, dtype=np.float64), 0))
+    positivos.setdiag(0)
+    positivos.eliminate_zeros()
+    return (positivos + positivos.T).tocsr()
+
+
+def _pertenencia(etiquetas, n_grupos):
+    from scipy.sparse import csr_matrix
+
+    n = len(etiquetas)
+    return csr_matrix((np.ones(n), (np.arange(n), etiquetas)), shape=(n, n_grupos))
+
+
+def _ordenar_por_tamano(etiquetas):
+    # Grupos renumerados de mayor a menor tamaño (a igual tamaño, por su primer alumno)
+    _, primero, etiquetas, tamanos = np.unique(etiquetas, return_index=True, return_inverse=True, return_counts=True)
+    orden = np.lexsort((primero, -tamanos))
+    rango = np.empty_like(orden)
+    rango[orden] = np.arange(len(orden))
+    return rango[etiquetas]
+
+
+def modularidad(W, etiquetas):
+    total = W.sum()
+    if total == 0:
+        return 0.0
+    n_grupos = etiquetas.max() + 1
+    coo = W.tocoo()
+    dentro = etiquetas[coo.row] == etiquetas[coo.col]
+    interno = np.bincount(etiquetas[coo.row[dentro]], weights=coo.data[dentro], minlength=n_grupos)
+    grados = np.bincount(etiquetas, weights=np.asarray(W.sum(axis=1)).ravel(), minlength=n_grupos)
+    return float((interno / total - (grados / total) ** 2).sum())
+
+
+def _mover_nodos(W, rng):
+    # Fase local de Louvain. En lugar de recorrer los nodos uno a uno, en cada iteración
+    # se calcula a la vez la ganancia de modularidad de llevar cada nodo a cada grupo
+    # vecino y se mueve una fracción aleatoria de los que mejoran. Si la modularidad
+    # empeora (movimientos simultáneos incompatibles), se deshace y se reduce la fracción
+    n = W.shape[0]
+    total = W.sum()
+    grados = np.asarray(W.sum(axis=1)).ravel()
+    sin_bucles = W.copy()
+    sin_bucles.setdiag(0)
+    sin_bucles.eliminate_zeros()
+
+    etiquetas = np.arange(n)
+    calidad = modularidad(W, etiquetas)
+    fraccion = 0.5
+
+    for _ in range(MAX_ITERACIONES):
+        peso_grupo = np.bincount(etiquetas, weights=grados, minlength=n)
+        hacia_grupos = (sin_bucles @ _pertenencia(etiquetas, n)).tocsr()
+        hacia_grupos.sort_indices()
+
+        cuentas = np.diff(hacia_grupos.indptr)
+        filas = np.repeat(np.arange(n), cuentas)
+        grupos = hacia_grupos.indices
+        propio = grupos == etiquetas[filas]
+
+        # Ganancia (salvo el factor común 2 / total) de quedarse en el grupo actual y de
+        # pasar a cada grupo vecino
+        quedarse = -grados * (peso_grupo[etiquetas] - grados) / total
+        quedarse[filas[propio]] += hacia_grupos.data[propio]
+        ganancia = hacia_grupos.data - grados[filas] * peso_grupo[grupos] / total
+        ganancia[propio] = -np.inf
+
+        con_vecinos = np.flatnonzero(cuentas)
+        if len(con_vecinos) == 0:
+            break
+        mejor = np.maximum.reduceat(ganancia, hacia_grupos.indptr[con_vecinos])
+
+        # Primer grupo con la ganancia máxima de cada nodo
+        posiciones = np.flatnonzero(ganancia == np.repeat(mejor, cuentas[con_vecinos]))
+        nodos, primera = np.unique(filas[posiciones], return_index=True)
+        destino = etiquetas.copy()
+        destino[nodos] = grupos[posiciones[primera]]
+
+        candidatos = con_vecinos[mejor > quedarse[con_vecinos] + 1e-12]
+        if len(candidatos) == 0:
+            break
+        mueven = candidatos[rng.random(len(candidatos)) < fraccion]
+        if len(mueven) == 0:
+            continue
+
+        nuevas = etiquetas.copy()
+        nuevas[mueven] = destino[mueven]
+        nueva_calidad = modularidad(W, nuevas)
+        if nueva_calidad > calidad + 1e-12:
+            etiquetas, calidad = nuevas, nueva_calidad
+        else:
+            fraccion /= 2
+            if fraccion < 0.01:
+                break
+
+    return np.unique(etiquetas, return_inverse=True)[1]
+
+
+def comunidades_louvain(valores, seed=42):
+    W = _afinidad(valores)
+    if W.shape[0] == 0:
+        return np.array([], dtype=int)
+    # Sin votos positivos no hay modularidad que optimizar: cada alumno es su propio grupo
+    if W.nnz == 0:
+        return np.arange(W.shape[0])
+    rng = np.random.default_rng(seed)
+    etiquetas = np.arange(W.shape[0])
+
+    for _ in range(MAX_NIVELES):
+        nivel = _mover_nodos(W, rng)
+        if nivel.max() + 1 == W.shape[0]:
+            break
+        # Agregamos cada grupo en un nodo y repetimos sobre el grafo reducido
+        etiquetas = nivel[etiquetas]
+        M = _pertenencia(nivel, nivel.max() + 1)
+        W = (M.T @ W @ M).tocsr()
+
+    return _ordenar_por_tamano(etiquetas)
+
+
+def comunidades_espectrales(valores, seed=42):
+    from scipy.sparse import diags
+    from scipy.sparse.linalg import eigsh
+    from scipy.cluster.vq import kmeans2
+
+    W = _afinidad(valores)
+    n = W.shape[0]
+    grados = np.asarray(W.sum(axis=1)).ravel()
+    conectados = np.flatnonzero(grados > 0)
+    etiquetas = np.arange(n) + n          # los alumnos sin afinidad quedan solos
+    if len(conectados) < 3:
+        etiquetas[conectados] = 0
+        return _ordenar_por_tamano(etiquetas)
+
+    # Adyacencia normalizada D^-1/2 W D^-1/2 de los alumnos con algún voto positivo
+    W = W[conectados][:, conectados]
+    inversa = diags(1 / np.sqrt(grados[conectados]))
+    normalizada = inversa @ W @ inversa
+
+    k = min(MAX_GRUPOS_ESPECTRAL + 1, len(conectados) - 1)
+    if len(conectados) <= 2 * k + 1:
+        autovalores, autovectores = np.linalg.eigh(normalizada.toarray())
+        autovalores, autovectores = autovalores[-k:], autovectores[:, -k:]
+    else:
+        v0 = np.full(len(conectados), 1 / np.sqrt(len(conectados)))
+        autovalores, autovectores = eigsh(normalizada, k=k, which='LA', v0=v0)
+    orden = np.argsort(-autovalores)
+    autovalores, autovectores = autovalores[orden], autovectores[:, orden]
+
+    # Número de grupos: mayor salto entre autovalores consecutivos, a partir del segundo
+    # (el primero es siempre 1 y su salto solo separa las componentes conexas)
+    saltos = -np.diff(autovalores)
+    grupos = int(np.argmax(saltos[1:])) + 2 if len(saltos) > 1 else 1
+    incrustacion = autovectores[:, :grupos]
+    incrustacion /= np.maximum(np.linalg.norm(incrustacion, axis=1, keepdims=True), 1e-12)
+
+    if grupos == 1:
+        etiquetas[conectados] = 0
+    else:
+        _, etiquetas[conectados] = kmeans2(incrustacion, grupos, minit='++', seed=seed)
+    return _ordenar_por_tamano(etiquetas)
+
+
+def componentes_fuertes(valores, seed=None):
+    from scipy.sparse import csr_matrix, issparse
+    from scipy.sparse.csgraph import connected_components
+
+    adyacencia = csr_matrix(valores.T > 0) if issparse(valores) else csr_matrix(np.asarray(valores).T > 0)
+    _, etiquetas = connected_components(adyacencia, directed=True, connection='strong')
+    return _ordenar_por_tamano(etiquetas)
+
+
+METODOS_COMUNIDADES = {
+    'louvain': comunidades_louvain,
+    'espectral': comunidades_espectrales,
+    'fuertes': componentes_fuertes,
+}
+
+
+def detectar_comunidades(valores, metodo=METODO_COMUNIDADES, seed=42):
+    # 'metodo' puede ser el nombre de uno de los métodos registrados o cualquier función
+    # (valores, seed) -> etiquetas
+    if callable(metodo):
+        return _ordenar_por_tamano(np.asarray(metodo(valores, seed)))
+    if metodo not in METODOS_COMUNIDADES:
+        raise ValueError(f"Método de comunidades desconocido: {metodo!r}. "
+                         f"Opciones: {', '.join(METODOS_COMUNIDADES)}")
+    return METODOS_COMUNIDADES[metodo](valores, seed=seed)
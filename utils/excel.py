@@ -0,0 +1,77 @@
+import io
+import re
+import zipfile
+
+import pandas as pd
+
+
+# Lectura de libros Excel con una matriz por hoja (una hoja por clase). El libro se abre
+# en modo de solo lectura de openpyxl: las hojas se leen fila a fila bajo demanda y
+# solo la hoja en curso está en memoria
+
+
+def _abrir_libro(origen):
+    from openpyxl import load_workbook
+
+    if isinstance(origen, bytes):
+        origen = io.BytesIO(origen)
+    return load_workbook(origen, read_only=True, data_only=True)
+
+
+def _celda_a_texto(valor):
+    # Las celdas numéricas llegan como int/float (3, -1.0); los códigos con '!' como texto
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    texto = str(valor).strip()
+    return texto or None
+
+
+def listar_hojas(origen):
+    libro = _abrir_libro(origen)
+    try:
+        return list(libro.sheetnames)
+    finally:
+        libro.close()
+
+
+def _hoja_a_dataframe(hoja):
+    filas = hoja.iter_rows(values_only=True)
+    cabecera = next(filas, None)
+    if cabecera is None:
+        return None
+    columnas = [_celda_a_texto(c) for c in cabecera[1:]]
+
+    nombres, datos = [], []
+    for fila in filas:
+        nombre = _celda_a_texto(fila[0]) if fila else None
+        if nombre is None:
+            continue
+        nombres.append(nombre)
+        datos.append([_celda_a_texto(v) for v in fila[1:len(columnas) + 1]])
+
+    # Quitamos las columnas sin cabecera (celdas sueltas a la derecha de la matriz)
+    df = pd.DataFrame(datos, index=nombres, columns=columnas, dtype=object)
+    return df.loc[:, [c is not None for c in columnas]]
+
+
+def leer_hoja(origen, nombre):
+    libro = _abrir_libro(origen)
+    try:
+        return _hoja_a_dataframe(libro[nombre])
+    finally:
+        libro.close()
+
+
+def nombre_fichero(texto):
+    return re.sub(r'[^\w\-. ]+', '_', str(texto)).strip() or 'clase'
+
+
+def crear_zip(informes):
+    # 'informes' son pares (nombre de la clase, PDF en bytes)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zip_informes:
+        for clase, informe in informes:
+            zip_informes.writestr(f'Informe_{nombre_fichero(clase)}.pdf', informe)
+    return buffer.getvalue()
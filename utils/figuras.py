@@ -0,0 +1,679 @@
+import io
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+import networkx as nx
+import matplotlib
+from matplotlib.artist import Artist
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.lines import Line2D
+from matplotlib.patches import Polygon, Circle
+from matplotlib.transforms import IdentityTransform
+from scipy.spatial import ConvexHull
+
+from .matriz import UMBRAL_ANOTACIONES, agregar_por_grupos
+from .instrumentacion import Medicion
+
+import warnings
+warnings.filterwarnings("ignore")
+
+
+# Cada figura se dibuja con la API orientada a objetos sobre un lienzo Agg propio,
+# sin tocar el estado global de pyplot, para poder renderizarlas en paralelo
+
+def _nueva_figura(figsize):
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots()
+
+
+def _figura_a_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+####################################################################################################################
+#------------------------------------Dibujamos el heatmap----------------------------------------------------------#
+####################################################################################################################
+
+# Para cohortes grandes el heatmap con una anotación por celda no escala (n² textos
+# y un lienzo de n * 0.6 pulgadas): por encima de UMBRAL_ANOTACIONES (utils.matriz) se
+# dibuja como imagen
+LADO_MAXIMO = 24          # lado máximo del lienzo en pulgadas
+UMBRAL_ETIQUETAS = 150    # por encima, no se rotulan todos los alumnos en los ejes
+
+
+def figura_heatmap(df_plot, df_numerico_plot, grupos=None):
+    titulo = 'Sociograma ordenado por votos recibidos'
+    ejes = ('Alumno votante', 'Alumno votado')
+    if grupos is not None:
+        df_plot, df_numerico_plot = _heatmap_agregado(df_numerico_plot, grupos)
+        titulo = 'Sociograma agregado por subgrupos (media de votos)'
+        ejes = ('Grupo votante', 'Grupo votado')
+
+    n = len(df_numerico_plot)
+    if n > UMBRAL_ANOTACIONES or df_plot is None:
+        png = _heatmap_raster(df_numerico_plot, titulo, ejes)
+        print('Matriz generada')
+        return png
+
+    lado = n * 0.6 if grupos is None else max(n * 0.6, 8)
+
+    # Paleta y estilo
+    with sns.axes_style('white'), sns.plotting_context(font_scale=1.1):
+        fig, ax = _nueva_figura((lado, lado))
+
+        sns.heatmap(
+            df_numerico_plot,
+            annot=df_plot,        # Metemos los valores originales, no los numéricos
+            cmap='RdYlGn',
+            vmin=-3, vmax=3, center=0,
+            fmt='',
+            linewidths=0.3,
+            linecolor='white',
+            square=True,
+            cbar_kws={
+                'label': 'Puntuación ajustada (Rojo → Verde)',
+                'shrink': 0.85,
+                'pad': 0.02
+            },
+            annot_kws={
+                'fontsize': 11,
+                'weight': 'bold',
+                'color': 'black'
+            },
+            ax=ax
+        )
+
+        # Estética general
+        ax.set_title(titulo, fontsize=16, pad=20, weight='bold')
+        ax.set_xlabel(ejes[0], fontsize=12, labelpad=10)
+        ax.set_ylabel(ejes[1], fontsize=12, labelpad=10)
+        ax.tick_params(axis='x', rotation=45)
+        ax.tick_params(axis='y', rotation=0)
+        fig.tight_layout()
+
+        png = _figura_a_png(fig)
+    print('Matriz generada')
+    return png
+
+
+def _heatmap_agregado(df_numerico_plot, grupos):
+    # Bloques de alumnos por subgrupo: cada celda es la media de votos entre dos grupos
+    valores = df_numerico_plot.drop(columns='sumatorio', errors='ignore').to_numpy()
+    etiquetas, medias, tamanos = agregar_por_grupos(valores, grupos)
+
+    nombres = [f'Grupo {i + 1} ({t})' for i, t in enumerate(tamanos)]
+    df_medias = pd.DataFrame(medias, index=nombres, columns=nombres)
+    df_anotaciones = pd.DataFrame(np.char.mod('%.1f', medias).astype(object), index=nombres, columns=nombres)
+    return df_anotaciones, df_medias
+
+
+def _heatmap_raster(df_numerico_plot, titulo, ejes):
+    # Una sola imagen (imshow) sobre un lienzo de tamaño acotado, sin texto por celda
+    n_filas, n_columnas = df_numerico_plot.shape
+    lado = min(max(n_filas * 0.6, 8), LADO_MAXIMO)
+
+    with sns.axes_style('white'), sns.plotting_context(font_scale=1.1):
+        fig, ax = _nueva_figura((lado, lado))
+
+        imagen = ax.imshow(
+            df_numerico_plot.to_numpy(dtype=np.float32),
+            cmap='RdYlGn', vmin=-3, vmax=3,
+            interpolation='nearest', aspect='auto'
+        )
+        fig.colorbar(imagen, ax=ax, shrink=0.85, pad=0.02, label='Puntuación ajustada (Rojo → Verde)')
+
+        if n_filas <= UMBRAL_ETIQUETAS:
+            tamano_fuente = max(4, min(10, 600 / n_filas))
+            ax.set_yticks(np.arange(n_filas), df_numerico_plot.index, fontsize=tamano_fuente)
+            ax.set_xticks(np.arange(n_columnas), df_numerico_plot.columns, fontsize=tamano_fuente, rotation=90)
+        else:
+            ax.set_xticks([])
+            ax.set_yticks([])
+
+        ax.set_title(titulo, fontsize=16, pad=20, weight='bold')
+        ax.set_xlabel(ejes[0], fontsize=12, labelpad=10)
+        ax.set_ylabel(ejes[1], fontsize=12, labelpad=10)
+        fig.tight_layout()
+
+        png = _figura_a_png(fig)
+    return png
+
+
+####################################################################################################################
+#------------------------------------Dibujamos el gráfico de barras------------------------------------------------#
+####################################################################################################################
+
+def figura_aceptacion(df_aceptacion):
+    #Configuración estética
+    with sns.axes_style('whitegrid'), sns.plotting_context(font_scale=1.1):
+        fig, ax = _nueva_figura((10, 8))
+
+        if len(df_aceptacion) > UMBRAL_ETIQUETAS:
+            _barras_sin_rotulos(ax, df_aceptacion['Puntuación total recibida'])
+        else:
+            #Gráfico de barras horizontales
+            sns.barplot(
+                data=df_aceptacion,
+                y='Alumno',
+                x='Puntuación total recibida',
+                palette='RdYlGn_r',   # 👈 invertimos la paleta: más verde = más aceptado
+                edgecolor='black',
+                ax=ax
+            )
+
+            #Etiquetas de valor
+            for i, v in enumerate(df_aceptacion['Puntuación total recibida']):
+                ax.text(v + (0.02 * df_aceptacion['Puntuación total recibida'].max()), i, f'{v:.0f}',
+                        va='center', fontsize=10, weight='bold', color='black')
+
+        #Estética general
+        ax.set_title('Nivel de aceptación de los alumnos', fontsize=16, weight='bold', pad=20)
+        ax.set_xlabel('Puntuación total recibida (votos netos)')
+        ax.set_ylabel('Alumno')
+        fig.tight_layout()
+
+        png = _figura_a_png(fig)
+    print('Gráfico de aceptación generado')
+    return png
+
+
+def _barras_sin_rotulos(ax, valores):
+    # Muchos alumnos: una sola llamada a barh con la misma paleta, sin el valor de cada
+    # barra ni los nombres en el eje (igual que el heatmap por encima de UMBRAL_ETIQUETAS)
+    n = len(valores)
+    ax.barh(np.arange(n), valores.to_numpy(), height=1.0, linewidth=0,
+            color=matplotlib.colormaps['RdYlGn_r'](np.linspace(0, 1, n)))
+    ax.set_ylim(n - 0.5, -0.5)
+    ax.set_yticks([])
+
+
+####################################################################################################################
+#-------------------------------Dibujamos el gráfico de barras normalizado-----------------------------------------#
+####################################################################################################################
+
+def figura_aceptacion100(df_aceptacion):
+    with sns.axes_style('whitegrid'), sns.plotting_context(font_scale=1.1):
+        fig, ax = _nueva_figura((10, 8))
+
+        if len(df_aceptacion) > UMBRAL_ETIQUETAS:
+            _barras_sin_rotulos(ax, df_aceptacion['Índice de aceptación (%)'])
+        else:
+            sns.barplot(
+                data=df_aceptacion,
+                y='Alumno',
+                x='Índice de aceptación (%)',
+                palette='RdYlGn_r',
+                edgecolor='black',
+                ax=ax
+            )
+
+            for i, v in enumerate(df_aceptacion['Índice de aceptación (%)']):
+                ax.text(v + 1, i, f'{v:.1f}%', va='center', fontsize=10, weight='bold')
+
+        #Ajustes visuales
+        ax.set_title('Índice de aceptación (0–100)', fontsize=16, weight='bold', pad=20)
+        ax.set_xlabel('Nivel de aceptación (%)')
+        ax.set_ylabel('Alumno')
+        ax.set_xlim(0, 100)
+        fig.tight_layout()
+
+        png = _figura_a_png(fig)
+    print('Gráfico de aceptación normalizado generado')
+    return png
+
+
+####################################################################################################################
+#------------------------------------Evolución entre periodos------------------------------------------------------#
+####################################################################################################################
+
+def figura_evolucion_aceptacion(df_indice, destacados=6):
+    # Una línea por alumno; solo se rotulan los que más cambian para que el gráfico
+    # siga siendo legible con muchos alumnos y periodos
+    variacion = (df_indice.ffill(axis=1).iloc[:, -1] - df_indice.bfill(axis=1).iloc[:, 0]).abs()
+    destacados = set(variacion.nlargest(destacados).index)
+    x = np.arange(df_indice.shape[1])
+
+    with sns.axes_style('whitegrid'), sns.plotting_context(font_scale=1.1):
+        fig, ax = _nueva_figura((10, 6))
+        colores = sns.color_palette('tab10', len(destacados))
+
+        for alumno, fila in df_indice.iterrows():
+            if alumno not in destacados:
+                ax.plot(x, fila.to_numpy(), color='lightgray', linewidth=1, zorder=1)
+        for color, alumno in zip(colores, sorted(destacados)):
+            ax.plot(x, df_indice.loc[alumno].to_numpy(), color=color, linewidth=2.5,
+                    marker='o', label=alumno, zorder=2)
+
+        ax.set_xticks(x, df_indice.columns, rotation=45 if len(x) > 6 else 0, ha='right' if len(x) > 6 else 'center')
+        ax.set_ylim(-5, 105)
+        ax.set_title('Evolución del índice de aceptación (0–100)', fontsize=16, weight='bold', pad=20)
+        ax.set_xlabel('Periodo')
+        ax.set_ylabel('Índice de aceptación (%)')
+        ax.legend(title='Mayores cambios', fontsize=9, loc='center left', bbox_to_anchor=(1.01, 0.5))
+        fig.tight_layout()
+
+        png = _figura_a_png(fig)
+    print('Gráfico de evolución de la aceptación generado')
+    return png
+
+
+def figura_rotacion_aristas(df_rotacion):
+    with sns.axes_style('whitegrid'), sns.plotting_context(font_scale=1.1):
+        fig, ax = _nueva_figura((10, 6))
+
+        df_rotacion[['Nuevas', 'Perdidas', 'Invertidas']].plot.bar(
+            stacked=True, color=['green', 'gray', 'red'], edgecolor='black', ax=ax
+        )
+
+        ax.set_title('Cambios en las relaciones entre periodos', fontsize=16, weight='bold', pad=20)
+        ax.set_xlabel('Transición')
+        ax.set_ylabel('Número de relaciones')
+        ax.set_xticklabels(df_rotacion.index, rotation=45 if len(df_rotacion) > 6 else 0, ha='right')
+        ax.legend(loc='center left', bbox_to_anchor=(1.01, 0.5))
+        fig.tight_layout()
+
+        png = _figura_a_png(fig)
+    print('Gráfico de rotación de relaciones generado')
+    return png
+
+
+####################################################################################################################
+#------------------------------------Elementos comunes de los grafos-----------------------------------------------#
+####################################################################################################################
+
+# Estilo de los nodos según la categoría del alumno. El género conserva los colores y
+# formas de siempre; el resto de categorías toman colores y formas en orden
+ESTILOS_GENERO = {
+    'F': ('lightcoral', 'o', 'Mujeres'),
+    'M': ('skyblue', '^', 'Hombres'),
+}
+ESTILO_SIN_DATO = ('lightgray', 's', 'Sin dato')
+FORMAS = ('o', '^', 's', 'D', 'v', 'p', 'h', '<', '>', '8')
+
+
+def _estilos_categorias(G):
+    categorias = sorted({c for _, c in G.nodes(data='categoria')} - {'U'})
+    if G.graph.get('atributo_estilo') == 'genero':
+        estilos = {c: ESTILOS_GENERO[c] for c in categorias if c in ESTILOS_GENERO}
+    else:
+        estilos = {}
+    resto = [c for c in categorias if c not in estilos]
+    colores = matplotlib.colormaps['Set2'](np.linspace(0, 1, max(len(resto), 1)))
+    for i, c in enumerate(resto):
+        estilos[c] = (colores[i], FORMAS[i % len(FORMAS)], str(c))
+    estilos['U'] = ESTILO_SIN_DATO
+    return estilos
+
+
+def _dibujar_nodos(G, pos, ax):
+    # Tamaño de nodos proporcional a aceptación; una llamada por categoría
+    por_categoria = {}
+    for n, d in G.nodes(data=True):
+        nodos, tamanos = por_categoria.setdefault(d['categoria'], ([], []))
+        nodos.append(n)
+        tamanos.append(max(200, abs(d['aceptacion']) * 40))
+
+    estilos = _estilos_categorias(G)
+    for categoria, (nodos, tamanos) in por_categoria.items():
+        color, forma, etiqueta = estilos[categoria]
+        nx.draw_networkx_nodes(
+            G, pos,
+            nodelist=nodos,
+            node_color=[color], node_shape=forma,
+            node_size=tamanos,
+            label=etiqueta, alpha=0.9, ax=ax
+        )
+
+
+def _leyenda(ax, aristas, G):
+    categorias = {c for _, c in G.nodes(data='categoria')}
+    legend_elements = [
+        Line2D([0], [0], marker=forma, color='w', label=etiqueta,
+            markerfacecolor=color, markersize=12)
+        for categoria, (color, forma, etiqueta) in _estilos_categorias(G).items()
+        if categoria in categorias
+    ] + aristas
+
+    ax.legend(
+        handles=legend_elements,
+        loc='upper left',
+        fontsize=11,
+        frameon=True,
+        title='Leyenda',
+        title_fontsize=12,
+        fancybox=True,
+        shadow=True,
+        borderpad=1
+    )
+
+
+def _rotular(G):
+    # Con cientos de alumnos ni los nombres ni las flechas se leen
+    return G.number_of_nodes() <= UMBRAL_ETIQUETAS
+
+
+# Las aristas se dibujan como colecciones y no como un FancyArrowPatch por arista (lo que
+# hace networkx con flechas), que es la mayor parte del tiempo de dibujo de los grafos
+RADIO_NODO = 300 ** 0.5 / 2   # puntos; las flechas acaban en el borde de un nodo de tamaño 300
+PUNTOS_CURVA = 12             # puntos de la polilínea de cada arista curvada
+
+
+def _bezier(p0, control, p1, s):
+    # Puntos de la curva de Bézier cuadrática de cada arista en los parámetros s (m x k)
+    s = s[..., None]
+    return (1 - s) ** 2 * p0[:, None] + 2 * (1 - s) * s * control[:, None] + s ** 2 * p1[:, None]
+
+
+class _AristasDirigidas(Artist):
+    # Todas las aristas de un grafo en dos colecciones: los cuerpos y las puntas de flecha.
+    # Como en FancyArrowPatch, la geometría se calcula en píxeles al dibujar (curvatura
+    # 'arc3', flechas '-|>' y recorte en el borde de los nodos), para que no dependa de la
+    # escala de los ejes ni del tight_layout
+    zorder = 1
+
+    def __init__(self, origen, destino, curvatura, anchos, tamanos_flecha, colores):
+        super().__init__()
+        self.origen, self.destino, self.curvatura = origen, destino, curvatura
+        self.anchos, self.tamanos_flecha, self.colores = anchos, tamanos_flecha, colores
+        self._cuerpos = LineCollection([], transform=IdentityTransform())
+        self._puntas = PolyCollection([], transform=IdentityTransform())
+
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        p0 = self.axes.transData.transform(self.origen)
+        p1 = self.axes.transData.transform(self.destino)
+        d = p1 - p0
+        largo = np.hypot(d[:, 0], d[:, 1])
+        validas = largo > 0
+        p0, p1, d, largo = p0[validas], p1[validas], d[validas], largo[validas]
+
+        # Punto de control de 'arc3,rad=c' y tramo de la curva fuera de los nodos
+        control = (p0 + p1) / 2 + self.curvatura[validas, None] * np.column_stack([d[:, 1], -d[:, 0]])
+        radio = renderer.points_to_pixels(RADIO_NODO)
+        largo_punta = renderer.points_to_pixels(0.4 * self.tamanos_flecha[validas])
+        media_punta = renderer.points_to_pixels(0.2 * self.tamanos_flecha[validas])
+        inicio = np.minimum(radio / largo, 0.5)
+        fin = np.maximum(1 - radio / largo, 0.5)
+        base = np.maximum(fin - largo_punta / largo, inicio)
+
+        # Cuerpo hasta la base de la punta y punta triangular en la dirección de la curva
+        s = inicio[:, None] + (base - inicio)[:, None] * np.linspace(0, 1, PUNTOS_CURVA)
+        punta = _bezier(p0, control, p1, fin[:, None])[:, 0]
+        tangente = 2 * (1 - fin[:, None]) * (control - p0) + 2 * fin[:, None] * (p1 - control)
+        tangente /= np.hypot(tangente[:, 0], tangente[:, 1])[:, None]
+        normal = np.column_stack([-tangente[:, 1], tangente[:, 0]]) * media_punta[:, None]
+        punta -= tangente * (renderer.points_to_pixels(self.anchos[validas]) * 0.5 * 5 ** 0.5)[:, None]  # grosor del trazo
+        atras = punta - tangente * largo_punta[:, None]
+
+        colores, anchos = self.colores[validas], self.anchos[validas]
+        self._cuerpos.set_segments(_bezier(p0, control, p1, s))
+        self._cuerpos.set(colors=colores, linewidths=anchos)
+        self._puntas.set_verts(np.stack([punta, atras + normal, atras - normal], axis=1))
+        self._puntas.set(facecolors=colores, edgecolors=colores, linewidths=anchos)
+        for coleccion in (self._cuerpos, self._puntas):
+            coleccion.figure = self.figure
+            coleccion.draw(renderer)
+
+
+def dibujar_aristas(G, pos, color, ax, flechas=True):
+    # Grosor, opacidad y tamaño de la flecha según |peso|; con flechas, las aristas
+    # recíprocas se curvan para que no se solapen
+    aristas = list(G.edges(data='weight'))
+    if not aristas:
+        return
+    origen = np.array([pos[u] for u, _, _ in aristas], dtype=float)
+    destino = np.array([pos[v] for _, v, _ in aristas], dtype=float)
+    w = np.abs(np.array([w for _, _, w in aristas], dtype=float))
+    anchos = 0.4 + w * 0.4
+    colores = np.array([to_rgba(color, alpha) for alpha in 0.4 + np.minimum(w / 4, 0.3)])
+
+    if flechas:
+        curvatura = np.array([0.1 if G.has_edge(v, u) else 0.0 for u, v, _ in aristas])
+        ax.add_artist(_AristasDirigidas(origen, destino, curvatura, anchos, 8 + w * 1.2, colores))
+    else:
+        ax.add_collection(LineCollection(np.stack([origen, destino], axis=1), linewidths=anchos, colors=colores, zorder=1))
+
+    # Mismo margen alrededor de las aristas que deja networkx
+    extremos = np.concatenate([origen, destino])
+    minimo, maximo = extremos.min(axis=0), extremos.max(axis=0)
+    margen = 0.05 * (maximo - minimo)
+    ax.update_datalim([minimo - margen, maximo + margen])
+    ax.autoscale_view()
+
+
+def _estilo_grafo():
+    return matplotlib.style.context('seaborn-v0_8-white')
+
+
+####################################################################################################################
+#------------------------------------Dibujamos el grafo general----------------------------------------------------#
+####################################################################################################################
+
+def figura_grafo_general(G, pos):
+    #Figura y estilo
+    with _estilo_grafo():
+        fig, ax = _nueva_figura((14, 12))
+
+        _dibujar_nodos(G, pos, ax)
+
+        #Dibujamos aristas
+        edges = G.edges(data=True)
+        colors = ['green' if d['weight'] > 0 else 'red' for (_, _, d) in edges]
+        widths = [abs(d['weight']) for (_, _, d) in edges]
+
+        nx.draw_networkx_edges(G, pos, edge_color=colors, width=widths, arrows=_rotular(G), alpha=0.4, ax=ax)
+        if _rotular(G):
+            nx.draw_networkx_labels(G, pos, font_size=9, font_weight='bold', ax=ax)
+
+        #Leyenda personalizada
+        _leyenda(ax, [
+            Line2D([0], [0], color='green', lw=2, label='Voto positivo'),
+            Line2D([0], [0], color='red', lw=2, label='Voto negativo')
+        ], G)
+
+        #Estilo final
+        ax.set_title('Grafo sociométrico (afinidad positiva = cercanía)', fontsize=18, weight='bold', pad=20)
+        ax.axis('off')
+        fig.tight_layout()
+
+        png = _figura_a_png(fig)
+    print('Grafo sociométrico generado')
+    return png
+
+
+####################################################################################################################
+#------------------------------------Dibujamos el grafo de aceptación----------------------------------------------#
+####################################################################################################################
+
+def figura_grafo_aceptacion(G_pos, pos, componentes):
+    #Grupos de afinidad, del más grande al más pequeño
+    colores_grupo = matplotlib.colormaps['tab20'](np.linspace(0, 1, len(componentes)))  # colores distintos
+
+    #Figura
+    with _estilo_grafo():
+        fig, ax = _nueva_figura((14, 12))
+
+        #Nubes de color por componente
+        for i, comp in enumerate(componentes):
+            if len(comp) < 2:
+                continue
+            coords = np.array([pos[n] for n in comp if n in pos])
+            if len(coords) >= 3:
+                hull = ConvexHull(coords)
+                puntos = coords[hull.vertices]
+                poly = Polygon(
+                    puntos, closed=True,
+                    fill=True, facecolor=colores_grupo[i],
+                    alpha=0.18, edgecolor=None
+                )
+                ax.add_patch(poly)
+            elif len(coords) == 2:
+                mid = coords.mean(axis=0)
+                ax.add_patch(Circle(mid, 0.05, color=colores_grupo[i], alpha=0.2))
+
+            # Rótulo del grupo (G1, G2...), el mismo que en la tabla del informe
+            ax.annotate(f'G{i + 1}', (coords[:, 0].mean(), coords[:, 1].max()),
+                        xytext=(0, 14), textcoords='offset points', ha='center', va='bottom',
+                        fontsize=11, weight='bold', color='black',
+                        bbox=dict(facecolor=colores_grupo[i], edgecolor='none', alpha=0.6, boxstyle='round,pad=0.25'))
+
+        #Dibujamos nodos
+        _dibujar_nodos(G_pos, pos, ax)
+
+        #Aristas positivas
+        dibujar_aristas(G_pos, pos, 'green', ax=ax, flechas=_rotular(G_pos))
+
+        #Etiquetas de nodos
+        if _rotular(G_pos):
+            nx.draw_networkx_labels(
+                G_pos, pos,
+                font_size=10,
+                font_weight='bold',
+                font_color='black',
+                bbox=dict(facecolor='white', edgecolor='none', alpha=0.7, boxstyle='round,pad=0.25'),
+                ax=ax
+            )
+
+        #Leyenda
+        _leyenda(ax, [Line2D([0], [0], color='green', lw=2, label='Voto positivo')], G_pos)
+
+        #Título y ajustes
+        ax.set_title('Grafo sociométrico – Grupos de afinidad (afinidades positivas)',
+                fontsize=18, weight='bold', pad=20)
+        ax.axis('off')
+        fig.tight_layout()
+
+        png = _figura_a_png(fig)
+    print('Grafo de aceptación generado')
+    return png
+
+
+####################################################################################################################
+#------------------------------------Dibujamos el grafo de rechazo-------------------------------------------------#
+####################################################################################################################
+
+def figura_grafo_negativo(G_neg, pos):
+    #Figura
+    with _estilo_grafo():
+        fig, ax = _nueva_figura((14, 12))
+
+        #Nodos
+        _dibujar_nodos(G_neg, pos, ax)
+
+        #Aristas negativas
+        dibujar_aristas(G_neg, pos, 'red', ax=ax, flechas=_rotular(G_neg))
+
+        #Etiquetas
+        if _rotular(G_neg):
+            nx.draw_networkx_labels(
+                G_neg, pos,
+                font_size=10,
+                font_weight='bold',
+                font_color='black',
+                bbox=dict(facecolor='white', edgecolor='none', alpha=0.7, boxstyle='round,pad=0.25'),
+                ax=ax
+            )
+
+        #Leyenda
+        _leyenda(ax, [Line2D([0], [0], color='red', lw=2, label='Voto negativo')], G_neg)
+
+        #Estilo final
+        ax.set_title('Grafo sociométrico – Relaciones negativas (votos < 0)',
+                fontsize=18, weight='bold', pad=20)
+        ax.axis('off')
+        fig.tight_layout()
+
+        png = _figura_a_png(fig)
+    print('Grafo de relaciones negativas generado')
+    return png
+
+
+####################################################################################################################
+#------------------------------------Planificador de renderizado---------------------------------------------------#
+####################################################################################################################
+
+# Un pool por número de procesos, compartido por todas las llamadas del proceso (hilos y
+# sesiones). Nunca se cierra desde una llamada: otra puede estar enviando figuras o
+# esperando las suyas. Los procesos terminan con el intérprete
+_pools = {}
+_lock_pools = threading.Lock()
+
+
+def _obtener_pool(procesos):
+    # Reutilizamos el mismo pool entre llamadas para no pagar el arranque de los procesos
+    with _lock_pools:
+        if procesos not in _pools:
+            _pools[procesos] = ProcessPoolExecutor(max_workers=procesos)
+        return _pools[procesos]
+
+
+def _renderizar_medida(nombre, funcion, args):
+    # Se ejecuta en el proceso que dibuja: la medición (CPU, memoria) es la de ese proceso
+    medicion = Medicion(log=False)
+    with medicion.etapa(f'figura_{nombre}'):
+        png = funcion(*args)
+    return png, medicion.etapas[0]
+
+
+class Renderizador:
+    # Reparte las figuras entre los procesos del pool y las devuelve según terminan,
+    # de modo que se pueden ir enviando tandas (tablas primero, grafos después)
+
+    def __init__(self, procesos=None, medicion=None):
+        if procesos is None:
+            procesos = min(6, os.cpu_count() or 1)
+        self.pool = _obtener_pool(procesos) if procesos > 1 else None
+        self.medicion = medicion
+        self._pendientes = []   # (nombre, función, argumentos) en modo secuencial
+        self._futuros = {}      # futuro -> nombre en modo paralelo
+
+    def enviar(self, tareas):
+        # tareas: nombre de la figura -> (función, argumentos)
+        for nombre, (funcion, args) in tareas.items():
+            if self.pool is None:
+                self._pendientes.append((nombre, funcion, args))
+            else:
+                self._futuros[self.pool.submit(_renderizar_medida, nombre, funcion, args)] = nombre
+
+    def _entregar(self, nombre, resultado):
+        png, registro = resultado
+        if self.medicion is not None:
+            self.medicion.registrar(registro)
+        return nombre, png
+
+    def mientras(self, futuro):
+        # Figuras según van terminando mientras se completa 'futuro' (un cálculo en otro
+        # hilo, p. ej. el layout); las que sigan en curso se recogen luego con todas().
+        # En modo secuencial se dibujan aquí mismo, una a una
+        if self.pool is None:
+            yield from self.todas()
+            return
+        while self._futuros and not futuro.done():
+            wait(list(self._futuros) + [futuro], return_when=FIRST_COMPLETED)
+            for terminado in [f for f in self._futuros if f.done()]:
+                yield self._entregar(self._futuros.pop(terminado), terminado.result())
+
+    def todas(self):
+        # Todas las figuras enviadas, en el orden en que van terminando
+        while self._pendientes:
+            nombre, funcion, args = self._pendientes.pop(0)
+            yield self._entregar(nombre, _renderizar_medida(nombre, funcion, args))
+        for futuro in as_completed(list(self._futuros)):
+            yield self._entregar(self._futuros.pop(futuro), futuro.result())
+
+
+def renderizar_figuras(tareas, procesos=None, medicion=None):
+    renderizador = Renderizador(procesos, medicion)
+    renderizador.enviar(tareas)
+    return dict(renderizador.todas())
@@ -0,0 +1,187 @@
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from .atributos import AtributosAlumnos, SIN_DATO
+from .comunidades import METODO_COMUNIDADES, detectar_comunidades
+
+
+# Caché de layouts ya calculados, indexada por el hash de las aristas del grafo
+_MAX_LAYOUTS = 32
+_layouts = OrderedDict()
+
+# Iteraciones del layout cuando se parte de las posiciones de una ejecución anterior
+ITERACIONES_INCREMENTALES = 50
+
+# Cada iteración del layout es O(n²). A partir de NODOS_LAYOUT_ACOTADO alumnos se parte
+# de un layout espectral (disperso, casi instantáneo) y las iteraciones se reducen para que
+# n² x iteraciones no pase del coste de un grafo de ese tamaño, con un mínimo de
+# ITERACIONES_MINIMAS
+NODOS_LAYOUT_ACOTADO = 1000
+ITERACIONES_MINIMAS = 10
+
+
+@dataclass
+class GrafosSociograma:
+    G: object           # grafo general (votos positivos y negativos)
+    G_pos: object       # grafo de aceptación (votos > 0)
+    G_neg: object       # grafo de rechazo (votos < 0)
+    pos: dict = None    # layout común a los tres grafos
+    componentes: list = None  # grupos de afinidad (conjuntos de alumnos), de mayor a menor
+    metodo_comunidades: str = METODO_COMUNIDADES  # método con el que se han obtenido los grupos
+
+
+def extraer_aristas(valores):
+    # Lista de aristas en formato COO (votante -> votado, peso) a partir de la matriz
+    # numérica, donde la fila es el alumno votado y la columna el votante
+    votados, votantes = np.nonzero(valores)
+    return votantes, votados, valores[votados, votantes]
+
+
+def detectar_subgrupos(valores, metodo=METODO_COMUNIDADES):
+    # Grupos de afinidad del grafo de votos positivos, directamente sobre la matriz
+    # (sin construir el grafo de networkx). Devuelve una etiqueta por alumno, en el
+    # orden de las filas
+    return detectar_comunidades(valores, metodo)
+
+
+def _grafo_con_nodos(nombres, atributos, aceptacion):
+    import networkx as nx
+
+    # Cada nodo lleva sus atributos y la 'categoria' (valor del atributo de estilo) con
+    # la que se elige su forma y color
+    columnas = atributos.alinear(nombres)
+    estilo = atributos.atributo_estilo()
+    categoria = columnas.get(estilo, [SIN_DATO] * len(nombres))
+
+    G = nx.DiGraph(atributo_estilo=estilo)
+    G.add_nodes_from(
+        (alumno, {**{c: v[i] for c, v in columnas.items()}, 'categoria': categoria[i], 'aceptacion': float(a)})
+        for i, (alumno, a) in enumerate(zip(nombres, aceptacion))
+    )
+    return G
+
+
+def construir_grafos(nombres, valores, atributos=None):
+    return construir_grafos_aristas(nombres, *extraer_aristas(valores), valores.sum(axis=1), atributos)
+
+
+def construir_grafos_aristas(nombres, origen, destino, pesos, aceptacion, atributos=None):
+    # Los tres grafos a partir de la lista de aristas (votante -> votado, peso) y de la
+    # aceptación de cada alumno, sin necesidad de la matriz completa
+    atributos = atributos if atributos is not None else AtributosAlumnos()
+    nombres = np.asarray(nombres, dtype=object)
+
+    aristas = list(zip(nombres[origen], nombres[destino], pesos.tolist()))
+    positivas = pesos > 0
+
+    # Grafo general, de aceptación (votos > 0) y de rechazo (votos < 0)
+    G = _grafo_con_nodos(nombres, atributos, aceptacion)
+    G.add_weighted_edges_from(aristas)
+
+    G_pos = _grafo_con_nodos(nombres, atributos, aceptacion)
+    G_pos.add_weighted_edges_from(a for a, p in zip(aristas, positivas) if p)
+
+    G_neg = _grafo_con_nodos(nombres, atributos, aceptacion)
+    G_neg.add_weighted_edges_from(a for a, p in zip(aristas, positivas) if not p)
+
+    return G, G_pos, G_neg
+
+
+def actualizar_grafos(grafos, nombres, valores, cambios):
+    # Aplica a una copia de los grafos anteriores solo las celdas que han cambiado
+    G, G_pos, G_neg = grafos.G.copy(), grafos.G_pos.copy(), grafos.G_neg.copy()
+
+    for votado, votante in zip(cambios.filas, cambios.columnas):
+        u, v = nombres[votante], nombres[votado]
+        peso = float(valores[votado, votante])
+        for grafo in (G, G_pos, G_neg):
+            if grafo.has_edge(u, v):
+                grafo.remove_edge(u, v)
+        if peso != 0:
+            G.add_edge(u, v, weight=peso)
+        if peso > 0:
+            G_pos.add_edge(u, v, weight=peso)
+        elif peso < 0:
+            G_neg.add_edge(u, v, weight=peso)
+
+    if cambios.sumatorio:
+        for alumno, a in zip(nombres, valores.sum(axis=1)):
+            for grafo in (G, G_pos, G_neg):
+                grafo.nodes[alumno]['aceptacion'] = float(a)
+
+    return G, G_pos, G_neg
+
+
+def comunidades_afinidad(nombres, valores, metodo=METODO_COMUNIDADES, seed=42):
+    # Grupos de afinidad como conjuntos de alumnos, del más grande al más pequeño
+    etiquetas = detectar_comunidades(valores, metodo, seed)
+    grupos = [set() for _ in range(etiquetas.max() + 1)] if len(etiquetas) else []
+    for alumno, etiqueta in zip(nombres, etiquetas):
+        grupos[etiqueta].add(alumno)
+    return grupos
+
+
+def resumen_comunidades(G_pos, componentes, max_miembros=12):
+    # Tabla de grupos de afinidad (de dos o más alumnos) para el informe
+    import pandas as pd
+
+    filas = []
+    for i, grupo in enumerate(componentes):
+        if len(grupo) < 2:
+            continue
+        internas = G_pos.subgraph(grupo).number_of_edges()
+        reciprocas = sum(1 for u, v in G_pos.subgraph(grupo).edges if u < v and G_pos.has_edge(v, u))
+        miembros = sorted(grupo)
+        texto = ', '.join(miembros[:max_miembros])
+        if len(miembros) > max_miembros:
+            texto += f' … (+{len(miembros) - max_miembros})'
+        filas.append({
+            'Grupo': f'G{i + 1}',
+            'Alumnos': len(grupo),
+            'Densidad (%)': round(100 * internas / (len(grupo) * (len(grupo) - 1)), 1),
+            'Pares recíprocos': reciprocas,
+            'Miembros': texto,
+        })
+    return pd.DataFrame(filas, columns=['Grupo', 'Alumnos', 'Densidad (%)', 'Pares recíprocos', 'Miembros']).set_index('Grupo')
+
+
+def hash_grafo(G):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(list(G.nodes)).encode())
+    h.update(repr(sorted(G.edges(data='weight'))).encode())
+    return h.hexdigest()
+
+
+def calcular_layout(G_pos, seed=42, k=1.5, iterations=300, pos_inicial=None):
+    # Un único layout por afinidad positiva (no dirigida) para los tres grafos, de modo
+    # que cada alumno ocupa la misma posición en todas las figuras. Para grafos grandes
+    # networkx ya usa internamente la versión dispersa (scipy) del algoritmo
+    import networkx as nx
+
+    G_afinidad = G_pos.to_undirected()
+
+    # Arranque en caliente: pocas iteraciones desde las posiciones anteriores (sin caché,
+    # el resultado depende del punto de partida)
+    if pos_inicial is not None:
+        return nx.spring_layout(G_afinidad, pos=pos_inicial, seed=seed, k=k,
+                                iterations=ITERACIONES_INCREMENTALES, weight='weight')
+    clave = (hash_grafo(G_afinidad), seed, k, iterations)
+
+    if clave in _layouts:
+        _layouts.move_to_end(clave)
+        return _layouts[clave]
+
+    n = G_afinidad.number_of_nodes()
+    if n > NODOS_LAYOUT_ACOTADO:
+        iteraciones = max(ITERACIONES_MINIMAS, int(iterations * (NODOS_LAYOUT_ACOTADO / n) ** 2))
+        pos = nx.spring_layout(G_afinidad, pos=nx.spectral_layout(G_afinidad, weight='weight'), seed=seed, k=k,
+                               iterations=iteraciones, weight='weight')
+    else:
+        pos = nx.spring_layout(G_afinidad, seed=seed, k=k, iterations=iterations, weight='weight')
+    _layouts[clave] = pos
+    if len(_layouts) > _MAX_LAYOUTS:
+        _layouts.popitem(last=False)
+    return pos
@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+
+logger = logging.getLogger('sociograma')
+
+
+def memoria_mb():
+    # Memoria residente actual y pico del proceso (VmRSS, VmHWM), en MB. El pico es de todo
+    # el proceso desde su arranque: no se reinicia por etapa, porque otras etapas pueden
+    # estar en marcha a la vez en otros hilos. Fuera de Linux solo se conoce el pico
+    memoria = {}
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith(('VmRSS:', 'VmHWM:')):
+                    memoria[linea[:5]] = int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    if 'VmHWM' not in memoria:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memoria['VmHWM'] = pico / 2**20 if sys.platform == 'darwin' else pico / 1024
+    return memoria.get('VmRSS'), memoria['VmHWM']
+
+
+class Medicion:
+    # Registro de etapas del proceso: tiempo de reloj, tiempo de CPU del hilo que ejecuta la
+    # etapa (las etapas pueden solaparse en varios hilos) y memoria del proceso al terminar.
+    # Cada etapa se emite además como una línea JSON en el logger 'sociograma'
+
+    def __init__(self, log=True):
+        self.etapas = []
+        self.log = log
+
+    @contextmanager
+    def etapa(self, nombre, **extra):
+        inicio, inicio_cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            rss, pico = memoria_mb()
+            self.registrar({
+                'etapa': nombre,
+                'tiempo_s': time.perf_counter() - inicio,
+                'cpu_hilo_s': time.thread_time() - inicio_cpu,
+                'rss_mb': rss,
+                'pico_rss_proceso_mb': pico,
+                'pid': os.getpid(),
+                **extra
+            })
+
+    def medir(self, nombre, funcion, *args, **kwargs):
+        with self.etapa(nombre):
+            return funcion(*args, **kwargs)
+
+    def registrar(self, registro):
+        self.etapas.append(registro)
+        if self.log:
+            logger.info(json.dumps(registro, ensure_ascii=False))
+
+    def tabla(self):
+        # Para mostrar: sin el pico de memoria, que es del proceso y no de cada etapa
+        import pandas as pd
+        return pd.DataFrame(self.etapas).drop(columns=['pico_rss_proceso_mb', 'pid'], errors='ignore')
@@ -0,0 +1,237 @@
+import json
+
+from .atributos import SIN_DATO
+
+
+# Vista interactiva de los grafos en el navegador. En lugar de dibujar los PNG en el
+# servidor se envían al cliente las posiciones, los atributos de cada nodo y una lista
+# compacta de aristas (índices de votante y votado y peso, por columnas), y el grafo se
+# dibuja en un <canvas> con JavaScript: información al pasar el ratón, filtro de votos
+# positivos/negativos y resaltado del alumno seleccionado y sus vecinos
+
+# Mismos colores y formas que en las figuras del informe
+COLORES_GENERO = {'F': ('#f08080', 'circulo', 'Mujeres'), 'M': ('#87ceeb', 'triangulo', 'Hombres')}
+COLOR_SIN_DATO = ('#d3d3d3', 'cuadrado', 'Sin dato')
+PALETA = ('#66c2a5', '#fc8d62', '#8da0cb', '#e78ac3', '#a6d854', '#ffd92f', '#e5c494', '#b3b3b3')
+FORMAS = ('circulo', 'triangulo', 'cuadrado', 'rombo')
+COLORES_GRUPOS = ('#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f',
+                  '#bcbd22', '#17becf')
+
+
+def _estilos(G):
+    categorias = sorted({c for _, c in G.nodes(data='categoria')} - {SIN_DATO})
+    genero = G.graph.get('atributo_estilo') == 'genero'
+    estilos = {c: COLORES_GENERO[c] for c in categorias if genero and c in COLORES_GENERO}
+    resto = [c for c in categorias if c not in estilos]
+    for i, c in enumerate(resto):
+        estilos[c] = (PALETA[i % len(PALETA)], FORMAS[i % len(FORMAS)], str(c))
+    estilos[SIN_DATO] = COLOR_SIN_DATO
+    return estilos
+
+
+def datos_grafo(grafos, decimales=4):
+    # Diccionario serializable a JSON con todo lo que necesita el cliente. Los nodos y
+    # las aristas van por columnas (una lista por campo) para que el JSON sea compacto
+    G = grafos.G
+    nombres = list(G.nodes)
+    indice = {alumno: i for i, alumno in enumerate(nombres)}
+
+    grupo = {}
+    for g, miembros in enumerate(grafos.componentes or []):
+        for alumno in miembros:
+            grupo[alumno] = g if len(miembros) > 1 else -1
+
+    estilos = _estilos(G)
+    categorias = list(estilos)
+    atributos = sorted({k for _, d in G.nodes(data=True) for k in d} - {'categoria', 'aceptacion'})
+
+    origen, destino, pesos = [], [], []
+    for u, v, peso in G.edges(data='weight'):
+        origen.append(indice[u])
+        destino.append(indice[v])
+        pesos.append(float(peso))
+
+    return {
+        'nodos': {
+            'nombre': nombres,
+            'x': [round(float(grafos.pos[a][0]), decimales) for a in nombres],
+            'y': [round(float(grafos.pos[a][1]), decimales) for a in nombres],
+            'aceptacion': [float(G.nodes[a]['aceptacion']) for a in nombres],
+            'categoria': [categorias.index(G.nodes[a]['categoria']) for a in nombres],
+            'grupo': [grupo.get(a, -1) for a in nombres],
+            'atributos': {k: [str(G.nodes[a].get(k, SIN_DATO)) for a in nombres] for k in atributos},
+        },
+        'aristas': {'origen': origen, 'destino': destino, 'peso': pesos},
+        'categorias': [{'color': c, 'forma': f, 'etiqueta': e} for c, f, e in estilos.values()],
+        'grupos': list(COLORES_GRUPOS),
+    }
+
+
+def json_grafo(grafos):
+    return json.dumps(datos_grafo(grafos), ensure_ascii=False, separators=(',', ':'))
+
+
+def html_grafo(grafos, alto=640):
+    # Página autocontenida (sin dependencias externas) para incrustar en un iframe,
+    # p. ej. con streamlit.components.v1.html. '<' se escapa para que ningún nombre
+    # pueda cerrar la etiqueta <script>
+    datos = json_grafo(grafos).replace('<', '\\u003c')
+    return _PLANTILLA.replace('__ALTO__', str(int(alto))).replace('__DATOS__', datos)
+
+
+_PLANTILLA = """<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<style>
+  body { margin: 0; font-family: sans-serif; font-size: 13px; }
+  #controles { padding: 6px 4px; display: flex; gap: 14px; align-items: center; flex-wrap: wrap; }
+  #lienzo { width: 100%; height: __ALTO__px; display: block; border: 1px solid #ddd; cursor: default; }
+  #info { position: absolute; pointer-events: none; background: rgba(255,255,255,.95); border: 1px solid #999;
+          border-radius: 4px; padding: 4px 8px; display: none; white-space: nowrap; }
+  .leyenda { display: inline-flex; align-items: center; gap: 4px; }
+  .muestra { width: 10px; height: 10px; display: inline-block; border-radius: 50%; }
+</style></head>
+<body>
+<div id="controles">
+  <label><input type="checkbox" id="positivas" checked> Votos positivos</label>
+  <label><input type="checkbox" id="negativas" checked> Votos negativos</label>
+  <label><input type="checkbox" id="nubes" checked> Grupos de afinidad</label>
+  <label>Peso mínimo <input type="range" id="umbral" min="0" max="3" step="0.5" value="0">
+    <span id="valor_umbral">0</span></label>
+  <span id="leyenda"></span>
+</div>
+<canvas id="lienzo"></canvas>
+<div id="info"></div>
+<script>
+const D = __DATOS__;
+const N = D.nodos.nombre.length, A = D.aristas.origen.length;
+const lienzo = document.getElementById('lienzo'), ctx = lienzo.getContext('2d');
+const info = document.getElementById('info');
+let seleccionado = -1, encima = -1, escala = 1, ox = 0, oy = 0;
+
+// Vecinos de cada nodo, para resaltar al seleccionar
+const vecinos = Array.from({length: N}, () => new Set());
+for (let k = 0; k < A; k++) { vecinos[D.aristas.origen[k]].add(D.aristas.destino[k]); vecinos[D.aristas.destino[k]].add(D.aristas.origen[k]); }
+
+const esc = t => String(t).replace(/[&<>"]/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})[c]);
+const radio = i => Math.max(5, Math.min(22, 5 + Math.sqrt(Math.abs(D.nodos.aceptacion[i])) * 2.2));
+
+function ajustar() {
+  const r = window.devicePixelRatio || 1, w = lienzo.clientWidth, h = lienzo.clientHeight;
+  lienzo.width = w * r; lienzo.height = h * r; ctx.setTransform(r, 0, 0, r, 0, 0);
+  const xs = D.nodos.x, ys = D.nodos.y;
+  const x0 = Math.min(...xs), x1 = Math.max(...xs), y0 = Math.min(...ys), y1 = Math.max(...ys);
+  escala = Math.min((w - 60) / Math.max(x1 - x0, 1e-9), (h - 60) / Math.max(y1 - y0, 1e-9));
+  ox = (w - (x1 - x0) * escala) / 2 - x0 * escala; oy = (h - (y1 - y0) * escala) / 2 + y1 * escala;
+  dibujar();
+}
+const px = i => D.nodos.x[i] * escala + ox, py = i => oy - D.nodos.y[i] * escala;
+
+function visible(k) {
+  const p = D.aristas.peso[k];
+  if (Math.abs(p) < +document.getElementById('umbral').value) return false;
+  return p > 0 ? document.getElementById('positivas').checked : document.getElementById('negativas').checked;
+}
+
+function forma(x, y, r, f) {
+  ctx.beginPath();
+  if (f === 'triangulo') { ctx.moveTo(x, y - r); ctx.lineTo(x + r * .87, y + r * .5); ctx.lineTo(x - r * .87, y + r * .5); ctx.closePath(); }
+  else if (f === 'cuadrado') ctx.rect(x - r * .8, y - r * .8, r * 1.6, r * 1.6);
+  else if (f === 'rombo') { ctx.moveTo(x, y - r); ctx.lineTo(x + r, y); ctx.lineTo(x, y + r); ctx.lineTo(x - r, y); ctx.closePath(); }
+  else ctx.arc(x, y, r, 0, 2 * Math.PI);
+}
+
+function flecha(i, j, color, ancho) {
+  const x0 = px(i), y0 = py(i), x1 = px(j), y1 = py(j), d = Math.hypot(x1 - x0, y1 - y0) || 1;
+  const ux = (x1 - x0) / d, uy = (y1 - y0) / d, xf = x1 - ux * (radio(j) + 2), yf = y1 - uy * (radio(j) + 2);
+  ctx.strokeStyle = color; ctx.fillStyle = color; ctx.lineWidth = ancho;
+  ctx.beginPath(); ctx.moveTo(x0, y0); ctx.lineTo(xf, yf); ctx.stroke();
+  ctx.beginPath(); ctx.moveTo(xf, yf); ctx.lineTo(xf - ux * 7 - uy * 3.5, yf - uy * 7 + ux * 3.5);
+  ctx.lineTo(xf - ux * 7 + uy * 3.5, yf - uy * 7 - ux * 3.5); ctx.closePath(); ctx.fill();
+}
+
+function dibujar() {
+  ctx.clearRect(0, 0, lienzo.width, lienzo.height);
+  const activo = seleccionado >= 0 ? seleccionado : encima;
+
+  // Nubes de los grupos de afinidad: un círculo por grupo alrededor de sus miembros
+  if (document.getElementById('nubes').checked) {
+    const grupos = {};
+    for (let i = 0; i < N; i++) if (D.nodos.grupo[i] >= 0) (grupos[D.nodos.grupo[i]] ||= []).push(i);
+    for (const [g, miembros] of Object.entries(grupos)) {
+      const cx = miembros.reduce((s, i) => s + px(i), 0) / miembros.length, cy = miembros.reduce((s, i) => s + py(i), 0) / miembros.length;
+      const r = Math.max(...miembros.map(i => Math.hypot(px(i) - cx, py(i) - cy) + radio(i))) + 6;
+      ctx.globalAlpha = .12; ctx.fillStyle = D.grupos[g % D.grupos.length];
+      ctx.beginPath(); ctx.arc(cx, cy, r, 0, 2 * Math.PI); ctx.fill(); ctx.globalAlpha = 1;
+    }
+  }
+
+  for (let k = 0; k < A; k++) {
+    if (!visible(k)) continue;
+    const i = D.aristas.origen[k], j = D.aristas.destino[k], p = D.aristas.peso[k];
+    const destacada = activo >= 0 && (i === activo || j === activo);
+    ctx.globalAlpha = activo < 0 ? .55 : destacada ? .95 : .08;
+    flecha(i, j, p > 0 ? '#2e8b57' : '#d62728', destacada ? 1 + Math.abs(p) : .5 + Math.abs(p) / 3);
+  }
+  ctx.globalAlpha = 1;
+
+  for (let i = 0; i < N; i++) {
+    const c = D.categorias[D.nodos.categoria[i]];
+    ctx.globalAlpha = activo < 0 || i === activo || vecinos[activo].has(i) ? 1 : .25;
+    forma(px(i), py(i), radio(i), c.forma);
+    ctx.fillStyle = c.color; ctx.fill();
+    ctx.lineWidth = i === activo ? 3 : 1; ctx.strokeStyle = i === activo ? '#000' : '#555'; ctx.stroke();
+    ctx.fillStyle = '#000'; ctx.textAlign = 'center'; ctx.font = (i === activo ? 'bold ' : '') + '11px sans-serif';
+    ctx.fillText(D.nodos.nombre[i], px(i), py(i) - radio(i) - 3);
+  }
+  ctx.globalAlpha = 1;
+}
+
+function nodoEn(x, y) {
+  let mejor = -1, distancia = Infinity;
+  for (let i = 0; i < N; i++) {
+    const d = Math.hypot(px(i) - x, py(i) - y);
+    if (d <= radio(i) + 3 && d < distancia) { mejor = i; distancia = d; }
+  }
+  return mejor;
+}
+
+function describir(i) {
+  let recibidos = [0, 0], emitidos = [0, 0];
+  for (let k = 0; k < A; k++) {
+    const p = D.aristas.peso[k];
+    if (D.aristas.destino[k] === i) recibidos[p > 0 ? 0 : 1]++;
+    if (D.aristas.origen[k] === i) emitidos[p > 0 ? 0 : 1]++;
+  }
+  let texto = `<b>${esc(D.nodos.nombre[i])}</b><br>Aceptación: ${D.nodos.aceptacion[i]}` +
+    `<br>Recibe: ${recibidos[0]} positivos, ${recibidos[1]} negativos` +
+    `<br>Emite: ${emitidos[0]} positivos, ${emitidos[1]} negativos`;
+  if (D.nodos.grupo[i] >= 0) texto += `<br>Grupo G${D.nodos.grupo[i] + 1}`;
+  for (const [k, v] of Object.entries(D.nodos.atributos)) texto += `<br>${esc(k)}: ${esc(v[i])}`;
+  return texto;
+}
+
+lienzo.addEventListener('mousemove', e => {
+  const r = lienzo.getBoundingClientRect(), i = nodoEn(e.clientX - r.left, e.clientY - r.top);
+  if (i !== encima) { encima = i; dibujar(); }
+  if (i >= 0) {
+    info.innerHTML = describir(i); info.style.display = 'block';
+    info.style.left = (e.pageX + 12) + 'px'; info.style.top = (e.pageY + 12) + 'px';
+    lienzo.style.cursor = 'pointer';
+  } else { info.style.display = 'none'; lienzo.style.cursor = 'default'; }
+});
+lienzo.addEventListener('mouseleave', () => { encima = -1; info.style.display = 'none'; dibujar(); });
+lienzo.addEventListener('click', e => {
+  const r = lienzo.getBoundingClientRect(), i = nodoEn(e.clientX - r.left, e.clientY - r.top);
+  seleccionado = i === seleccionado ? -1 : i; dibujar();
+});
+for (const id of ['positivas', 'negativas', 'nubes']) document.getElementById(id).addEventListener('change', dibujar);
+document.getElementById('umbral').addEventListener('input', e => { document.getElementById('valor_umbral').textContent = e.target.value; dibujar(); });
+
+document.getElementById('leyenda').innerHTML = D.categorias
+  .filter((c, k) => D.nodos.categoria.includes(k))
+  .map(c => `<span class="leyenda"><span class="muestra" style="background:${c.color}"></span>${esc(c.etiqueta)}</span>`).join(' ');
+window.addEventListener('resize', ajustar);
+ajustar();
+</script>
+</body></html>
+"""
@@ -0,0 +1,123 @@
+import io
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .matriz import MatrizSociograma, parsear_matriz, validar_matriz
+from .atributos import separar_atributos
+
+
+# Análisis de una misma clase a lo largo de varios periodos (p. ej. trimestres).
+# Solo se parsea cada matriz: todo lo demás se calcula sobre un único array
+# (periodos x alumnos x alumnos), sin repetir el proceso completo por periodo
+
+
+@dataclass
+class SerieSociograma:
+    periodos: list              # etiqueta de cada periodo, en orden
+    nombres: list               # unión de los alumnos de todos los periodos
+    valores: np.ndarray         # (T, n, n) float32, fila = votado, columna = votante
+    presentes: np.ndarray       # (T, n) bool: el alumno aparece en la matriz del periodo
+
+
+@dataclass
+class EvolucionSociograma:
+    serie: SerieSociograma
+    aceptacion: pd.DataFrame    # aceptación neta por alumno (filas) y periodo (columnas)
+    indice: pd.DataFrame        # índice de aceptación 0-100 por alumno y periodo
+    rotacion: pd.DataFrame      # cambios de aristas entre periodos consecutivos
+    figuras: dict = field(default_factory=dict)  # nombre de la figura -> PNG en bytes
+
+    def imagen(self, nombre):
+        return io.BytesIO(self.figuras[nombre])
+
+
+def alinear_matrices(matrices, periodos=None):
+    # Admite DataFrames (se parsean, sin las columnas de atributos) o matrices ya parseadas
+    matrices = [m if isinstance(m, MatrizSociograma) else parsear_matriz(separar_atributos(m)[0]) for m in matrices]
+    for m in matrices:
+        validar_matriz(m)
+    periodos = list(periodos) if periodos is not None else [f'Periodo {t + 1}' for t in range(len(matrices))]
+
+    # Unión de alumnos en orden de primera aparición
+    posicion = {}
+    for m in matrices:
+        for alumno in m.nombres:
+            posicion.setdefault(alumno, len(posicion))
+    nombres = list(posicion)
+
+    valores = np.zeros((len(matrices), len(nombres), len(nombres)), dtype=np.float32)
+    presentes = np.zeros((len(matrices), len(nombres)), dtype=bool)
+    for t, m in enumerate(matrices):
+        indices = np.array([posicion[a] for a in m.nombres])
+        valores[t][np.ix_(indices, indices)] = m.valores
+        presentes[t, indices] = True
+
+    return SerieSociograma(periodos, nombres, valores, presentes)
+
+
+def analizar_serie(serie):
+    if len(serie.periodos) < 2:
+        raise ValueError("Para analizar la evolución hacen falta al menos dos periodos")
+
+    # Aceptación neta (suma de votos recibidos) de cada alumno en cada periodo
+    aceptacion = serie.valores.sum(axis=2, dtype=np.float64)
+    aceptacion = np.where(serie.presentes, aceptacion, np.nan)
+
+    # Índice 0-100 por periodo, igual que en el informe de un solo periodo
+    minimo = np.nanmin(aceptacion, axis=1, keepdims=True)
+    rango = np.nanmax(aceptacion, axis=1, keepdims=True) - minimo
+    indice = np.round((aceptacion - minimo) / np.where(rango == 0, 1, rango) * 100, 1)
+
+    # Rotación de aristas entre periodos consecutivos a partir del signo de cada voto. Solo
+    # cuentan los pares de alumnos presentes en los dos periodos: un alumno que llega o se
+    # va no es una pérdida ni una ganancia de relaciones
+    signo = np.sign(serie.valores).astype(np.int8)
+    ambos = serie.presentes[:-1] & serie.presentes[1:]
+    comunes = ambos[:, :, None] & ambos[:, None, :]
+    antes, despues = signo[:-1], signo[1:]
+    nuevas = (antes == 0) & (despues != 0) & comunes
+    perdidas = (antes != 0) & (despues == 0) & comunes
+    invertidas = ((antes * despues) < 0) & comunes
+    aristas = (signo != 0).sum(axis=(1, 2))
+    comparables = ((antes != 0) & comunes).sum(axis=(1, 2)) + ((despues != 0) & comunes).sum(axis=(1, 2))
+
+    transiciones = [f'{a} → {b}' for a, b in zip(serie.periodos[:-1], serie.periodos[1:])]
+    rotacion = pd.DataFrame({
+        'Nuevas': nuevas.sum(axis=(1, 2)),
+        'Perdidas': perdidas.sum(axis=(1, 2)),
+        'Invertidas': invertidas.sum(axis=(1, 2)),
+        'Aristas': aristas[1:],
+    }, index=transiciones)
+    rotacion['Rotación (%)'] = (
+        (rotacion['Nuevas'] + rotacion['Perdidas'] + rotacion['Invertidas']) /
+        np.maximum(comparables, 1) * 200
+    ).round(1)
+
+    return EvolucionSociograma(
+        serie=serie,
+        aceptacion=pd.DataFrame(aceptacion.T, index=serie.nombres, columns=serie.periodos),
+        indice=pd.DataFrame(indice.T, index=serie.nombres, columns=serie.periodos),
+        rotacion=rotacion
+    )
+
+
+def analizar_evolucion(matrices, periodos=None, figuras=True):
+    evolucion = analizar_serie(alinear_matrices(matrices, periodos))
+    if figuras:
+        from .figuras import figura_evolucion_aceptacion, figura_rotacion_aristas
+        evolucion.figuras['evolucion_aceptacion'] = figura_evolucion_aceptacion(evolucion.indice)
+        evolucion.figuras['rotacion_aristas'] = figura_rotacion_aristas(evolucion.rotacion)
+    return evolucion
+
+
+def mayores_cambios(evolucion, n=5):
+    # Alumnos con mayor variación de aceptación neta entre el primer y el último periodo
+    # en que aparecen
+    aceptacion = evolucion.aceptacion
+    primero = aceptacion.bfill(axis=1).iloc[:, 0]
+    ultimo = aceptacion.ffill(axis=1).iloc[:, -1]
+    cambios = pd.DataFrame({'Inicial': primero, 'Final': ultimo, 'Variación': ultimo - primero}).dropna()
+    cambios = cambios.sort_values('Variación')
+    return cambios.tail(n)[::-1], cambios.head(n)
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+
+
+# Códigos de la encuesta y su puntuación ajustada
+MAPA_VALORES = {
+    "3": 3, "2": 2, "1": 1,
+    "-3": -3, "-2": -2, "-1": -1,
+    "2!": 1.5, "-1!!": 1.5,
+    "1!": 0.5, "!!": 0.5, "-1!": 0.5,
+    "1!!": -1.5, "-2!": -1.5,
+    "": 0
+}
+
+# Tabla de categorías: el índice de cada código es su categoría
+CODIGOS = tuple(MAPA_VALORES)
+VALORES = np.array([MAPA_VALORES[c] for c in CODIGOS], dtype=np.float32)
+
+# Categoría de los códigos no reconocidos en la matriz de categorías (uint8)
+DESCONOCIDO = 255
+
+# Alumnos (o subgrupos) máximos con anotación por celda en el heatmap
+UMBRAL_ANOTACIONES = 60
+
+_INDICE_CODIGOS = pd.Index(CODIGOS)
+
+# Texto de cada categoría uint8 (las que no son ningún código, vacías)
+TEXTOS_CATEGORIAS = np.array(list(CODIGOS) + [''] * (DESCONOCIDO + 1 - len(CODIGOS)), dtype=object)
+
+
+def categorias_codigos(textos):
+    # Categoría (índice en CODIGOS) de cada texto de un array 1D; -1 si no es un código
+    return _INDICE_CODIGOS.get_indexer(textos)
+
+
+@dataclass
+class MatrizSociograma:
+    nombres: list               # alumnos en el orden de filas y columnas
+    valores: np.ndarray         # puntuaciones float32 (fila = votado, columna = votante)
+    anotaciones: np.ndarray     # códigos originales (strings); None si solo hay categorías (.sgm)
+    desconocidos: list = field(default_factory=list)  # (votado, votante, código)
+    codigos: np.ndarray = None  # categoría uint8 de cada código (índice en CODIGOS)
+
+    @property
+    def n(self):
+        return len(self.nombres)
+
+    def sumatorio(self):
+        return self.valores.sum(axis=1, dtype=np.float64)
+
+    def textos(self, filas=None, columnas=None):
+        # Códigos originales de las celdas filas x columnas (arrays de índices; todas por
+        # defecto), p. ej. para anotar el heatmap. Sin la matriz de textos se forman a partir
+        # de las categorías solo para esas celdas, con los desconocidos repuestos
+        filas = np.arange(self.n) if filas is None else np.asarray(filas)
+        columnas = np.arange(self.n) if columnas is None else np.asarray(columnas)
+        if self.anotaciones is not None:
+            return self.anotaciones[np.ix_(filas, columnas)]
+
+        textos = TEXTOS_CATEGORIAS[self.codigos[np.ix_(filas, columnas)]]
+        if self.desconocidos:
+            fila = {i: k for k, i in enumerate(filas)}
+            columna = {j: k for k, j in enumerate(columnas)}
+            posicion = {alumno: i for i, alumno in enumerate(self.nombres)}
+            for votado, votante, codigo in self.desconocidos:
+                i, j = posicion[votado], posicion[votante]
+                if i in fila and j in columna:
+                    textos[fila[i], columna[j]] = codigo
+        return textos
+
+
+def _columna_a_texto(columna):
+    # Las columnas que pandas lee como numéricas (p. ej. solo "3" y vacíos)
+    # se devuelven a su representación textual original
+    valores = columna.to_numpy()
+    if columna.dtype.kind in 'iuf':
+        valores = valores.astype(np.float64)
+        vacios = np.isnan(valores)
+        texto = np.char.mod('%g', np.where(vacios, 0, valores)).astype(object)
+        texto[vacios] = ''
+        return texto
+    return columna.fillna('').astype(str).str.strip().to_numpy(dtype=object)
+
+
+def parsear_matriz(df):
+    nombres = [str(n).strip() for n in df.index]
+    columnas = [str(c).strip() for c in df.columns]
+
+    # Alineamos las columnas (votantes) con el orden de las filas (votados)
+    if sorted(nombres) != sorted(columnas):
+        raise ValueError("Las filas y las columnas de la matriz no contienen los mismos alumnos")
+    df = df.set_axis(columnas, axis=1)[nombres]
+
+    # Matriz de códigos originales (sin espacios alrededor)
+    anotaciones = np.empty(df.shape, dtype=object)
+    for j, col in enumerate(df.columns):
+        anotaciones[:, j] = _columna_a_texto(df[col])
+
+    # Convertimos todos los códigos a categorías de una sola vez
+    categorias = categorias_codigos(anotaciones.ravel()).reshape(df.shape)
+
+    # Los códigos desconocidos se registran con su celda y puntúan 0
+    filas, cols = np.nonzero(categorias < 0)
+    desconocidos = [(nombres[i], nombres[j], anotaciones[i, j]) for i, j in zip(filas, cols)]
+    valores = VALORES[np.where(categorias < 0, CODIGOS.index(""), categorias)]
+    codigos = np.where(categorias < 0, DESCONOCIDO, categorias).astype(np.uint8)
+
+    return MatrizSociograma(nombres, valores, anotaciones, desconocidos, codigos)
+
+
+@dataclass
+class CambiosMatriz:
+    filas: np.ndarray       # celdas cuyo código ha cambiado (alumno votado)
+    columnas: np.ndarray    # (alumno votante)
+    valores: bool           # ha cambiado alguna puntuación (no solo las anotaciones)
+    positivas: bool         # ha cambiado algún voto positivo
+    negativas: bool         # ha cambiado algún voto negativo
+    sumatorio: bool         # ha cambiado la puntuación total de algún alumno
+
+    @property
+    def vacio(self):
+        return len(self.filas) == 0
+
+
+def comparar_matrices(anterior, nueva):
+    # Solo se pueden comparar matrices con los mismos alumnos en el mismo orden
+    if anterior is None or anterior.nombres != nueva.nombres:
+        return None
+
+    if anterior.codigos is not None and nueva.codigos is not None:
+        # Por categorías, sin formar los textos; los desconocidos comparten categoría y se
+        # comparan por su texto
+        distintas = anterior.codigos != nueva.codigos
+        posicion = {alumno: i for i, alumno in enumerate(nueva.nombres)}
+        for votado, votante, _ in set(anterior.desconocidos) ^ set(nueva.desconocidos):
+            distintas[posicion[votado], posicion[votante]] = True
+    else:
+        distintas = anterior.textos() != nueva.textos()
+    filas, columnas = np.nonzero(distintas)
+    va, vn = anterior.valores, nueva.valores
+    return CambiosMatriz(
+        filas=filas,
+        columnas=columnas,
+        valores=not np.array_equal(va, vn),
+        positivas=not np.array_equal(np.maximum(va, 0), np.maximum(vn, 0)),
+        negativas=not np.array_equal(np.minimum(va, 0), np.minimum(vn, 0)),
+        sumatorio=not np.array_equal(anterior.sumatorio(), nueva.sumatorio())
+    )
+
+
+def validar_matriz(matriz):
+    if matriz.desconocidos:
+        celdas = ', '.join(f"{votado}/{votante}: '{codigo}'" for votado, votante, codigo in matriz.desconocidos)
+        raise ValueError(f"Códigos no reconocidos en la matriz ({celdas})")
+
+
+def agregar_por_grupos(valores, grupos):
+    # Media de los votos entre cada par de subgrupos (fila = grupo votado,
+    # columna = grupo votante), calculada con una matriz de pertenencia
+    etiquetas, indices = np.unique(np.asarray(grupos), return_inverse=True)
+    pertenencia = np.zeros((len(indices), len(etiquetas)), dtype=np.float64)
+    pertenencia[np.arange(len(indices)), indices] = 1
+    tamanos = pertenencia.sum(axis=0)
+
+    sumas = pertenencia.T @ np.asarray(valores, dtype=np.float64) @ pertenencia
+    medias = sumas / np.outer(tamanos, tamanos)
+    return etiquetas, medias, tamanos.astype(int)
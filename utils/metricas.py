@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+
+# Índices sociométricos clásicos por alumno, calculados en bloque sobre la matriz
+# numérica (fila = votado, columna = votante) sin recorrer pares en Python
+
+# Umbral de las puntuaciones tipificadas para clasificar el estatus sociométrico
+UMBRAL_ESTATUS = 1.0
+
+ESTATUS = ('Popular', 'Rechazado', 'Ignorado', 'Controvertido', 'Medio')
+
+
+def _tipificar(x):
+    desviacion = x.std()
+    return (x - x.mean()) / desviacion if desviacion > 0 else np.zeros_like(x)
+
+
+def clasificar_estatus(positivas_recibidas, negativas_recibidas):
+    # Clasificación de Coie y Dodge: preferencia social (elecciones - rechazos) e
+    # impacto social (elecciones + rechazos), tipificados dentro del grupo
+    z_pos = _tipificar(positivas_recibidas.astype(np.float64))
+    z_neg = _tipificar(negativas_recibidas.astype(np.float64))
+    preferencia = _tipificar(z_pos - z_neg)
+    impacto = _tipificar(z_pos + z_neg)
+
+    u = UMBRAL_ESTATUS
+    condiciones = [
+        (preferencia > u) & (z_pos > 0) & (z_neg < 0),
+        (preferencia < -u) & (z_neg > 0) & (z_pos < 0),
+        (impacto < -u) & (z_pos < 0) & (z_neg < 0),
+        (impacto > u) & (z_pos > 0) & (z_neg > 0),
+    ]
+    return np.select(condiciones, ESTATUS[:4], default=ESTATUS[4]), preferencia, impacto
+
+
+def calcular_metricas(valores, nombres):
+    valores = np.asarray(valores)
+
+    positivas = valores > 0
+    negativas = valores < 0
+    np.fill_diagonal(positivas, False)
+    np.fill_diagonal(negativas, False)
+
+    # Recibidas por filas, emitidas por columnas
+    pos_recibidas = positivas.sum(axis=1)
+    neg_recibidas = negativas.sum(axis=1)
+    pos_emitidas = positivas.sum(axis=0)
+    neg_emitidas = negativas.sum(axis=0)
+
+    # Pares recíprocos: la matriz y su traspuesta coinciden en signo
+    reciprocas = (positivas & positivas.T).sum(axis=1)
+    rechazos_mutuos = (negativas & negativas.T).sum(axis=1)
+
+    return _tabla_metricas(nombres, pos_recibidas, neg_recibidas, pos_emitidas, neg_emitidas,
+                           reciprocas, rechazos_mutuos)
+
+
+def metricas_aristas(origen, destino, pesos, nombres):
+    # Mismos índices a partir de la lista de aristas (votante -> votado, peso), sin la
+    # matriz n x n: es lo que acumula la lectura por bloques de matrices grandes
+    n = len(nombres)
+    origen, destino, pesos = np.asarray(origen, np.int64), np.asarray(destino, np.int64), np.asarray(pesos)
+    fuera_diagonal = origen != destino
+    origen, destino, pesos = origen[fuera_diagonal], destino[fuera_diagonal], pesos[fuera_diagonal]
+
+    def contar(indices):
+        return np.bincount(indices, minlength=n)
+
+    def mutuos(signo):
+        # Votos del mismo signo en los dos sentidos: se busca la arista inversa por su clave
+        claves = origen[signo] * n + destino[signo]
+        inversas = destino[signo] * n + origen[signo]
+        return contar(destino[signo][np.isin(inversas, claves)])
+
+    positivas, negativas = pesos > 0, pesos < 0
+    return _tabla_metricas(nombres, contar(destino[positivas]), contar(destino[negativas]),
+                           contar(origen[positivas]), contar(origen[negativas]),
+                           mutuos(positivas), mutuos(negativas))
+
+
+def _tabla_metricas(nombres, pos_recibidas, neg_recibidas, pos_emitidas, neg_emitidas, reciprocas,
+                    rechazos_mutuos):
+    otros = max(len(nombres) - 1, 1)
+    estatus, preferencia, impacto = clasificar_estatus(pos_recibidas, neg_recibidas)
+    return pd.DataFrame({
+        'Elecciones recibidas': pos_recibidas,
+        'Rechazos recibidos': neg_recibidas,
+        'Elecciones emitidas': pos_emitidas,
+        'Rechazos emitidos': neg_emitidas,
+        'Elecciones recíprocas': reciprocas,
+        'Rechazos mutuos': rechazos_mutuos,
+        'Popularidad': np.round(pos_recibidas / otros, 3),
+        'Rechazo': np.round(neg_recibidas / otros, 3),
+        'Expansividad': np.round(pos_emitidas / otros, 3),
+        'Preferencia social': np.round(preferencia, 2),
+        'Impacto social': np.round(impacto, 2),
+        'Estatus': estatus,
+    }, index=pd.Index(nombres, name='Alumno'))
+
+
+def resumen_metricas(df_metricas):
+    # Índices de grupo: número de alumnos por estatus y cohesión (pares recíprocos
+    # entre pares posibles)
+    n = len(df_metricas)
+    pares = n * (n - 1) / 2
+    return {
+        'alumnos': n,
+        'estatus': df_metricas['Estatus'].value_counts().reindex(ESTATUS, fill_value=0).to_dict(),
+        'pares_reciprocos': int(df_metricas['Elecciones recíprocas'].sum() // 2),
+        'rechazos_mutuos': int(df_metricas['Rechazos mutuos'].sum() // 2),
+        'cohesion': round(float(df_metricas['Elecciones recíprocas'].sum()) / 2 / pares, 3) if pares else 0.0,
+    }
+
+
+def metricas_a_csv(df_metricas):
+    # Con BOM para que Excel reconozca las tildes
+    return df_metricas.to_csv(sep=';', decimal=',').encode('utf-8-sig')
@@ -0,0 +1,373 @@
+import copy
+import io
+import os
+from datetime import datetime
+from functools import lru_cache
+
+
+# Parte fija del informe PDF, preparada una sola vez por proceso: hojas de estilo, textos
+# explicativos ya analizados (y repartidos en líneas para cada ancho de columna) y la
+# imagen de portada reducida a su tamaño impreso. Cada informe solo construye lo que
+# depende de la clase: figuras, tablas y textos con cifras
+
+# Resolución con la que se incrustan las figuras (puntos por pulgada del tamaño impreso).
+# None incrusta los PNG tal cual se dibujaron
+DPI_INFORME = 150
+
+# Calidad JPEG de las figuras incrustadas; None las deja en PNG (sin pérdidas)
+CALIDAD_INFORME = None
+
+RUTA_PORTADA = os.path.join(os.path.dirname(__file__), "Portada.jpg")
+TAMANO_PORTADA = (250, 205)
+
+# Textos explicativos fijos de cada sección
+TEXTOS = {
+    'heatmap': """
+    El siguiente mapa de calor muestra los resultados agregados de las votaciones entre los alumnos.<br/><br/>
+    Cada celda representa la valoración que un alumno (<i>columna</i>) realiza sobre otro (<i>fila</i>).
+    Los alumnos están ordenados de forma decreciente según la puntuación total recibida (<b>sumatorio</b>),
+    de modo que los alumnos con mayor aceptación aparecen en la parte superior.<br/><br/>
+
+    <b>Escala y significado de los valores:</b><br/>
+    • Los votos provienen de tres actividades en las que cada alumno indicaba si haría o no la actividad con sus compañeros.<br/>
+    • Un “sí” suma +1 punto, un “no” resta −1, y no votar equivale a 0.<br/>
+    • El valor total por alumno puede ir de <b>−3</b> (rechazo total) a <b>+3</b> (aceptación total).<br/><br/>
+
+    <b>Interpretación de los valores en las celdas:</b><br/>
+    • <b>3</b> → el votante respondió “sí” en las 3 actividades (máxima afinidad).<br/>
+    • <b>2</b> → dos “sí” y una respuesta neutra o ausente (afinidad alta).<br/>
+    • <b>1</b> → un “sí” y dos neutros o negativos (afinidad leve).<br/>
+    • <b>0</b> → ausencia de voto o balance neutro.<br/>
+    • <b>−1</b> → un “no” neto (rechazo leve).<br/>
+    • <b>−2</b> → dos “no” (rechazo claro).<br/>
+    • <b>−3</b> → tres “no” (rechazo total).<br/><br/>
+
+    <b>Casos con signos de exclamación (!):</b><br/>
+    Estos símbolos indican combinaciones mixtas de respuestas “sí” y “no”, que se transforman internamente en valores intermedios:<br/>
+    • <b>2!</b> → mapeado a <b>1.5</b>: dos “sí” y un “no”.<br/>
+    • <b>1!</b>, <b>!!</b>, <b>−1!</b> → mapeados a <b>0.5</b>: respuestas mixtas con ligera tendencia positiva.<br/>
+    • <b>1!!</b>, <b>−2!</b> → mapeados a <b>−1.5</b>: tendencia negativa.<br/>
+    Estos valores intermedios permiten representar de manera más precisa la ambigüedad en las votaciones mixtas.<br/><br/>
+
+    <b>Paleta de color:</b><br/>
+    • <font color='green'><b>Verde</b></font> → valoración positiva (afinidad).<br/>
+    • <font color='red'><b>Rojo</b></font> → valoración negativa (rechazo).<br/>
+    • <font color='orange'><b>Amarillo</b></font> → respuesta neutra o ambigua.<br/><br/>
+
+    <b>Cómo interpretar el gráfico:</b><br/>
+    • <b>Filas</b> → alumno votado (quién recibe los votos).<br/>
+    • <b>Columnas</b> → alumno votante (quién emite los votos).<br/>
+    • Una fila predominantemente verde indica un alumno muy aceptado.<br/>
+    • Una fila con muchos rojos refleja rechazo generalizado.<br/>
+    • Una columna con muchos rojos indica un alumno que tiende a votar negativamente.<br/>
+    • Los bloques verdes diagonales o agrupados sugieren subgrupos de afinidad.<br/><br/>
+
+    <b>Nota:</b> los valores en las celdas corresponden a las respuestas originales, preservando los símbolos “!” para mantener la información de los casos mixtos.
+    """,
+
+    'aceptacion': """
+    En esta sección se representan los niveles de aceptación de cada alumno en función de los votos recibidos 
+    por parte de sus compañeros. La aceptación refleja la valoración global del grupo hacia cada individuo, 
+    teniendo en cuenta tanto los votos positivos como negativos.  
+    Los gráficos permiten identificar fácilmente quiénes son los alumnos más valorados (mayor número de votos positivos) 
+    y aquellos que pueden experimentar menor integración o rechazo social.
+    """,
+
+    'aceptacion_neta': """
+    En este gráfico se muestran los <b>niveles de aceptación neta</b>, es decir, la suma de los votos recibidos por cada alumno.  
+    Las barras están ordenadas de mayor a menor puntuación, lo que permite identificar rápidamente a los miembros con 
+    mayor reconocimiento dentro del grupo.  
+    La <b>escala de color</b> va del <b>verde</b> (mayor aceptación) al <b>rojo</b> (mayor rechazo), 
+    de acuerdo con la paleta <code>RdYlGn_r</code>.  
+    Cada barra incluye su puntuación total, y su longitud representa directamente la cantidad de votos netos obtenidos.
+    """,
+
+    'aceptacion100': """
+    El segundo gráfico muestra los mismos datos transformados en una <b>escala normalizada de 0 a 100</b>.  
+    Este índice permite comparar los niveles de aceptación entre diferentes grupos o periodos, 
+    ya que elimina las diferencias debidas a la escala original de votos.  
+    El alumno con la puntuación más alta se sitúa en 100%, y el de menor puntuación en 0%.  
+    De nuevo, el gradiente de color verde–rojo facilita una lectura intuitiva: verde indica alta aceptación, 
+    mientras que tonos anaranjados o rojizos reflejan baja aceptación o posible aislamiento.
+    """,
+
+    'metricas': """
+    Además de la aceptación neta, para cada alumno se cuentan las <b>elecciones</b> (votos positivos) y
+    <b>rechazos</b> (votos negativos) recibidos y emitidos, las <b>elecciones recíprocas</b> (ambos alumnos
+    se eligen) y los <b>rechazos mutuos</b>.<br/><br/>
+    El <b>estatus sociométrico</b> se obtiene comparando elecciones y rechazos recibidos con la media del grupo:<br/>
+    • <b>Popular</b>: muchas elecciones y pocos rechazos.<br/>
+    • <b>Rechazado</b>: muchos rechazos y pocas elecciones.<br/>
+    • <b>Ignorado</b>: recibe pocas elecciones y pocos rechazos.<br/>
+    • <b>Controvertido</b>: recibe muchas elecciones y muchos rechazos.<br/>
+    • <b>Medio</b>: el resto.
+    """,
+
+    'grafos': """
+    En esta sección se presentan tres representaciones gráficas (grafos sociométricos) que muestran las relaciones entre los alumnos 
+    según las valoraciones que emitieron en la encuesta.  
+    Cada nodo representa a un alumno, y las conexiones (flechas) indican los votos que ha dado un alumno hacia otro.
+    El color de la arista refleja el tipo de valoración: <b>verde</b> para votos positivos (afinidad) y <b>rojo</b> para votos negativos (rechazo).  
+    El tamaño del nodo es proporcional al nivel de aceptación recibido, y la forma distingue el género (<b>círculos rosas</b> para mujeres,
+    <b>triángulos azules</b> para hombres, <b>cuadrados grises</b> si no consta) u otra categoría indicada en la leyenda.  
+    Los grafos se generan mediante un modelo de fuerzas, de modo que los alumnos con mayor afinidad positiva aparecen más próximos entre sí.
+    """,
+
+    'grafo_general': """
+    Este grafo incluye todas las relaciones entre alumnos, tanto positivas como negativas.  
+    Permite observar simultáneamente las afinidades y los rechazos dentro del grupo.  
+    Las flechas verdes representan vínculos positivos y las rojas, vínculos negativos.  
+    La cercanía entre nodos se debe principalmente a los votos positivos (los alumnos que se aprecian mutuamente tienden a agruparse).
+    """,
+
+    'grafo_aceptacion': """
+    En este grafo se muestran exclusivamente las <b>relaciones positivas</b> (votos mayores que cero).  
+    Los colores de fondo difuminados agrupan a los alumnos en <b>grupos de afinidad</b> (G1, G2, ...),
+    es decir, subgrupos de alumnos que se eligen entre sí mucho más de lo que eligen al resto de la clase.  
+    Este grafo revela los <b>núcleos de afinidad</b> o amistades consolidadas dentro del grupo.
+    """,
+
+    'grafo_negativo': """
+    En este grafo se representan únicamente las <b>relaciones negativas</b> (votos menores que cero).  
+    Las flechas rojas indican las direcciones del rechazo.  
+    Los nodos con muchas conexiones salientes pueden estar generando rechazo hacia otros, 
+    mientras que los que reciben más conexiones entrantes pueden estar experimentando cierta <b>exclusión social</b>.  
+    El análisis de este grafo ayuda a detectar posibles <b>conflictos o dinámicas grupales desequilibradas</b>.
+    """,
+
+    'evolucion_aceptacion': """
+    Cada línea representa el <b>índice de aceptación normalizado (0–100)</b> de un alumno en cada periodo.
+    Se destacan en color los alumnos cuya aceptación ha variado más entre el primer y el último periodo.
+    """,
+
+    'rotacion_aristas': """
+    Para cada par de periodos consecutivos se cuentan las relaciones <b>nuevas</b> (no existían y aparecen),
+    <b>perdidas</b> (existían y desaparecen) e <b>invertidas</b> (pasan de afinidad a rechazo o al revés).
+    Una rotación alta indica un grupo cuyas relaciones todavía se están reorganizando.
+    """,
+
+    'tabla_grupos': """
+    La tabla resume cada grupo de afinidad: número de alumnos, <b>densidad</b> (porcentaje de las
+    elecciones posibles dentro del grupo que se han producido) y parejas de elección recíproca.
+    """,
+}
+
+# Anexo del informe consolidado: cada texto fijo aparece una sola vez, con el título de la
+# sección de cada capítulo a la que corresponde
+SECCIONES_ANEXO = [
+    ("1. Mapa de calor de votaciones", "Heading2", ['heatmap']),
+    ("2. Niveles de aceptación", "Heading2", ['aceptacion']),
+    ("2.1 Nivel de aceptación neto (escala original)", "Heading3", ['aceptacion_neta']),
+    ("2.2 Índice de aceptación normalizado (0–100)", "Heading3", ['aceptacion100']),
+    ("2.3 Índices sociométricos", "Heading3", ['metricas']),
+    ("3. Grafos de interacciones sociométricas", "Heading2", ['grafos']),
+    ("3.1 Grafo general de interacciones", "Heading3", ['grafo_general']),
+    ("3.2 Grafo de aceptación (relaciones positivas)", "Heading3", ['grafo_aceptacion', 'tabla_grupos']),
+    ("3.3 Grafo de rechazo (relaciones negativas)", "Heading3", ['grafo_negativo']),
+]
+
+
+@lru_cache(maxsize=None)
+def _clase_documento_indice():
+    from reportlab.platypus import SimpleDocTemplate
+
+    class DocumentoIndice(SimpleDocTemplate):
+        # Documento que anota en el índice (y en los marcadores del PDF) cada capítulo y
+        # cada sección principal. Necesita multiBuild para resolver los números de página
+        niveles = {'Capitulo': 0, 'Heading1': 1}
+
+        def afterFlowable(self, flowable):
+            nivel = self.niveles.get(getattr(getattr(flowable, 'style', None), 'name', None))
+            if nivel is None:
+                return
+            texto = flowable.getPlainText()
+            clave = f'indice-{self.seq.nextf("indice")}'
+            self.canv.bookmarkPage(clave)
+            self.canv.addOutlineEntry(texto, clave, level=nivel, closed=nivel > 0)
+            self.notify('TOCEntry', (nivel, texto, self.page, clave))
+
+    return DocumentoIndice
+
+
+@lru_cache(maxsize=None)
+def _clase_parrafo_fijo():
+    from reportlab.platypus import Paragraph
+
+    class ParrafoFijo(Paragraph):
+        # Párrafo cuyo reparto en líneas se guarda por ancho disponible. Las copias comparten
+        # ese registro, así que el texto solo se parte en líneas la primera vez. Los trozos
+        # que resultan de partirlo entre páginas no lo llevan y se reparten como siempre
+        def wrap(self, availWidth, availHeight):
+            registro = getattr(self, '_lineas', None)
+            if registro is None:
+                return super().wrap(availWidth, availHeight)
+            lineas = registro.get(availWidth)
+            if lineas is None:
+                ancho, alto = super().wrap(availWidth, availHeight)
+                registro[availWidth] = (ancho, alto, self.blPara, self._wrapWidths)
+                return ancho, alto
+            self.width, self.height, self.blPara, self._wrapWidths = lineas
+            return self.width, self.height
+
+        def split(self, availWidth, availHeight):
+            # Al partir, reportlab modifica las líneas: se reparten de nuevo para no tocar
+            # las del registro
+            if getattr(self, '_lineas', None) is not None:
+                super().wrap(availWidth, availHeight)
+            return super().split(availWidth, availHeight)
+
+    return ParrafoFijo
+
+
+def _parrafo_fijo(texto, estilo):
+    parrafo = _clase_parrafo_fijo()(texto, estilo)
+    parrafo._lineas = {}
+    return parrafo
+
+
+def _ajustar_imagen(datos, ancho, alto, dpi=DPI_INFORME, calidad=CALIDAD_INFORME, formato='PNG'):
+    # Reduce la imagen a su tamaño impreso (ancho y alto en puntos) a 'dpi' y la vuelve a
+    # codificar: en JPEG si se indica 'calidad' (reportlab lo incrusta sin recomprimir)
+    # o en PNG sin canal alfa
+    if dpi is None and calidad is None:
+        return datos
+    from PIL import Image as ImagenPIL
+
+    imagen = ImagenPIL.open(io.BytesIO(datos))
+    if imagen.mode in ('RGBA', 'LA', 'P'):
+        # Las figuras de matplotlib son opacas: solo se compone sobre blanco si hay transparencia
+        imagen = imagen.convert('RGBA')
+        if imagen.getchannel('A').getextrema()[0] < 255:
+            fondo = ImagenPIL.new('RGBA', imagen.size, 'white')
+            imagen = ImagenPIL.alpha_composite(fondo, imagen)
+        imagen = imagen.convert('RGB')
+    if dpi is not None:
+        tamano = (round(ancho / 72 * dpi), round(alto / 72 * dpi))
+        if tamano[0] < imagen.width:
+            imagen = imagen.resize(tamano, ImagenPIL.LANCZOS, reducing_gap=2.0)
+
+    # El PNG intermedio va sin comprimir: reportlab lo descomprime y lo comprime de nuevo
+    buffer = io.BytesIO()
+    if calidad is not None:
+        imagen.save(buffer, 'JPEG', quality=calidad, optimize=True)
+    else:
+        imagen.save(buffer, formato, compress_level=0)
+    return buffer.getvalue()
+
+
+class PlantillaInforme:
+
+    def __init__(self):
+        from reportlab import rl_config
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.enums import TA_JUSTIFY
+
+        # Flujos binarios en lugar de ASCII85: el PDF ocupa menos y las imágenes no se
+        # codifican en Python puro
+        rl_config.useA85 = 0
+
+        self.estilos = getSampleStyleSheet()
+
+        # Estilo de texto justificado
+        self.estilo_texto = ParagraphStyle(
+            name="Justify",
+            parent=self.estilos["Normal"],
+            alignment=TA_JUSTIFY,
+            leading=15
+        )
+
+        # Estilo alineado a la derecha
+        self.estilo_derecha = ParagraphStyle(
+            name="Derecha",
+            parent=self.estilos["Normal"],
+            alignment=2  # 2 = derecha
+        )
+
+        # Celdas de texto largo en las tablas
+        self.estilo_celda = ParagraphStyle(name='Celda', parent=self.estilos['Normal'], fontSize=8, leading=10)
+
+        # Título de cada clase en el informe consolidado
+        self.estilo_capitulo = ParagraphStyle(name='Capitulo', parent=self.estilos['Title'], spaceAfter=18)
+
+        self._textos = {nombre: _parrafo_fijo(texto, self.estilo_texto) for nombre, texto in TEXTOS.items()}
+        self._titulos = {}
+
+        with open(RUTA_PORTADA, 'rb') as f:
+            self._portada = _ajustar_imagen(f.read(), *TAMANO_PORTADA, dpi=DPI_INFORME, calidad=90)
+
+    def texto(self, nombre):
+        # Copia del texto fijo ya preparado (cada informe reparte sus propias páginas)
+        return copy.copy(self._textos[nombre])
+
+    def titulo(self, texto, nivel="Heading1"):
+        clave = (texto, nivel)
+        if clave not in self._titulos:
+            self._titulos[clave] = _parrafo_fijo(f"<b>{texto}</b>", self.estilos[nivel])
+        return copy.copy(self._titulos[clave])
+
+    def imagen(self, png, ancho, alto, dpi=DPI_INFORME, calidad=CALIDAD_INFORME):
+        from reportlab.platypus import Image
+
+        return Image(io.BytesIO(_ajustar_imagen(png, ancho, alto, dpi, calidad)), width=ancho, height=alto)
+
+    def capitulo(self, texto):
+        from reportlab.platypus import Paragraph
+
+        return Paragraph(f"<b>{texto}</b>", self.estilo_capitulo)
+
+    def indice(self):
+        from reportlab.platypus import Paragraph
+        from reportlab.platypus.tableofcontents import TableOfContents
+        from reportlab.lib.styles import ParagraphStyle
+
+        indice = TableOfContents(dotsMinLevel=0)
+        indice.levelStyles = [
+            ParagraphStyle(name='Indice0', parent=self.estilos['Normal'], fontName='Helvetica-Bold',
+                           fontSize=11, leading=16, spaceBefore=6),
+            ParagraphStyle(name='Indice1', parent=self.estilos['Normal'], fontSize=9, leading=12, leftIndent=18),
+        ]
+        return [Paragraph("<b>Índice</b>", self.estilos['Title']), indice]
+
+    def anexo(self):
+        # Textos explicativos comunes a todas las clases, una sola vez al final del informe
+        from reportlab.platypus import Spacer, PageBreak
+
+        elementos = [PageBreak(), self.capitulo("Anexo: cómo leer cada sección")]
+        for titulo, nivel, textos in SECCIONES_ANEXO:
+            elementos.append(self.titulo(titulo, nivel))
+            for nombre in textos:
+                elementos.append(self.texto(nombre))
+                elementos.append(Spacer(1, 6))
+        return elementos
+
+    def portada(self, clase=None, fecha=None, etiqueta='Clase'):
+        from reportlab.platypus import Paragraph, Image, Spacer, PageBreak
+
+        fecha = fecha or datetime.now()
+        titulo = Paragraph("<b>Informe de Sociograma</b>", self.estilos["Title"])
+
+        # Imagen centrada
+        imagen_portada = Image(io.BytesIO(self._portada), width=TAMANO_PORTADA[0], height=TAMANO_PORTADA[1])
+        imagen_portada.hAlign = 'CENTER'
+
+        # Textos inferiores (alineados a la derecha)
+        parrafo_clase = Paragraph(f"<b>{etiqueta}:</b> {clase or 'Poner clase'}", self.estilo_derecha)
+        parrafo_fecha = Paragraph(f"<b>Fecha de informe:</b> {fecha.strftime('%d/%m/%Y')}", self.estilo_derecha)
+
+        return [
+            Spacer(1, 100),          # espacio superior
+            titulo,
+            Spacer(1, 60),
+            imagen_portada,
+            Spacer(1, 250),          # empuja los textos hacia abajo
+            parrafo_clase,
+            Spacer(1, 10),
+            parrafo_fecha,
+            PageBreak(),
+        ]
+
+
+@lru_cache(maxsize=None)
+def obtener_plantilla():
+    # Una plantilla por proceso
+    return PlantillaInforme()
@@ -0,0 +1,393 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+
+# Cola de trabajos para sacar el cálculo pesado (grafos, figuras, PDF) del hilo de la
+# interfaz. Un número fijo de procesos trabajadores, que viven entre trabajos, ejecuta
+# uno cada vez; un hilo despachador reparte los pendientes, recoge los resultados y
+# mata y sustituye al trabajador cuyo trabajo se cancela o supera su tiempo máximo.
+# Los trabajos idénticos (misma clave) pendientes o en curso se comparten. Mientras
+# trabaja, el proceso puede enviar resultados parciales (publicar_parcial) y los
+# registros del logger 'sociograma', que el proceso principal emite con su configuración
+
+logger = logging.getLogger('sociograma')
+
+PENDIENTE = 'pendiente'
+EN_CURSO = 'en_curso'
+TERMINADO = 'terminado'
+ERROR = 'error'
+CANCELADO = 'cancelado'
+CADUCADO = 'caducado'
+
+FINALES = (TERMINADO, ERROR, CANCELADO, CADUCADO)
+
+# Mensajes del trabajador antes del resultado final
+_PARCIAL = 'parcial'
+_REGISTRO = 'registro'
+
+TIMEOUT_TRABAJO = 300        # segundos por trabajo, por defecto
+MAX_TERMINADOS = 500         # trabajos terminados que se conservan para consultar su estado
+
+
+@dataclass
+class Trabajo:
+    id: str
+    funcion: object
+    args: tuple
+    kwargs: dict
+    clave: str = None            # trabajos con la misma clave se deduplican
+    timeout: float = TIMEOUT_TRABAJO
+    estado: str = PENDIENTE
+    resultado: object = None
+    error: str = None
+    creado: float = field(default_factory=time.time)
+    inicio: float = None
+    fin: float = None
+    cancelar: bool = False
+    parciales: list = field(default_factory=list)  # resultados parciales, en orden de llegada
+
+    @property
+    def terminado(self):
+        return self.estado in FINALES
+
+    @property
+    def duracion(self):
+        if self.inicio is None:
+            return 0.0
+        return (self.fin or time.time()) - self.inicio
+
+
+# Conexión con el proceso principal e id del trabajo en curso (solo en un trabajador)
+_canal = None
+
+
+def publicar_parcial(valor):
+    # Desde la función de un trabajo: envía un resultado parcial, que aparece en
+    # Trabajo.parciales mientras el trabajo sigue en curso. Fuera de un trabajador no hace nada
+    if _canal is not None:
+        conexion, id_trabajo = _canal
+        conexion.send((id_trabajo, _PARCIAL, valor))
+
+
+class _ReenvioRegistros(logging.Handler):
+    # Los procesos 'spawn' no heredan la configuración de logging: los registros (las
+    # etapas de Medicion, entre otros) se reenvían al proceso principal
+    def emit(self, record):
+        if _canal is None:
+            return
+        conexion, id_trabajo = _canal
+        try:
+            conexion.send((id_trabajo, _REGISTRO, (record.levelno, record.getMessage())))
+        except Exception:
+            self.handleError(record)
+
+
+def _bucle_trabajador(conexion):
+    # Se ejecuta en el proceso trabajador: recibe (id, función, args, kwargs) y devuelve
+    # (id, estado, resultado o traza del error), precedido de los parciales y registros
+    global _canal
+    registros = logging.getLogger('sociograma')
+    registros.addHandler(_ReenvioRegistros())
+    registros.setLevel(logging.INFO)
+    registros.propagate = False
+
+    while True:
+        try:
+            mensaje = conexion.recv()
+        except (EOFError, OSError):
+            return
+        if mensaje is None:
+            return
+        id_trabajo, funcion, args, kwargs = mensaje
+        _canal = (conexion, id_trabajo)
+        try:
+            respuesta = (id_trabajo, TERMINADO, funcion(*args, **kwargs))
+        except Exception as e:
+            respuesta = (id_trabajo, ERROR, f'{type(e).__name__}: {e}\n{traceback.format_exc()}')
+        finally:
+            _canal = None
+        try:
+            conexion.send(respuesta)
+        except Exception as e:
+            # El resultado no se puede serializar
+            conexion.send((id_trabajo, ERROR, f'{type(e).__name__}: {e}'))
+
+
+class _Trabajador:
+    def __init__(self, contexto):
+        self.conexion, remota = contexto.Pipe()
+        self.proceso = contexto.Process(target=_bucle_trabajador, args=(remota,), daemon=True)
+        self.proceso.start()
+        remota.close()
+        self.trabajo = None
+
+    def detener(self, forzar=False):
+        if forzar:
+            self.proceso.terminate()
+        else:
+            try:
+                self.conexion.send(None)
+            except OSError:
+                pass
+        self.proceso.join(timeout=5)
+        if self.proceso.is_alive():
+            self.proceso.kill()
+        self.conexion.close()
+
+
+class ColaTrabajos:
+
+    def __init__(self, procesos=None, timeout=TIMEOUT_TRABAJO, contexto='spawn', intervalo=0.05):
+        # 'spawn' para no heredar hilos ni estado de matplotlib del proceso de la interfaz
+        self.procesos = procesos or min(4, os.cpu_count() or 1)
+        self.timeout = timeout
+        self.intervalo = intervalo
+        self._contexto = multiprocessing.get_context(contexto)
+        self._trabajos = OrderedDict()     # id -> Trabajo, en orden de llegada
+        self._pendientes = deque()
+        self._por_clave = {}               # clave -> id de un trabajo pendiente o en curso
+        self._trabajadores = []
+        self._condicion = threading.Condition()
+        self._cerrada = False
+        self._contador = itertools.count()
+        self._despachador = threading.Thread(target=self._despachar, name='cola-trabajos', daemon=True)
+        self._despachador.start()
+
+    def enviar(self, funcion, *args, clave=None, timeout=None, **kwargs):
+        # Devuelve el id del trabajo; si ya hay uno pendiente o en curso con la misma
+        # clave se devuelve el suyo
+        with self._condicion:
+            if self._cerrada:
+                raise RuntimeError('La cola de trabajos está cerrada')
+            if clave is not None and clave in self._por_clave:
+                return self._por_clave[clave]
+            id_trabajo = f'{next(self._contador):06d}-{uuid.uuid4().hex[:8]}'
+            trabajo = Trabajo(id_trabajo, funcion, args, kwargs, clave, timeout or self.timeout)
+            self._trabajos[id_trabajo] = trabajo
+            self._pendientes.append(id_trabajo)
+            if clave is not None:
+                self._por_clave[clave] = id_trabajo
+            self._condicion.notify_all()
+        logger.info(f'Trabajo {id_trabajo} en cola ({getattr(funcion, "__name__", funcion)})')
+        return id_trabajo
+
+    def estado(self, id_trabajo):
+        with self._condicion:
+            return self._trabajos.get(id_trabajo)
+
+    def posicion(self, id_trabajo):
+        # Trabajos por delante en la cola (0 si es el siguiente); None si ya no está pendiente
+        with self._condicion:
+            try:
+                return self._pendientes.index(id_trabajo)
+            except ValueError:
+                return None
+
+    def resultado(self, id_trabajo, espera=None):
+        # Espera a que el trabajo termine y devuelve el Trabajo (con su estado final) o
+        # None si se agota la espera
+        limite = None if espera is None else time.time() + espera
+        with self._condicion:
+            trabajo = self._trabajos[id_trabajo]
+            while not trabajo.terminado:
+                restante = None if limite is None else limite - time.time()
+                if restante is not None and restante <= 0:
+                    return None
+                self._condicion.wait(restante)
+            return trabajo
+
+    def cancelar(self, id_trabajo):
+        with self._condicion:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None or trabajo.terminado:
+                return False
+            if trabajo.estado == PENDIENTE:
+                self._pendientes.remove(id_trabajo)
+                self._finalizar(trabajo, CANCELADO)
+            else:
+                # El despachador mata al trabajador en su siguiente vuelta
+                trabajo.cancelar = True
+            self._condicion.notify_all()
+            return True
+
+    def resumen(self):
+        with self._condicion:
+            estados = [t.estado for t in self._trabajos.values()]
+        return {estado: estados.count(estado) for estado in (PENDIENTE, EN_CURSO) + FINALES}
+
+    def cerrar(self):
+        with self._condicion:
+            self._cerrada = True
+            for id_trabajo in list(self._pendientes):
+                self._finalizar(self._trabajos[id_trabajo], CANCELADO)
+            self._pendientes.clear()
+            self._condicion.notify_all()
+        self._despachador.join()
+        for trabajador in self._trabajadores:
+            trabajador.detener(forzar=trabajador.trabajo is not None)
+        self._trabajadores = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+    # --- Hilo despachador --------------------------------------------------------------
+
+    def _finalizar(self, trabajo, estado, resultado=None, error=None):
+        # Se llama con el lock tomado
+        trabajo.estado, trabajo.resultado, trabajo.error = estado, resultado, error
+        trabajo.fin = time.time()
+        trabajo.funcion, trabajo.args, trabajo.kwargs = None, (), {}
+        # Los parciales ya están en el resultado final
+        trabajo.parciales = []
+        if trabajo.clave is not None and self._por_clave.get(trabajo.clave) == trabajo.id:
+            del self._por_clave[trabajo.clave]
+        logger.info(f'Trabajo {trabajo.id}: {estado} ({trabajo.duracion:.1f} s)')
+
+        # Olvidamos los trabajos terminados más antiguos
+        terminados = [i for i, t in self._trabajos.items() if t.terminado]
+        for id_antiguo in terminados[:max(0, len(terminados) - MAX_TERMINADOS)]:
+            del self._trabajos[id_antiguo]
+
+    def _sustituir(self, trabajador):
+        trabajador.detener(forzar=True)
+        self._trabajadores[self._trabajadores.index(trabajador)] = _Trabajador(self._contexto)
+
+    def _revisar(self, trabajador):
+        trabajo = trabajador.trabajo
+        try:
+            listo = trabajador.conexion.poll()
+        except OSError:
+            listo = False
+        while listo:
+            try:
+                id_trabajo, estado, valor = trabajador.conexion.recv()
+            except (EOFError, OSError):
+                self._finalizar(trabajo, ERROR, error='El proceso trabajador ha terminado inesperadamente')
+                trabajador.trabajo = None
+                self._sustituir(trabajador)
+                return
+            if estado == _REGISTRO:
+                logger.log(*valor)
+            elif estado == _PARCIAL:
+                trabajo.parciales.append(valor)
+                self._condicion.notify_all()
+            else:
+                break
+            listo = trabajador.conexion.poll()
+        if listo:
+            trabajador.trabajo = None
+            if trabajo.cancelar:
+                self._finalizar(trabajo, CANCELADO)
+            elif estado == TERMINADO:
+                self._finalizar(trabajo, TERMINADO, resultado=valor)
+            else:
+                self._finalizar(trabajo, ERROR, error=valor)
+        elif trabajo.cancelar or time.time() - trabajo.inicio > trabajo.timeout or not trabajador.proceso.is_alive():
+            if trabajo.cancelar:
+                self._finalizar(trabajo, CANCELADO)
+            elif trabajador.proceso.is_alive():
+                self._finalizar(trabajo, CADUCADO, error=f'Se ha superado el tiempo máximo ({trabajo.timeout:g} s)')
+            else:
+                self._finalizar(trabajo, ERROR, error='El proceso trabajador ha terminado inesperadamente')
+            trabajador.trabajo = None
+            self._sustituir(trabajador)
+
+    def _despachar(self):
+        with self._condicion:
+            self._trabajadores = [_Trabajador(self._contexto) for _ in range(self.procesos)]
+        while True:
+            with self._condicion:
+                for trabajador in self._trabajadores:
+                    if trabajador.trabajo is not None:
+                        self._revisar(trabajador)
+
+                for trabajador in self._trabajadores:
+                    if trabajador.trabajo is None and self._pendientes:
+                        trabajo = self._trabajos[self._pendientes.popleft()]
+                        try:
+                            trabajador.conexion.send((trabajo.id, trabajo.funcion, trabajo.args, trabajo.kwargs))
+                        except Exception as e:
+                            self._finalizar(trabajo, ERROR, error=f'{type(e).__name__}: {e}')
+                            continue
+                        trabajo.estado, trabajo.inicio = EN_CURSO, time.time()
+                        trabajador.trabajo = trabajo
+
+                self._condicion.notify_all()
+                ocupados = any(t.trabajo is not None for t in self._trabajadores)
+                if self._cerrada and not ocupados:
+                    return
+                # Sin trabajos en curso se espera a que llegue alguno; con trabajos en curso
+                # se revisa periódicamente si han terminado o caducado
+                self._condicion.wait(self.intervalo if ocupados or self._pendientes else None)
+
+
+####################################################################################################################
+#------------------------------------Trabajos de la aplicación-----------------------------------------------------#
+####################################################################################################################
+
+def trabajo_sociograma(datos, datos_atributos=b'', nombre_atributos=None, anterior=None, renderizar_grafos=True,
+                       informe=True):
+    # Lectura, figuras e (opcionalmente) informe de una matriz CSV subida. Se ejecuta en
+    # un trabajador: las figuras se dibujan ahí mismo, una tras otra, y cada una se publica
+    # como resultado parcial (nombre, PNG)
+    import io
+    import pandas as pd
+    from .atributos import leer_atributos
+    from .instrumentacion import Medicion
+    from .bloques import leer_csv_bloques, usar_bloques
+    from .utils import generar_graficos_progresivo, generar_graficos_bloques, generar_informe
+
+    medicion = Medicion()
+    # Las matrices de un centro entero se leen por bloques, sin la matriz de textos completa
+    if usar_bloques(datos):
+        with medicion.etapa('lectura_bloques'):
+            matriz = leer_csv_bloques(datos)
+            atributos = leer_atributos(datos_atributos, nombre_atributos) if datos_atributos else None
+        resultado = generar_graficos_bloques(matriz, procesos=1, medicion=medicion, atributos=atributos,
+                                             renderizar_grafos=renderizar_grafos)
+    else:
+        with medicion.etapa('lectura_csv'):
+            df = pd.read_csv(io.BytesIO(datos), index_col=0, dtype=str)
+            atributos = leer_atributos(datos_atributos, nombre_atributos) if datos_atributos else None
+        # Cada figura se envía en cuanto está lista, para que la interfaz la muestre
+        for nombre, resultado in generar_graficos_progresivo(df, procesos=1, medicion=medicion, anterior=anterior,
+                                                             atributos=atributos, renderizar_grafos=renderizar_grafos):
+            publicar_parcial((nombre, resultado.figuras[nombre]))
+    return {'resultado': resultado, 'informe': generar_informe(resultado) if informe else None}
+
+
+def trabajo_informe(resultado):
+    # Solo el PDF (y los PNG de los grafos que falten) de un resultado ya calculado
+    from .utils import generar_informe
+
+    informe = generar_informe(resultado)
+    return {'resultado': resultado, 'informe': informe}
+
+
+def trabajo_hoja(datos, hoja, datos_atributos=b'', nombre_atributos=None):
+    # Informe de una hoja de un libro Excel; las matrices no válidas devuelven el error
+    from .atributos import leer_atributos
+    from .excel import leer_hoja
+    from .utils import generar_graficos, generar_informe
+
+    df = leer_hoja(datos, hoja)
+    if df is None or df.empty:
+        return {'hoja': hoja, 'informe': None, 'error': 'La hoja está vacía'}
+    atributos = leer_atributos(datos_atributos, nombre_atributos) if datos_atributos else None
+    try:
+        resultado = generar_graficos(df, procesos=1, atributos=atributos)
+    except ValueError as e:
+        return {'hoja': hoja, 'informe': None, 'error': str(e)}
+    return {'hoja': hoja, 'informe': generar_informe(resultado, clase=hoja), 'error': None}
@@ -1,100 +1,72 @@
 import pandas as pd
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-import networkx as nx
-from matplotlib.lines import Line2D
-from matplotlib.patches import Polygon
-from scipy.spatial import ConvexHull
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Image, Spacer, PageBreak, Table
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_JUSTIFY
-from datetime import datetime
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
 import io
 
+from .matriz import UMBRAL_ANOTACIONES, MatrizSociograma, parsear_matriz, validar_matriz, comparar_matrices
+from .grafos import (
+    GrafosSociograma, construir_grafos, construir_grafos_aristas, actualizar_grafos, calcular_layout,
+    comunidades_afinidad, detectar_subgrupos, resumen_comunidades
+)
+from .comunidades import METODO_COMUNIDADES
+from .atributos import AtributosAlumnos, separar_atributos, combinar_atributos
+from .metricas import calcular_metricas, metricas_aristas, resumen_metricas, ESTATUS
+from .instrumentacion import Medicion
+from .plantilla import CALIDAD_INFORME, DPI_INFORME, obtener_plantilla
+
 import warnings
 warnings.filterwarnings("ignore")
 
-def generar_graficos(df):
-    df = df.replace(np.nan, '')
+# Figuras del informe, en el orden en que aparecen en el PDF
+FIGURAS = (
+    'heatmap',           # Mapa de calor de votaciones
+    'aceptacion',        # Nivel de aceptación neto
+    'aceptacion100',     # Índice de aceptación normalizado
+    'grafo_general',     # Grafo general
+    'grafo_aceptacion',  # Grafo de aceptación
+    'grafo_negativo'     # Grafo de rechazo
+)
 
-    mapa_valores_ajustado = {
-        "3": 3, "2": 2, "1": 1,
-        "-3": -3, "-2": -2, "-1": -1,
-        "2!": 1.5, "-1!!": 1.5,
-        "1!": 0.5, "!!": 0.5, "-1!": 0.5,
-        "1!!": -1.5, "-2!": -1.5,
-        "": 0
-    }
-    df_numerico = df.replace(mapa_valores_ajustado)
-    sumatorio_filas = df_numerico.sum(axis=1)
-    orden = sumatorio_filas.sort_values(ascending=False).index
+# Figuras que se pueden sustituir por la vista interactiva
+FIGURAS_GRAFOS = ('grafo_general', 'grafo_aceptacion', 'grafo_negativo')
 
-    # Reordenamos filas y columnas según el sumatorio
-    df = df.loc[orden, orden]
-    df_numerico = df_numerico.loc[orden, orden]
-
-    # Añadimos la columna 'sumatorio' para referencia
-    df['sumatorio'] = sumatorio_filas.loc[orden]
-    df_numerico['sumatorio'] = sumatorio_filas.loc[orden]
-
-    # Ordenamos por 'sumatorio' (en ambos DataFrames, con el mismo orden)
-    df = df.sort_values(by='sumatorio', ascending=False)
-    df_numerico = df_numerico.loc[df.index, df.columns]
-
-    ####################################################################################################################
-    #------------------------------------Dibujamos el heatmap----------------------------------------------------------#
-    ####################################################################################################################
-
-    # Quitamos la columna 'sumatorio' del gráfico (para que no afecte a la escala de colores)
-    df_plot = df
-    df_numerico_plot = df_numerico
-
-    n = len(df_numerico_plot)
-    plt.figure(figsize=(n * 0.6, n * 0.6))
-
-    # Paleta y estilo
-    sns.set(font_scale=1.1, style='white')
-
-    ax = sns.heatmap(
-        df_numerico_plot,
-        annot=df_plot,        # Metemos los valores originales, no los numéricos
-        cmap='RdYlGn',
-        vmin=-3, vmax=3, center=0,
-        fmt='',
-        linewidths=0.3,
-        linecolor='white',
-        square=True,
-        cbar_kws={
-            'label': 'Puntuación ajustada (Rojo → Verde)',
-            'shrink': 0.85,
-            'pad': 0.02
-        },
-        annot_kws={
-            'fontsize': 11,
-            'weight': 'bold',
-            'color': 'black'
-        }
-    )
 
-    # Estética general
-    ax.set_title('Sociograma ordenado por votos recibidos', fontsize=16, pad=20, weight='bold')
-    ax.set_xlabel('Alumno votante', fontsize=12, labelpad=10)
-    ax.set_ylabel('Alumno votado', fontsize=12, labelpad=10)
-    ax.tick_params(axis='x', rotation=45)
-    ax.tick_params(axis='y', rotation=0)
-    plt.tight_layout()
+@dataclass
+class ResultadoGraficos:
+    figuras: dict = field(default_factory=dict)  # nombre de la figura -> PNG en bytes
+    matriz: MatrizSociograma = None              # matriz ya parseada (orden original)
+    aceptacion: pd.DataFrame = None              # aceptación neta y normalizada por alumno
+    medicion: Medicion = None                    # tiempos y memoria de cada etapa
+    grafos: GrafosSociograma = None              # grafos y layout, para recálculos incrementales
+    agrupar_heatmap: bool = False                # el heatmap está agregado por subgrupos
+    metricas: pd.DataFrame = None                # índices sociométricos por alumno
+    atributos: AtributosAlumnos = None           # género y demás atributos de los alumnos
+
+    def imagen(self, nombre):
+        return io.BytesIO(self.figuras[nombre])
+
+
+def ordenar_matriz(matriz):
+    sumatorio_filas = matriz.sumatorio()
+    orden = np.argsort(-sumatorio_filas, kind='stable')
+    nombres = [matriz.nombres[i] for i in orden]
+
+    # Reordenamos filas y columnas según el sumatorio
+    df_numerico = pd.DataFrame(matriz.valores[np.ix_(orden, orden)], index=nombres, columns=nombres)
+    df_numerico['sumatorio'] = sumatorio_filas[orden]
 
-    plt.savefig('sociograma_heatmap_corregido.png')
-    print('Matriz generada')
-    plt.close()
+    # Los códigos de texto solo anotan el heatmap de grupos pequeños: con más alumnos no se
+    # forma la matriz de textos (n² cadenas, que una matriz leída de un .sgm ni siquiera tiene)
+    df = None
+    if matriz.n <= UMBRAL_ANOTACIONES:
+        df = pd.DataFrame(matriz.textos(orden, orden), index=nombres, columns=nombres)
+        df['sumatorio'] = sumatorio_filas[orden]
 
+    return nombres, df, df_numerico
 
-####################################################################################################################
-#------------------------------------Dibujamos el gráfico de barras------------------------------------------------#
-####################################################################################################################
 
+def calcular_aceptacion(df_numerico):
     #calculamos aceptación neta (votos recibidos)
     aceptacion = df_numerico['sumatorio']
 
@@ -108,38 +80,6 @@ def generar_graficos(df):
         .reset_index(drop=True)
     )
 
-    #Configuración estética
-    sns.set(style='whitegrid', font_scale=1.1)
-    plt.figure(figsize=(10, 8))
-
-    #Gráfico de barras horizontales
-    ax = sns.barplot(
-        data=df_aceptacion,
-        y='Alumno',
-        x='Puntuación total recibida',
-        palette='RdYlGn_r',   # 👈 invertimos la paleta: más verde = más aceptado
-        edgecolor='black'
-    )
-
-    #Etiquetas de valor
-    for i, v in enumerate(df_aceptacion['Puntuación total recibida']):
-        ax.text(v + (0.02 * df_aceptacion['Puntuación total recibida'].max()), i, f'{v:.0f}',
-                va='center', fontsize=10, weight='bold', color='black')
-
-    #Estética general
-    plt.title('Nivel de aceptación de los alumnos', fontsize=16, weight='bold', pad=20)
-    plt.xlabel('Puntuación total recibida (votos netos)')
-    plt.ylabel('Alumno')
-    plt.tight_layout()
-    plt.savefig('NivelAceptacion.png')
-    print('Gráfico de aceptación generado')
-    #plt.show()
-    plt.close()
-
-####################################################################################################################
-#-------------------------------Dibujamos el gráfico de barras normalizado-----------------------------------------#
-####################################################################################################################
-
     #Normalizamos
     min_val = df_aceptacion['Puntuación total recibida'].min()
     max_val = df_aceptacion['Puntuación total recibida'].max()
@@ -148,585 +88,528 @@ def generar_graficos(df):
         (max_val - min_val) * 100
     ).round(1)
 
-    sns.set(style='whitegrid', font_scale=1.1)
-    plt.figure(figsize=(10, 8))
-
-    ax = sns.barplot(
-        data=df_aceptacion,
-        y='Alumno',
-        x='Índice de aceptación (%)',
-        palette='RdYlGn_r',   
-        edgecolor='black'
-    )
-
-    for i, v in enumerate(df_aceptacion['Índice de aceptación (%)']):
-        ax.text(v + 1, i, f'{v:.1f}%', va='center', fontsize=10, weight='bold')
-
-    #Ajustes visuales
-    plt.title('Índice de aceptación (0–100)', fontsize=16, weight='bold', pad=20)
-    plt.xlabel('Nivel de aceptación (%)')
-    plt.ylabel('Alumno')
-    plt.xlim(0, 100)
-    plt.tight_layout()
-    plt.savefig('NivelAceptacion100.png')
-    print('Gráfico de aceptación normalizado generado')
-    #plt.show()
-    plt.close()
-
-####################################################################################################################
-#------------------------------------Dibujamos el grafo general----------------------------------------------------#
-####################################################################################################################
-
-    df_numerico = df_numerico.drop('sumatorio', axis=1)
-
-    mujeres = [
-        'Irina','Ángela','Celia','Ana','Belkis','Marta','Lin Xing',
-        'Paula','Vanesa','Kati','Eva','Samira'
-    ]
-    hombres = [
-        'Mario','Javier','Jorge','Guille','Alfonso','Borja','Cosmi',
-        'Pedro','Andres','David','Samuel'
-    ]
-
-
-    #Normalizamos nombres
-    df_numerico.index = df_numerico.index.str.strip()
-    df_numerico.columns = df_numerico.columns.str.strip()
-
-    #Creamos el dígrafo
-    G = nx.DiGraph()
-
-    aceptacion = df_numerico.sum(axis=1)
-
-    # Añadimos nodos con atributos
-    for alumno in df_numerico.index:
-        if alumno in mujeres:
-            genero = 'F'
-        elif alumno in hombres:
-            genero = 'M'
-        else:
-            genero = 'U'
-        G.add_node(alumno, genero=genero, aceptacion=aceptacion.get(alumno, 0))
-
-    # Añadimos aristas (con pesos positivos y negativos)
-    for votado in df_numerico.index:
-        for votante in df_numerico.columns:
-            valor = df_numerico.loc[votado, votante]
-            if pd.notna(valor) and valor != 0:
-                G.add_edge(votante, votado, weight=valor)
-
-    # Creamos una versión ponderada por afinidad positiva
-    # Esto sirve solo para calcular el layout
-    G_pos = nx.Graph()
-    for u, v, data in G.edges(data=True):
-        if data['weight'] > 0:
-            G_pos.add_edge(u, v, weight=data['weight'])
-
-    #Layout: nodos con afinidad positiva estarán más cerca
-    pos = nx.spring_layout(G_pos, seed=42, k=1.5, iterations=300, weight='weight')
-
-    #Figura y estilo
-    plt.figure(figsize=(14, 12))
-    plt.style.use('seaborn-v0_8-white')
-
-    # Tamaño de nodos proporcional a aceptación
-    tamanos = [max(200, abs(G.nodes[n]['aceptacion']) * 40) for n in G.nodes]
-
-    #7️⃣ Dibujamos nodos
-    nx.draw_networkx_nodes(G, pos,
-        nodelist=[n for n, d in G.nodes(data=True) if d['genero'] == 'F'],
-        node_color='lightcoral', node_shape='o',
-        node_size=[tamanos[i] for i, n in enumerate(G.nodes) if G.nodes[n]['genero'] == 'F'],
-        label='Mujeres', alpha=0.9
-    )
+    return df_aceptacion
 
-    nx.draw_networkx_nodes(G, pos,
-        nodelist=[n for n, d in G.nodes(data=True) if d['genero'] == 'M'],
-        node_color='skyblue', node_shape='^',
-        node_size=[tamanos[i] for i, n in enumerate(G.nodes) if G.nodes[n]['genero'] == 'M'],
-        label='Hombres', alpha=0.9
-    )
 
-    #Dibujamos aristas
-    edges = G.edges(data=True)
-    colors = ['green' if d['weight'] > 0 else 'red' for (_, _, d) in edges]
-    widths = [abs(d['weight']) for (_, _, d) in edges]
-
-    nx.draw_networkx_edges(G, pos, edge_color=colors, width=widths, arrows=True, alpha=0.4)
-    nx.draw_networkx_labels(G, pos, font_size=9, font_weight='bold')
-
-    #Leyenda personalizada
-    legend_elements = [
-        Line2D([0], [0], marker='o', color='w', label='Mujeres',
-            markerfacecolor='lightcoral', markersize=12),
-        Line2D([0], [0], marker='^', color='w', label='Hombres',
-            markerfacecolor='skyblue', markersize=12),
-        Line2D([0], [0], color='green', lw=2, label='Voto positivo'),
-        Line2D([0], [0], color='red', lw=2, label='Voto negativo')
-    ]
-
-    plt.legend(
-        handles=legend_elements,
-        loc='upper left',
-        fontsize=11,
-        frameon=True,
-        title='Leyenda',
-        title_fontsize=12,
-        fancybox=True,
-        shadow=True,
-        borderpad=1
-    )
+def tareas_tablas(df, df_numerico, df_aceptacion, grupos=None):
+    # matplotlib, seaborn y scipy solo se importan cuando hay que dibujar
+    from .figuras import figura_heatmap, figura_aceptacion, figura_aceptacion100
 
-    #Estilo final
-    plt.title('Grafo sociométrico (afinidad positiva = cercanía)', fontsize=18, weight='bold', pad=20)
-    plt.axis('off')
-    plt.tight_layout()
-    plt.savefig('Grafo1.png')
-    print('Grafo sociométrico generado')
-    #plt.show()
-    plt.close()
-
-####################################################################################################################
-#------------------------------------Dibujamos el grafo de aceptación----------------------------------------------#
-####################################################################################################################
-
-    #Creamos el grafo solo con aristas positivas
-    G_pos = nx.DiGraph()
-    aceptacion = df_numerico.sum(axis=1)
-
-    # Nodos
-    for alumno in df_numerico.index:
-        genero = 'F' if alumno in mujeres else 'M' if alumno in hombres else 'U'
-        G_pos.add_node(alumno, genero=genero, aceptacion=aceptacion.get(alumno, 0))
-
-    # Aristas positivas
-    for votado in df_numerico.index:
-        for votante in df_numerico.columns:
-            valor = df_numerico.loc[votado, votante]
-            if pd.notna(valor) and valor > 0:
-                G_pos.add_edge(votante, votado, weight=valor)
-
-    #Componentes fuertemente conexas
-    componentes = list(nx.strongly_connected_components(G_pos))
-    colores_grupo = plt.cm.tab20(np.linspace(0, 1, len(componentes)))  # colores distintos
-
-    #Layout (afinidades positivas = proximidad)
-    pos = nx.spring_layout(G_pos, seed=42, k=1.5, iterations=300, weight='weight')
-
-    #Figura
-    plt.figure(figsize=(14, 12))
-    plt.style.use('seaborn-v0_8-white')
-    ax = plt.gca()
-
-    #Nubes de color por componente
-    for i, comp in enumerate(componentes):
-        if len(comp) < 2:
-            continue
-        coords = np.array([pos[n] for n in comp if n in pos])
-        if len(coords) >= 3:
-            hull = ConvexHull(coords)
-            puntos = coords[hull.vertices]
-            poly = Polygon(
-                puntos, closed=True,
-                fill=True, facecolor=colores_grupo[i],
-                alpha=0.18, edgecolor=None
-            )
-            ax.add_patch(poly)
-        elif len(coords) == 2:
-            mid = coords.mean(axis=0)
-            ax.add_patch(plt.Circle(mid, 0.05, color=colores_grupo[i], alpha=0.2))
-
-    #Tamaños de nodos
-    tamanos = [max(200, abs(G_pos.nodes[n]['aceptacion']) * 40) for n in G_pos.nodes]
-
-    #Dibujamos nodos
-    nx.draw_networkx_nodes(
-        G_pos, pos,
-        nodelist=[n for n, d in G_pos.nodes(data=True) if d['genero'] == 'F'],
-        node_color='lightcoral', node_shape='o',
-        node_size=[tamanos[i] for i, n in enumerate(G_pos.nodes) if G_pos.nodes[n]['genero'] == 'F'],
-        label='Mujeres', alpha=0.9
-    )
-    nx.draw_networkx_nodes(
-        G_pos, pos,
-        nodelist=[n for n, d in G_pos.nodes(data=True) if d['genero'] == 'M'],
-        node_color='skyblue', node_shape='^',
-        node_size=[tamanos[i] for i, n in enumerate(G_pos.nodes) if G_pos.nodes[n]['genero'] == 'M'],
-        label='Hombres', alpha=0.9
-    )
+    # Para cohortes grandes el heatmap no lleva anotaciones: no enviamos los códigos
+    if grupos is not None or df is None or len(df) > UMBRAL_ANOTACIONES:
+        df = None
 
-    #Aristas positivas
-    for u, v, data in G_pos.edges(data=True):
-        w = data['weight']
-        nx.draw_networkx_edges(
-            G_pos, pos,
-            edgelist=[(u, v)],
-            width=0.4 + w * 0.4,
-            edge_color='green',
-            alpha=0.4 + min(w / 4, 0.3),
-            connectionstyle='arc3,rad=0.1' if G_pos.has_edge(v, u) else 'arc3,rad=0.0',
-            arrows=True,
-            arrowstyle='-|>',
-            arrowsize=8 + w * 1.2
-        )
-
-    #Etiquetas de nodos
-    nx.draw_networkx_labels(
-        G_pos, pos,
-        font_size=10,
-        font_weight='bold',
-        font_color='black',
-        bbox=dict(facecolor='white', edgecolor='none', alpha=0.7, boxstyle='round,pad=0.25')
-    )
+    return {
+        'heatmap': (figura_heatmap, (df, df_numerico, grupos)),
+        'aceptacion': (figura_aceptacion, (df_aceptacion,)),
+        'aceptacion100': (figura_aceptacion100, (df_aceptacion,)),
+    }
 
-    #Leyenda
-    legend_elements = [
-        Line2D([0], [0], marker='o', color='w', label='Mujeres',
-            markerfacecolor='lightcoral', markersize=12),
-        Line2D([0], [0], marker='^', color='w', label='Hombres',
-            markerfacecolor='skyblue', markersize=12),
-        Line2D([0], [0], color='green', lw=2, label='Voto positivo')
-    ]
-    plt.legend(
-        handles=legend_elements,
-        loc='upper left',
-        fontsize=11,
-        frameon=True,
-        title='Leyenda',
-        title_fontsize=12,
-        fancybox=True,
-        shadow=True,
-        borderpad=1
-    )
 
-    #Título y ajustes
-    plt.title('Grafo sociométrico – Componentes fuertemente conexas (afinidades positivas)', 
-            fontsize=18, weight='bold', pad=20)
-    plt.axis('off')
-    plt.tight_layout()
-    plt.savefig('GrafoAceptacion.png')
-    print('Grafo de aceptación generado')
-    #plt.show()
-    plt.close()
-
-####################################################################################################################
-#------------------------------------Dibujamos el grafo de rechazo-------------------------------------------------#
-####################################################################################################################
-
-    #Creamos el grafo solo con aristas NEGATIVAS
-    G_neg = nx.DiGraph()
-    aceptacion = df_numerico.sum(axis=1)
-
-    # Añadimos nodos
-    for alumno in df_numerico.index:
-        genero = 'F' if alumno in mujeres else 'M' if alumno in hombres else 'U'
-        G_neg.add_node(alumno, genero=genero, aceptacion=aceptacion.get(alumno, 0))
-
-    # Añadimos aristas negativas
-    for votado in df_numerico.index:
-        for votante in df_numerico.columns:
-            valor = df_numerico.loc[votado, votante]
-            if pd.notna(valor) and valor < 0:
-                G_neg.add_edge(votante, votado, weight=valor)
-
-    #Layout
-    pos = nx.spring_layout(G_neg, seed=42, k=1.5, iterations=300, weight='weight')
-
-    #Figura
-    plt.figure(figsize=(14, 12))
-    plt.style.use('seaborn-v0_8-white')
-
-    # Tamaño de nodos proporcional a aceptación
-    tamanos = [max(200, abs(G_neg.nodes[n]['aceptacion']) * 40) for n in G_neg.nodes]
-
-    #Nodos
-    nx.draw_networkx_nodes(
-        G_neg, pos,
-        nodelist=[n for n, d in G_neg.nodes(data=True) if d['genero'] == 'F'],
-        node_color='lightcoral', node_shape='o',
-        node_size=[tamanos[i] for i, n in enumerate(G_neg.nodes) if G_neg.nodes[n]['genero'] == 'F'],
-        label='Mujeres', alpha=0.9
-    )
-    nx.draw_networkx_nodes(
-        G_neg, pos,
-        nodelist=[n for n, d in G_neg.nodes(data=True) if d['genero'] == 'M'],
-        node_color='skyblue', node_shape='^',
-        node_size=[tamanos[i] for i, n in enumerate(G_neg.nodes) if G_neg.nodes[n]['genero'] == 'M'],
-        label='Hombres', alpha=0.9
-    )
+def tareas_grafos(grafos):
+    from .figuras import figura_grafo_general, figura_grafo_aceptacion, figura_grafo_negativo
 
-    #Aristas negativas
-    for u, v, data in G_neg.edges(data=True):
-        w = abs(data['weight'])
-        nx.draw_networkx_edges(
-            G_neg, pos,
-            edgelist=[(u, v)],
-            width=0.4 + w * 0.4,
-            edge_color='red',
-            alpha=0.4 + min(w / 4, 0.3),
-            connectionstyle='arc3,rad=0.1' if G_neg.has_edge(v, u) else 'arc3,rad=0.0',
-            arrows=True,
-            arrowstyle='-|>',
-            arrowsize=8 + w * 1.2
-        )
-
-    #Etiquetas
-    nx.draw_networkx_labels(
-        G_neg, pos,
-        font_size=10,
-        font_weight='bold',
-        font_color='black',
-        bbox=dict(facecolor='white', edgecolor='none', alpha=0.7, boxstyle='round,pad=0.25')
-    )
+    return {
+        'grafo_general': (figura_grafo_general, (grafos.G, grafos.pos)),
+        'grafo_aceptacion': (figura_grafo_aceptacion, (grafos.G_pos, grafos.pos, grafos.componentes)),
+        'grafo_negativo': (figura_grafo_negativo, (grafos.G_neg, grafos.pos)),
+    }
 
-    #Leyenda
-    legend_elements = [
-        Line2D([0], [0], marker='o', color='w', label='Mujeres',
-            markerfacecolor='lightcoral', markersize=12),
-        Line2D([0], [0], marker='^', color='w', label='Hombres',
-            markerfacecolor='skyblue', markersize=12),
-        Line2D([0], [0], color='red', lw=2, label='Voto negativo')
-    ]
-    plt.legend(
-        handles=legend_elements,
-        loc='upper left',
-        fontsize=11,
-        frameon=True,
-        title='Leyenda',
-        title_fontsize=12,
-        fancybox=True,
-        shadow=True,
-        borderpad=1
-    )
 
-    #Estilo final
-    plt.title('Grafo sociométrico – Relaciones negativas (votos < 0)', 
-            fontsize=18, weight='bold', pad=20)
-    plt.axis('off')
-    plt.tight_layout()
-    plt.savefig('GrafoNegativo.png')
-    print('Grafo de relaciones negativas generado')
-    #plt.show()
-    plt.close()
-
-def generar_informe():
-
-    # Rutas de las imágenes
-    imagenes = [
-        "sociograma_heatmap_corregido.png",  # 0
-        "NivelAceptacion.png",               # 1
-        "NivelAceptacion100.png",            # 2
-        "Grafo1.png",                        # 3
-        "GrafoAceptacion.png",               # 4
-        "GrafoNegativo.png"                  # 5
-    ]
+def tareas_figuras(df, df_numerico, df_aceptacion, grafos):
+    return {**tareas_tablas(df, df_numerico, df_aceptacion), **tareas_grafos(grafos)}
+
+
+def figuras_afectadas(cambios, agrupar_heatmap=False):
+    # Figuras que hay que volver a dibujar tras una edición de la matriz. El tamaño de
+    # los nodos depende de la aceptación y el layout de los votos positivos, así que
+    # esos cambios afectan a los tres grafos
+    if cambios is None:
+        return set(FIGURAS)
+
+    afectadas = set()
+    # El heatmap muestra los códigos; los grafos solo las puntuaciones, así que una
+    # anotación nueva con el mismo valor ('1!' -> '!!') no los cambia
+    if not cambios.vacio:
+        afectadas.add('heatmap')
+    if cambios.valores:
+        afectadas.add('grafo_general')
+    if cambios.sumatorio:
+        afectadas |= {'aceptacion', 'aceptacion100', 'grafo_aceptacion', 'grafo_negativo'}
+    if cambios.positivas:
+        afectadas |= {'grafo_aceptacion', 'grafo_negativo'}
+    if cambios.negativas:
+        afectadas.add('grafo_negativo')
+    # Los subgrupos del heatmap agregado salen de los votos positivos
+    if agrupar_heatmap and cambios.positivas:
+        afectadas.add('heatmap')
+    return afectadas
+
+
+def generar_graficos_progresivo(df, procesos=None, medicion=None, agrupar_heatmap=False, anterior=None,
+                                comunidades=METODO_COMUNIDADES, atributos=None, renderizar_grafos=True):
+    # Versión en flujo de generar_graficos: devuelve (nombre, resultado) cada vez que
+    # termina una figura. El heatmap y las barras se envían a dibujar antes de calcular
+    # los grafos y el layout, que son la parte más costosa. Con agrupar_heatmap el
+    # heatmap se agrega por subgrupos en lugar de mostrar cada alumno.
+    # Si se pasa el resultado de una ejecución anterior con los mismos alumnos, solo se
+    # recalcula y se vuelve a dibujar lo que afecta a las celdas que han cambiado.
+    # 'comunidades' es el método de detección de grupos de afinidad (ver utils.comunidades).
+    # Los atributos de los alumnos (género...) pueden venir en 'atributos' o como columnas
+    # extra de la matriz; los primeros tienen prioridad.
+    # 'df' puede ser también una MatrizSociograma ya parseada (p. ej. leída de un .sgm).
+    # Con renderizar_grafos=False los grafos se calculan (layout y grupos) pero no se
+    # dibujan: la vista interactiva los pinta en el navegador y los PNG se generan con
+    # completar_figuras solo si se pide el informe
+    from .figuras import Renderizador
+
+    medicion = medicion or Medicion()
+    renderizador = Renderizador(procesos, medicion)
+
+    # Convertimos la matriz de códigos a puntuaciones en una sola pasada
+    with medicion.etapa('mapeo_numerico'):
+        if isinstance(df, MatrizSociograma):
+            matriz, atributos = df, combinar_atributos(atributos)
+        else:
+            df, atributos_matriz = separar_atributos(df)
+            atributos = combinar_atributos(atributos, atributos_matriz)
+            matriz = parsear_matriz(df)
+        validar_matriz(matriz)
+
+    with medicion.etapa('diferencias'):
+        # Un resultado de la lectura por bloques no guarda los códigos de texto con que comparar
+        if anterior is not None and not isinstance(anterior.matriz, MatrizSociograma):
+            anterior = None
+        cambios = comparar_matrices(anterior.matriz, matriz) if anterior is not None else None
+        # Los nodos llevan los atributos: si cambian, se rehacen los grafos
+        if cambios is not None and (anterior.grafos is None or anterior.atributos != atributos):
+            cambios = None
+        afectadas = figuras_afectadas(cambios, agrupar_heatmap)
+        if anterior is not None and anterior.agrupar_heatmap != agrupar_heatmap:
+            afectadas.add('heatmap')
+        # Con otro método de agrupamiento cambian las nubes y los subgrupos del heatmap
+        otro_metodo = cambios is not None and anterior.grafos.metodo_comunidades != comunidades
+        if otro_metodo:
+            afectadas.add('grafo_aceptacion')
+            if agrupar_heatmap:
+                afectadas.add('heatmap')
+        # Las figuras que no se dibujaron en la ejecución anterior no se pueden reutilizar
+        if anterior is not None:
+            afectadas |= {nombre for nombre in FIGURAS if nombre not in anterior.figuras}
+
+    with medicion.etapa('ordenacion'):
+        nombres, df, df_numerico = ordenar_matriz(matriz)
+        df_aceptacion = calcular_aceptacion(df_numerico)
+
+    with medicion.etapa('metricas'):
+        df_metricas = calcular_metricas(df_numerico.drop(columns='sumatorio').to_numpy(), nombres)
+
+    resultado = ResultadoGraficos(matriz=matriz, aceptacion=df_aceptacion, medicion=medicion,
+                                  agrupar_heatmap=agrupar_heatmap, metricas=df_metricas, atributos=atributos)
+
+    # Las figuras que no cambian se reutilizan tal cual
+    for nombre in FIGURAS:
+        if nombre not in afectadas:
+            resultado.figuras[nombre] = anterior.figuras[nombre]
+            yield nombre, resultado
+
+    grupos = None
+    if agrupar_heatmap and 'heatmap' in afectadas:
+        with medicion.etapa('subgrupos'):
+            grupos = detectar_subgrupos(df_numerico.drop(columns='sumatorio').to_numpy(), comunidades)
+
+    tablas = tareas_tablas(df, df_numerico, df_aceptacion, grupos)
+    renderizador.enviar({nombre: tarea for nombre, tarea in tablas.items() if nombre in afectadas})
+
+    def calcular_grafos():
+        #Creamos los tres dígrafos (general, aceptación y rechazo) a partir de la lista de aristas,
+        # o parcheamos los de la ejecución anterior con las celdas que han cambiado
+        with medicion.etapa('grafos'):
+            if cambios is None:
+                valores = df_numerico.drop(columns='sumatorio').to_numpy()
+                G, G_pos, G_neg = construir_grafos(nombres, valores, atributos)
+            elif not cambios.valores:
+                G, G_pos, G_neg = anterior.grafos.G, anterior.grafos.G_pos, anterior.grafos.G_neg
+            else:
+                G, G_pos, G_neg = actualizar_grafos(anterior.grafos, matriz.nombres, matriz.valores, cambios)
+
+        #Layout común a los tres grafos: nodos con afinidad positiva estarán más cerca.
+        # Si los votos positivos no han cambiado se reutilizan el layout y los grupos
+        with medicion.etapa('layout'):
+            if cambios is None:
+                pos = calcular_layout(G_pos)
+            elif cambios.positivas:
+                pos = calcular_layout(G_pos, pos_inicial=anterior.grafos.pos)
+            else:
+                pos = anterior.grafos.pos
+
+        with medicion.etapa('comunidades', metodo=comunidades if isinstance(comunidades, str) else 'propio'):
+            if cambios is None or cambios.positivas or otro_metodo:
+                componentes = comunidades_afinidad(matriz.nombres, matriz.valores, comunidades)
+            else:
+                componentes = anterior.grafos.componentes
+        return GrafosSociograma(G, G_pos, G_neg, pos, componentes, comunidades)
+
+    # Los grafos se calculan en un hilo mientras se entregan las tablas que van terminando:
+    # el heatmap y las barras no esperan al layout
+    with ThreadPoolExecutor(max_workers=1) as hilo:
+        futuro_grafos = hilo.submit(calcular_grafos)
+        for nombre, png in renderizador.mientras(futuro_grafos):
+            resultado.figuras[nombre] = png
+            yield nombre, resultado
+        resultado.grafos = futuro_grafos.result()
+
+    grafos = tareas_grafos(resultado.grafos) if renderizar_grafos else {}
+    renderizador.enviar({nombre: tarea for nombre, tarea in grafos.items() if nombre in afectadas})
+    for nombre, png in renderizador.todas():
+        resultado.figuras[nombre] = png
+        yield nombre, resultado
+
+    # Dejamos las figuras en el orden del informe
+    resultado.figuras = {nombre: resultado.figuras[nombre] for nombre in FIGURAS if nombre in resultado.figuras}
+
+
+def generar_graficos(df, procesos=None, medicion=None, agrupar_heatmap=False, anterior=None,
+                     comunidades=METODO_COMUNIDADES, atributos=None, renderizar_grafos=True):
+    resultado = None
+    for _, resultado in generar_graficos_progresivo(df, procesos, medicion, agrupar_heatmap, anterior,
+                                                    comunidades, atributos, renderizar_grafos):
+        pass
+    return resultado
+
+
+def generar_graficos_bloques(matriz, procesos=None, medicion=None, comunidades=METODO_COMUNIDADES, atributos=None,
+                             renderizar_grafos=True):
+    # Versión de generar_graficos para matrices leídas por bloques (utils.bloques), sin
+    # la matriz completa de textos ni de puntuaciones: la aceptación sale del sumatorio
+    # acumulado, las métricas y los grafos de la lista de aristas, los grupos de la matriz
+    # dispersa y el heatmap de una versión reducida de la matriz ordenada. No admite
+    # recálculo incremental ni heatmap agrupado
+    from .figuras import Renderizador
+    from .bloques import heatmap_reducido
+
+    medicion = medicion or Medicion()
+    renderizador = Renderizador(procesos, medicion)
+    validar_matriz(matriz)
+    atributos = combinar_atributos(atributos, matriz.atributos)
+
+    with medicion.etapa('ordenacion'):
+        sumatorio = matriz.sumatorio()
+        orden = np.argsort(-sumatorio, kind='stable')
+        nombres = [matriz.nombres[i] for i in orden]
+        df_aceptacion = calcular_aceptacion(pd.DataFrame({'sumatorio': sumatorio[orden]}, index=nombres))
+
+    with medicion.etapa('heatmap_reducido'):
+        reducida = heatmap_reducido(matriz, orden)
+        etiquetas = nombres if len(reducida) == matriz.n else range(len(reducida))
+        df_numerico = pd.DataFrame(reducida, index=etiquetas, columns=etiquetas)
+
+    with medicion.etapa('metricas'):
+        df_metricas = metricas_aristas(matriz.origen, matriz.destino, matriz.pesos, matriz.nombres).iloc[orden]
+
+    resultado = ResultadoGraficos(matriz=matriz, aceptacion=df_aceptacion, medicion=medicion,
+                                  metricas=df_metricas, atributos=atributos)
+    renderizador.enviar(tareas_tablas(None, df_numerico, df_aceptacion))
+
+    with medicion.etapa('grafos'):
+        G, G_pos, G_neg = construir_grafos_aristas(matriz.nombres, matriz.origen, matriz.destino, matriz.pesos,
+                                                   sumatorio, atributos)
+    with medicion.etapa('layout'):
+        pos = calcular_layout(G_pos)
+    with medicion.etapa('comunidades', metodo=comunidades if isinstance(comunidades, str) else 'propio'):
+        componentes = comunidades_afinidad(matriz.nombres, matriz.valores_dispersos(), comunidades)
+    resultado.grafos = GrafosSociograma(G, G_pos, G_neg, pos, componentes, comunidades)
+
+    if renderizar_grafos:
+        renderizador.enviar(tareas_grafos(resultado.grafos))
+    for nombre, png in renderizador.todas():
+        resultado.figuras[nombre] = png
+    resultado.figuras = {nombre: resultado.figuras[nombre] for nombre in FIGURAS if nombre in resultado.figuras}
+    return resultado
+
+
+def completar_figuras(resultado, procesos=None):
+    # Dibuja los grafos que se dejaron sin renderizar (vista interactiva), p. ej. justo
+    # antes de montar el PDF. Sin grafos (resultados montados a mano) no hay nada que dibujar
+    from .figuras import renderizar_figuras
+
+    if resultado.grafos is None:
+        return resultado
+    pendientes = {nombre: tarea for nombre, tarea in tareas_grafos(resultado.grafos).items()
+                  if nombre not in resultado.figuras}
+    if pendientes:
+        resultado.figuras.update(renderizar_figuras(pendientes, procesos, resultado.medicion))
+        resultado.figuras = {nombre: resultado.figuras[nombre] for nombre in FIGURAS if nombre in resultado.figuras}
+    return resultado
+
+def generar_informe(resultado, clase=None, medicion=None, evolucion=None, dpi=DPI_INFORME, calidad=CALIDAD_INFORME):
+    # La parte fija (estilos, textos explicativos, portada) viene de la plantilla del
+    # proceso; aquí solo se montan las figuras y tablas de esta clase. Las figuras se
+    # incrustan a 'dpi' de su tamaño impreso y, si se indica 'calidad', en JPEG
+    from reportlab.platypus import SimpleDocTemplate
+    from reportlab.lib.pagesizes import A4
+
+    # Los grafos de la vista interactiva se dibujan ahora, solo para el PDF
+    completar_figuras(resultado)
 
     # Crear documento
     buffer = io.BytesIO()
     pdf = SimpleDocTemplate(buffer, pagesize=A4)
-    estilos = getSampleStyleSheet()
-
-    # Estilo de texto justificado
-    estilo_texto = ParagraphStyle(
-        name="Justify",
-        parent=estilos["Normal"],
-        alignment=TA_JUSTIFY,
-        leading=15
-    )
+    plantilla = obtener_plantilla()
 
-    # Lista de elementos del informe
-    elementos = []
+    # Lista de elementos del informe: portada y secciones de la clase
+    elementos = plantilla.portada(clase)
+    elementos.extend(_secciones_clase(resultado, plantilla, dpi, calidad))
 
-    # 🧾 Portada
-    titulo = Paragraph("<b>Informe de Sociograma</b>", estilos["Title"])
+    if evolucion is not None:
+        elementos.extend(_seccion_evolucion(evolucion, plantilla, dpi, calidad))
 
-    # Imagen centrada
-    imagen_portada = Image("utils/Portada.jpg", width=250, height=205)
-    imagen_portada.hAlign = 'CENTER'
+    medicion = medicion or resultado.medicion or Medicion()
+    with medicion.etapa('informe_pdf'):
+        pdf.build(elementos)
 
-    # Estilo alineado a la derecha
-    estilo_derecha = ParagraphStyle(
-        name="Derecha",
-        parent=estilos["Normal"],
-        alignment=2  # 2 = derecha
-    )
+    buffer.seek(0)  # Volver al inicio del buffer
+    print("✅ Informe generado correctamente")
+    
+    return buffer.getvalue()
 
-    # Textos inferiores (alineados a la derecha)
-    clase = Paragraph("<b>Clase:</b> Poner clase", estilo_derecha)
-    fecha = Paragraph(f"<b>Fecha de informe:</b> {datetime.now().strftime('%d/%m/%Y')}", estilo_derecha)
 
-    # Añadimos los elementos
-    elementos.append(Spacer(1, 100))          # espacio superior
-    elementos.append(titulo)
-    elementos.append(Spacer(1, 60))
-    elementos.append(imagen_portada)
+def generar_informe_consolidado(resultados, titulo=None, medicion=None, dpi=DPI_INFORME, calidad=CALIDAD_INFORME):
+    # Un único PDF para varias clases: portada, índice, un capítulo por clase y un anexo con
+    # los textos explicativos. Los textos fijos no se repiten en cada capítulo, así que el
+    # tamaño y el tiempo de montaje solo crecen con las figuras y tablas de cada clase.
+    # 'resultados' son pares (clase, resultado) en el orden en que aparecerán
+    from reportlab.platypus import Paragraph, PageBreak
+    from reportlab.lib.pagesizes import A4
+    from .plantilla import _clase_documento_indice
 
-    # Empuja los textos hacia abajo (ajusta si hace falta)
-    elementos.append(Spacer(1, 250))
+    buffer = io.BytesIO()
+    pdf = _clase_documento_indice()(buffer, pagesize=A4, title=titulo or "Informe de Sociograma")
+    plantilla = obtener_plantilla()
+    resultados = list(resultados)
+
+    elementos = plantilla.portada(titulo or f"{len(resultados)} clases", etiqueta='Informe')
+    elementos.extend(plantilla.indice())
+    for clase, resultado in resultados:
+        completar_figuras(resultado)
+        elementos.append(PageBreak())
+        elementos.append(plantilla.capitulo(f"Clase: {clase}"))
+        elementos.append(Paragraph(
+            "Los textos que explican cómo leer cada figura y tabla se recogen una sola vez en el anexo final.",
+            plantilla.estilo_texto))
+        elementos.extend(_secciones_clase(resultado, plantilla, dpi, calidad, textos=False))
+    elementos.extend(plantilla.anexo())
+
+    def numerar(canvas, documento):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 8)
+        canvas.drawRightString(documento.pagesize[0] - documento.rightMargin, documento.bottomMargin / 2,
+                               str(documento.page))
+        canvas.restoreState()
+
+    medicion = medicion or Medicion()
+    with medicion.etapa('informe_consolidado', clases=len(resultados)):
+        # Una pasada para saber en qué página cae cada capítulo y otra para escribir el índice
+        pdf.multiBuild(elementos, onFirstPage=lambda canvas, documento: None, onLaterPages=numerar)
+
+    print(f"✅ Informe consolidado de {len(resultados)} clases generado correctamente")
+    return buffer.getvalue()
 
-    # Añadimos la clase y fecha alineadas a la derecha
-    elementos.append(clase)
-    elementos.append(Spacer(1, 10))
-    elementos.append(fecha)
 
-    elementos.append(PageBreak())
+def _secciones_clase(resultado, plantilla, dpi=DPI_INFORME, calidad=CALIDAD_INFORME, textos=True):
+    # Secciones con las figuras y tablas de una clase. Con textos=False se omiten los
+    # textos explicativos fijos (el informe consolidado los lleva una sola vez en un anexo)
+    from reportlab.platypus import Spacer, PageBreak
 
+    def imagen(nombre, ancho, alto):
+        return plantilla.imagen(resultado.figuras[nombre], ancho, alto, dpi, calidad)
 
-    # 🔥 1. Heatmap
-    elementos.append(Paragraph("<b>1. Mapa de calor de votaciones</b>", estilos["Heading1"]))
-    texto1 = """
-    El siguiente mapa de calor muestra los resultados agregados de las votaciones entre los alumnos.<br/><br/>
-    Cada celda representa la valoración que un alumno (<i>columna</i>) realiza sobre otro (<i>fila</i>).
-    Los alumnos están ordenados de forma decreciente según la puntuación total recibida (<b>sumatorio</b>),
-    de modo que los alumnos con mayor aceptación aparecen en la parte superior.<br/><br/>
-
-    <b>Escala y significado de los valores:</b><br/>
-    • Los votos provienen de tres actividades en las que cada alumno indicaba si haría o no la actividad con sus compañeros.<br/>
-    • Un “sí” suma +1 punto, un “no” resta −1, y no votar equivale a 0.<br/>
-    • El valor total por alumno puede ir de <b>−3</b> (rechazo total) a <b>+3</b> (aceptación total).<br/><br/>
-
-    <b>Interpretación de los valores en las celdas:</b><br/>
-    • <b>3</b> → el votante respondió “sí” en las 3 actividades (máxima afinidad).<br/>
-    • <b>2</b> → dos “sí” y una respuesta neutra o ausente (afinidad alta).<br/>
-    • <b>1</b> → un “sí” y dos neutros o negativos (afinidad leve).<br/>
-    • <b>0</b> → ausencia de voto o balance neutro.<br/>
-    • <b>−1</b> → un “no” neto (rechazo leve).<br/>
-    • <b>−2</b> → dos “no” (rechazo claro).<br/>
-    • <b>−3</b> → tres “no” (rechazo total).<br/><br/>
-
-    <b>Casos con signos de exclamación (!):</b><br/>
-    Estos símbolos indican combinaciones mixtas de respuestas “sí” y “no”, que se transforman internamente en valores intermedios:<br/>
-    • <b>2!</b> → mapeado a <b>1.5</b>: dos “sí” y un “no”.<br/>
-    • <b>1!</b>, <b>!!</b>, <b>−1!</b> → mapeados a <b>0.5</b>: respuestas mixtas con ligera tendencia positiva.<br/>
-    • <b>1!!</b>, <b>−2!</b> → mapeados a <b>−1.5</b>: tendencia negativa.<br/>
-    Estos valores intermedios permiten representar de manera más precisa la ambigüedad en las votaciones mixtas.<br/><br/>
-
-    <b>Paleta de color:</b><br/>
-    • <font color='green'><b>Verde</b></font> → valoración positiva (afinidad).<br/>
-    • <font color='red'><b>Rojo</b></font> → valoración negativa (rechazo).<br/>
-    • <font color='orange'><b>Amarillo</b></font> → respuesta neutra o ambigua.<br/><br/>
-
-    <b>Cómo interpretar el gráfico:</b><br/>
-    • <b>Filas</b> → alumno votado (quién recibe los votos).<br/>
-    • <b>Columnas</b> → alumno votante (quién emite los votos).<br/>
-    • Una fila predominantemente verde indica un alumno muy aceptado.<br/>
-    • Una fila con muchos rojos refleja rechazo generalizado.<br/>
-    • Una columna con muchos rojos indica un alumno que tiende a votar negativamente.<br/>
-    • Los bloques verdes diagonales o agrupados sugieren subgrupos de afinidad.<br/><br/>
-
-    <b>Nota:</b> los valores en las celdas corresponden a las respuestas originales, preservando los símbolos “!” para mantener la información de los casos mixtos.
-    """
+    elementos = []
 
+    def texto(nombre):
+        if textos:
+            elementos.append(plantilla.texto(nombre))
 
-    elementos.append(Paragraph(texto1, estilo_texto))
+    # 🔥 1. Heatmap
+    elementos.append(plantilla.titulo("1. Mapa de calor de votaciones"))
+    texto('heatmap')
     elementos.append(Spacer(1, 10))
-    elementos.append(Image(imagenes[0], width=500, height=500))
+    elementos.append(imagen('heatmap', 500, 500))
     elementos.append(PageBreak())
 
     # 💚 2. Niveles de aceptación (en la misma página)
-    elementos.append(Paragraph("<b>2. Niveles de aceptación</b>", estilos["Heading1"]))
-    texto2 = """
-    En esta sección se representan los niveles de aceptación de cada alumno en función de los votos recibidos 
-    por parte de sus compañeros. La aceptación refleja la valoración global del grupo hacia cada individuo, 
-    teniendo en cuenta tanto los votos positivos como negativos.  
-    Los gráficos permiten identificar fácilmente quiénes son los alumnos más valorados (mayor número de votos positivos) 
-    y aquellos que pueden experimentar menor integración o rechazo social.
-    """
-    elementos.append(Paragraph(texto2, estilo_texto))
+    elementos.append(plantilla.titulo("2. Niveles de aceptación"))
+    texto('aceptacion')
     elementos.append(Spacer(1, 12))
 
     # --- Gráfico 1: escala original ---
-    elementos.append(Paragraph("<b>2.1 Nivel de aceptación neto (escala original)</b>", estilos["Heading2"]))
-    texto21 = """
-    En este gráfico se muestran los <b>niveles de aceptación neta</b>, es decir, la suma de los votos recibidos por cada alumno.  
-    Las barras están ordenadas de mayor a menor puntuación, lo que permite identificar rápidamente a los miembros con 
-    mayor reconocimiento dentro del grupo.  
-    La <b>escala de color</b> va del <b>verde</b> (mayor aceptación) al <b>rojo</b> (mayor rechazo), 
-    de acuerdo con la paleta <code>RdYlGn_r</code>.  
-    Cada barra incluye su puntuación total, y su longitud representa directamente la cantidad de votos netos obtenidos.
-    """
-    elementos.append(Paragraph(texto21, estilo_texto))
+    elementos.append(plantilla.titulo("2.1 Nivel de aceptación neto (escala original)", "Heading2"))
+    texto('aceptacion_neta')
     elementos.append(Spacer(1, 8))
-    elementos.append(Image(imagenes[1], width=420, height=300))
+    elementos.append(imagen('aceptacion', 420, 300))
     elementos.append(Spacer(1, 15))
 
     # --- Gráfico 2: normalizado ---
-    elementos.append(Paragraph("<b>2.2 Índice de aceptación normalizado (0–100)</b>", estilos["Heading2"]))
-    texto22 = """
-    El segundo gráfico muestra los mismos datos transformados en una <b>escala normalizada de 0 a 100</b>.  
-    Este índice permite comparar los niveles de aceptación entre diferentes grupos o periodos, 
-    ya que elimina las diferencias debidas a la escala original de votos.  
-    El alumno con la puntuación más alta se sitúa en 100%, y el de menor puntuación en 0%.  
-    De nuevo, el gradiente de color verde–rojo facilita una lectura intuitiva: verde indica alta aceptación, 
-    mientras que tonos anaranjados o rojizos reflejan baja aceptación o posible aislamiento.
-    """
-    elementos.append(Paragraph(texto22, estilo_texto))
+    elementos.append(plantilla.titulo("2.2 Índice de aceptación normalizado (0–100)", "Heading2"))
+    texto('aceptacion100')
     elementos.append(Spacer(1, 8))
-    elementos.append(Image(imagenes[2], width=420, height=300))
+    elementos.append(imagen('aceptacion100', 420, 300))
 
     # No separamos con salto de página, ambos quedan juntos
     elementos.append(Spacer(1, 20))
 
+    if resultado.metricas is not None:
+        elementos.extend(_seccion_metricas(resultado.metricas, plantilla, textos))
+        elementos.append(Spacer(1, 20))
+
 
     # 🌐 3. Grafos (uno por fila)
-    elementos.append(Paragraph("<b>3. Grafos de interacciones sociométricas</b>", estilos["Heading1"]))
-    intro_grafos = """
-    En esta sección se presentan tres representaciones gráficas (grafos sociométricos) que muestran las relaciones entre los alumnos 
-    según las valoraciones que emitieron en la encuesta.  
-    Cada nodo representa a un alumno, y las conexiones (flechas) indican los votos que ha dado un alumno hacia otro.
-    El color de la arista refleja el tipo de valoración: <b>verde</b> para votos positivos (afinidad) y <b>rojo</b> para votos negativos (rechazo).  
-    El tamaño del nodo es proporcional al nivel de aceptación recibido, y la forma distingue el género (<b>círculos rosas</b> para mujeres,
-    <b>triángulos azules</b> para hombres).  
-    Los grafos se generan mediante un modelo de fuerzas, de modo que los alumnos con mayor afinidad positiva aparecen más próximos entre sí.
-    """
-    elementos.append(Paragraph(intro_grafos, estilo_texto))
+    elementos.append(plantilla.titulo("3. Grafos de interacciones sociométricas"))
+    texto('grafos')
     elementos.append(Spacer(1, 15))
 
     # --- Grafo general ---
-    elementos.append(Paragraph("<b>3.1 Grafo general de interacciones</b>", estilos["Heading2"]))
-    texto_general = """
-    Este grafo incluye todas las relaciones entre alumnos, tanto positivas como negativas.  
-    Permite observar simultáneamente las afinidades y los rechazos dentro del grupo.  
-    Las flechas verdes representan vínculos positivos y las rojas, vínculos negativos.  
-    La cercanía entre nodos se debe principalmente a los votos positivos (los alumnos que se aprecian mutuamente tienden a agruparse).
-    """
-    elementos.append(Paragraph(texto_general, estilo_texto))
+    elementos.append(plantilla.titulo("3.1 Grafo general de interacciones", "Heading2"))
+    texto('grafo_general')
     elementos.append(Spacer(1, 8))
-    elementos.append(Image(imagenes[3], width=420, height=350))
+    elementos.append(imagen('grafo_general', 420, 350))
     elementos.append(Spacer(1, 15))
 
     # --- Grafo de aceptación ---
-    elementos.append(Paragraph("<b>3.2 Grafo de aceptación (relaciones positivas)</b>", estilos["Heading2"]))
-    texto_positivo = """
-    En este grafo se muestran exclusivamente las <b>relaciones positivas</b> (votos mayores que cero).  
-    Los colores de fondo difuminados agrupan a los alumnos en <b>componentes fuertemente conexas</b>,
-    es decir, subgrupos en los que las relaciones positivas son recíprocas y cohesionadas.  
-    Este grafo revela los <b>núcleos de afinidad</b> o amistades consolidadas dentro del grupo.
-    """
-    elementos.append(Paragraph(texto_positivo, estilo_texto))
+    elementos.append(plantilla.titulo("3.2 Grafo de aceptación (relaciones positivas)", "Heading2"))
+    texto('grafo_aceptacion')
     elementos.append(Spacer(1, 8))
-    elementos.append(Image(imagenes[4], width=420, height=350))
+    elementos.append(imagen('grafo_aceptacion', 420, 350))
+
+    if resultado.grafos is not None and resultado.grafos.componentes is not None:
+        df_grupos = resumen_comunidades(resultado.grafos.G_pos, resultado.grafos.componentes)
+        if len(df_grupos):
+            elementos.append(Spacer(1, 8))
+            texto('tabla_grupos')
+            elementos.append(Spacer(1, 4))
+            elementos.append(_tabla_informe(df_grupos, ancho_primera=40, columna_texto='Miembros'))
     elementos.append(Spacer(1, 15))
 
     # --- Grafo de rechazo ---
-    elementos.append(Paragraph("<b>3.3 Grafo de rechazo (relaciones negativas)</b>", estilos["Heading2"]))
-    texto_negativo = """
-    En este grafo se representan únicamente las <b>relaciones negativas</b> (votos menores que cero).  
-    Las flechas rojas indican las direcciones del rechazo.  
-    Los nodos con muchas conexiones salientes pueden estar generando rechazo hacia otros, 
-    mientras que los que reciben más conexiones entrantes pueden estar experimentando cierta <b>exclusión social</b>.  
-    El análisis de este grafo ayuda a detectar posibles <b>conflictos o dinámicas grupales desequilibradas</b>.
+    elementos.append(plantilla.titulo("3.3 Grafo de rechazo (relaciones negativas)", "Heading2"))
+    texto('grafo_negativo')
+    elementos.append(Spacer(1, 8))
+    elementos.append(imagen('grafo_negativo', 420, 350))
+    return elementos
+
+
+def _tabla_informe(df, ancho_primera=160, columna_texto=None, ancho_texto=220):
+    # 'columna_texto' es una columna de texto largo que se parte en varias líneas
+    from reportlab.platypus import Table, TableStyle, Paragraph
+    from reportlab.lib import colors
+
+    estilo_celda = obtener_plantilla().estilo_celda
+
+    def celda(columna, v):
+        if columna == columna_texto:
+            return Paragraph(str(v), estilo_celda)
+        return f'{v:g}' if isinstance(v, (int, float, np.number)) else str(v)
+
+    filas = [[df.index.name or ''] + list(df.columns)]
+    filas += [[str(i)] + [celda(c, v) for c, v in zip(df.columns, fila)]
+              for i, fila in zip(df.index, df.itertuples(index=False))]
+    anchos = [ancho_primera] + [ancho_texto if c == columna_texto else None for c in df.columns]
+    tabla = Table(filas, colWidths=anchos, repeatRows=1)
+    tabla.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#DDDDDD')),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('GRID', (0, 0), (-1, -1), 0.3, colors.grey),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+    ]))
+    return tabla
+
+
+# Por encima de este número de alumnos la tabla por alumno solo va en el CSV
+MAX_FILAS_METRICAS = 60
+
+# Columnas de la tabla por alumno del informe, con cabeceras abreviadas
+COLUMNAS_INFORME_METRICAS = {
+    'Elecciones recibidas': 'Elec. recib.',
+    'Rechazos recibidos': 'Rech. recib.',
+    'Elecciones emitidas': 'Elec. emit.',
+    'Elecciones recíprocas': 'Recíprocas',
+    'Rechazos mutuos': 'Rech. mutuos',
+    'Estatus': 'Estatus',
+}
+
+
+def _seccion_metricas(df_metricas, plantilla, textos=True):
+    from reportlab.platypus import Paragraph, Spacer
+
+    estilo_texto = plantilla.estilo_texto
+    resumen = resumen_metricas(df_metricas)
+    elementos = [plantilla.titulo("2.3 Índices sociométricos", "Heading2")]
+    if textos:
+        elementos.append(plantilla.texto('metricas'))
+    texto23 = f"""
+    En el grupo hay <b>{resumen['pares_reciprocos']}</b> parejas de elección recíproca y
+    <b>{resumen['rechazos_mutuos']}</b> de rechazo mutuo (índice de cohesión: {resumen['cohesion']:.3f}).
     """
-    elementos.append(Paragraph(texto_negativo, estilo_texto))
+    elementos.append(Paragraph(texto23, estilo_texto))
     elementos.append(Spacer(1, 8))
-    elementos.append(Image(imagenes[5], width=420, height=350))
 
-    pdf.build(elementos)
+    df_estatus = pd.DataFrame({'Alumnos': pd.Series(resumen['estatus'])}).rename_axis('Estatus')
+    elementos.append(_tabla_informe(df_estatus, ancho_primera=120))
+    elementos.append(Spacer(1, 10))
 
-    buffer.seek(0)  # Volver al inicio del buffer
-    print("✅ Informe generado correctamente")
-    
-    return buffer.getvalue()
+    if len(df_metricas) <= MAX_FILAS_METRICAS:
+        df_tabla = df_metricas[list(COLUMNAS_INFORME_METRICAS)].rename(columns=COLUMNAS_INFORME_METRICAS)
+        elementos.append(_tabla_informe(df_tabla, ancho_primera=120))
+    else:
+        # Con muchos alumnos solo listamos los que no tienen estatus medio
+        destacados = df_metricas[df_metricas['Estatus'] != ESTATUS[-1]]
+        elementos.append(Paragraph(
+            f"La tabla completa de los {len(df_metricas)} alumnos se incluye en el CSV de métricas. "
+            f"A continuación se listan los {len(destacados)} alumnos con estatus distinto de medio.", estilo_texto))
+        elementos.append(Spacer(1, 6))
+        df_tabla = destacados[list(COLUMNAS_INFORME_METRICAS)].rename(columns=COLUMNAS_INFORME_METRICAS)
+        elementos.append(_tabla_informe(df_tabla, ancho_primera=120))
+    return elementos
+
+
+def _seccion_evolucion(evolucion, plantilla, dpi=DPI_INFORME, calidad=CALIDAD_INFORME):
+    from reportlab.platypus import Paragraph, Spacer, PageBreak
+    from .longitudinal import mayores_cambios
+
+    estilo_texto = plantilla.estilo_texto
+    elementos = [PageBreak()]
+    elementos.append(plantilla.titulo("4. Evolución entre periodos"))
+    texto4 = f"""
+    Esta sección compara las matrices de la misma clase en {len(evolucion.serie.periodos)} periodos
+    ({', '.join(map(str, evolucion.serie.periodos))}).
+    Los alumnos se alinean por nombre entre periodos; quien no aparece en un periodo no se tiene en cuenta en él.
+    """
+    elementos.append(Paragraph(texto4, estilo_texto))
+    elementos.append(Spacer(1, 12))
+
+    # --- Evolución del índice ---
+    elementos.append(plantilla.titulo("4.1 Evolución del índice de aceptación", "Heading2"))
+    elementos.append(plantilla.texto('evolucion_aceptacion'))
+    elementos.append(Spacer(1, 8))
+    elementos.append(plantilla.imagen(evolucion.figuras['evolucion_aceptacion'], 450, 270, dpi, calidad))
+    elementos.append(Spacer(1, 10))
+
+    suben, bajan = mayores_cambios(evolucion)
+    for titulo, df in (('Mayores subidas de aceptación neta', suben), ('Mayores bajadas de aceptación neta', bajan)):
+        elementos.append(Paragraph(f"<b>{titulo}</b>", estilo_texto))
+        elementos.append(Spacer(1, 4))
+        elementos.append(_tabla_informe(df.rename_axis('Alumno')))
+        elementos.append(Spacer(1, 10))
+
+    # --- Rotación de relaciones ---
+    elementos.append(plantilla.titulo("4.2 Cambios en las relaciones", "Heading2"))
+    elementos.append(plantilla.texto('rotacion_aristas'))
+    elementos.append(Spacer(1, 8))
+    elementos.append(plantilla.imagen(evolucion.figuras['rotacion_aristas'], 450, 270, dpi, calidad))
+    elementos.append(Spacer(1, 10))
+    elementos.append(_tabla_informe(evolucion.rotacion.rename_axis('Transición')))
+    return elementos
 
 
 # if __name__ == "__main__":